@@ -1,21 +1,162 @@
 import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from dataclasses import dataclass
 from alpaca.trading.client import TradingClient
-from alpaca.trading.requests import GetOrdersRequest, MarketOrderRequest
-from alpaca.trading.enums import OrderSide, QueryOrderStatus, TimeInForce
+from alpaca.trading.requests import (
+    GetOrdersRequest,
+    LimitOrderRequest,
+    MarketOrderRequest,
+    ReplaceOrderRequest,
+    StopLossRequest,
+    StopOrderRequest,
+    TakeProfitRequest,
+)
+from alpaca.trading.enums import OrderClass, OrderSide, OrderType, QueryOrderStatus, TimeInForce
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from state import Portfolio
 from broker import TradeResult
+import metrics
+import tracing
+
+# client_order_id prefix for the exchange-side SL/TP orders we manage ourselves
+NATIVE_EXIT_PREFIX = "gat-exit-"
+
+
+@dataclass
+class BrokerSnapshot:
+    """Account, positions and open orders fetched once and shared by a whole tick."""
+    account: object = None
+    positions: list = None
+    open_orders: list = None
+    error: str = None
+    fetched_at: str = None
+
+    @property
+    def connected(self):
+        return self.account is not None
+
+    def open_sell_orders(self, symbol=None):
+        return [
+            order
+            for order in (self.open_orders or [])
+            if order.side == OrderSide.SELL and (symbol is None or order.symbol == symbol)
+        ]
+
+
+class _TimeoutSession(Session):
+    """requests Session with a default timeout (alpaca-py sends none, so a hung call blocks forever)."""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.default_timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.default_timeout)
+        return super().request(method, url, **kwargs)
+
 
 class AlpacaBroker:
-    def __init__(self, key_id, secret_key, paper=True):
-        self.client = TradingClient(key_id, secret_key, paper=paper)
-        print(f"🦙 Alpaca: Connected ({'Paper' if paper else 'Live'})")
+    def __init__(
+        self,
+        key_id,
+        secret_key,
+        paper=True,
+        native_exits=False,
+        url_override=None,
+        timeout=15.0,
+        pool_size=10,
+        max_retries=2,
+    ):
+        self._credentials = (key_id, secret_key, paper, url_override)
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.client = self._build_client()
+        self.native_exits = native_exits
+        # Optional callable: symbol -> stop level managed locally (SL raised by the
+        # trailing stop), so the exchange stop follows it. Set by main.py.
+        self.stop_level = None
+        self._pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="alpaca")
+        target = url_override or ("Paper" if paper else "Live")
+        print(f"🦙 Alpaca: Connected ({target})")
+
+    def _build_client(self):
+        key_id, secret_key, paper, url_override = self._credentials
+        client = TradingClient(key_id, secret_key, paper=paper, url_override=url_override)
+        # Keep-alive pool sized for the concurrent snapshot reads; connection errors are
+        # retried for idempotent calls only (never re-POST an order).
+        session = _TimeoutSession(self.timeout)
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=0,
+            status=0,
+            allowed_methods=frozenset({"GET", "DELETE"}),
+            backoff_factor=0.3,
+        )
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        client._session = session
+        return client
+
+    def reconnect(self):
+        """Drops the HTTP pool and builds a fresh client (used after cycle failures)."""
+        old_session = getattr(self.client, "_session", None)
+        self.client = self._build_client()
+        if old_session is not None:
+            old_session.close()
 
-    def is_connected(self):
+    def _call(self, method, *args, **kwargs):
+        """Every Trading API call goes through here (`alpaca.<method>` span and metrics)."""
+        metrics.inc("gat_alpaca_requests_total", method=method)
+        started = time.perf_counter()
+        try:
+            with tracing.span(f"alpaca.{method}"):
+                return getattr(self.client, method)(*args, **kwargs)
+        except Exception:
+            metrics.inc("gat_alpaca_errors_total", method=method)
+            raise
+        finally:
+            metrics.observe("gat_alpaca_request_seconds", time.perf_counter() - started, method=method)
+
+    def fetch_snapshot(self):
+        """
+        One round of reads per tick: account, positions and open orders, fetched
+        concurrently. Connectivity is derived from the account call.
+        """
+        call = tracing.bind(self._call)
+        futures = {
+            "account": self._pool.submit(call, "get_account"),
+            "positions": self._pool.submit(call, "get_all_positions"),
+            "open_orders": self._pool.submit(
+                call,
+                "get_orders",
+                filter=GetOrdersRequest(status=QueryOrderStatus.OPEN, nested=True),
+            ),
+        }
+        snapshot = BrokerSnapshot(fetched_at=self._timestamp())
+        errors = []
+        for name, future in futures.items():
+            try:
+                setattr(snapshot, name, future.result())
+            except Exception as e:
+                errors.append(f"{name}: {e}")
+        if errors:
+            snapshot.error = "; ".join(errors)
+        return snapshot
+
+    def is_connected(self, snapshot=None):
         """Check if Alpaca API is reachable."""
+        if snapshot is not None:
+            return snapshot.connected
         try:
-            self.client.get_account()
+            self._call("get_account")
             return True
         except Exception:
             return False
@@ -29,18 +170,234 @@ class AlpacaBroker:
         text = str(error).lower()
         return "held_for_orders" in text or "insufficient qty available" in text
 
-    def has_pending_exit_order(self, symbol):
-        """Return True when Alpaca already has an open SELL order for this symbol."""
+    def has_pending_exit_order(self, symbol, snapshot=None):
+        """
+        Return True when Alpaca already has an open SELL order for this symbol.
+        Our own native SL/TP orders don't count: a triggered exit cancels them first.
+        """
+        if snapshot is not None and snapshot.open_orders is not None:
+            orders = snapshot.open_sell_orders(symbol)
+        else:
+            try:
+                request = GetOrdersRequest(
+                    status=QueryOrderStatus.OPEN,
+                    side=OrderSide.SELL,
+                    symbols=[symbol],
+                )
+                orders = self._call("get_orders", filter=request)
+            except Exception as e:
+                print(f"⚠️ Could not check pending exit orders for {symbol}: {e}")
+                return False
+        return any(not self._is_native_exit(order) for order in orders)
+
+    def _release_native_exits(self, symbol, snapshot=None):
+        """Cancels our native SL/TP for `symbol` before a SELL, which would find its qty held."""
+        if not self.native_exits:
+            return
         try:
-            request = GetOrdersRequest(
-                status=QueryOrderStatus.OPEN,
-                side=OrderSide.SELL,
-                symbols=[symbol],
-            )
-            return len(self.client.get_orders(filter=request)) > 0
+            if snapshot is not None and snapshot.open_orders is not None:
+                existing = self.native_exit_levels(snapshot.open_sell_orders(symbol)).get(symbol)
+                if not existing:
+                    return
+                self.cancel_exit_orders(symbol, existing=existing)
+            else:
+                self.cancel_exit_orders(symbol)
         except Exception as e:
-            print(f"⚠️ Could not check pending exit orders for {symbol}: {e}")
+            print(f"⚠️ Could not release native exits for {symbol}: {e}")
+
+    # -- Exchange-side SL/TP (native exits) -----------------------------------------
+    # Exit orders are only armed from D+1: an exchange stop placed on the BUY day
+    # could fill the same day and break the same-day sell guard. Until then (and for
+    # anything we fail to place) the local trigger check in main.py stays in charge.
+
+    @staticmethod
+    def _is_native_exit(order):
+        return str(getattr(order, "client_order_id", "") or "").startswith(NATIVE_EXIT_PREFIX)
+
+    @staticmethod
+    def _round_price(price):
+        # Alpaca rejects sub-penny prices above $1
+        return round(float(price), 2 if price >= 1 else 4)
+
+    def get_open_sell_orders(self, symbols=None):
+        request = GetOrdersRequest(
+            status=QueryOrderStatus.OPEN,
+            side=OrderSide.SELL,
+            symbols=symbols,
+            nested=True,
+        )
+        return self._call("get_orders", filter=request)
+
+    @classmethod
+    def native_exit_levels(cls, orders):
+        """Groups our native exit orders by symbol: {symbol: {"sl", "tp", "qty", "orders"}}."""
+        levels = {}
+        for order in orders:
+            if not cls._is_native_exit(order):
+                continue
+            entry = levels.setdefault(
+                order.symbol, {"sl": None, "tp": None, "qty": None, "orders": []}
+            )
+            entry["orders"].append(order)
+            for leg in [order] + list(order.legs or []):
+                if leg.type == OrderType.STOP and leg.stop_price is not None:
+                    entry["sl"] = float(leg.stop_price)
+                elif leg.type == OrderType.LIMIT and leg.limit_price is not None:
+                    entry["tp"] = float(leg.limit_price)
+                if leg.qty is not None:
+                    entry["qty"] = float(leg.qty)
+        return levels
+
+    def _desired_exit(self, qty, sl_price, tp_price):
+        """
+        Whole-share positions get a GTC OCO (or a single GTC leg). Fractional positions
+        can only carry DAY stop orders, so they get the SL leg only, re-armed every day.
+        """
+        if qty is None or qty <= 0 or (sl_price is None and tp_price is None):
+            return None
+        whole = abs(qty - round(qty)) < 1e-6
+        if not whole:
+            if sl_price is None:
+                return None
+            return {"qty": qty, "sl": self._round_price(sl_price), "tp": None, "tif": TimeInForce.DAY}
+        return {
+            "qty": float(round(qty)),
+            "sl": self._round_price(sl_price) if sl_price is not None else None,
+            "tp": self._round_price(tp_price) if tp_price is not None else None,
+            "tif": TimeInForce.GTC,
+        }
+
+    def place_exit_orders(self, symbol, qty, sl_price=None, tp_price=None):
+        desired = self._desired_exit(qty, sl_price, tp_price)
+        if desired is None:
+            return None
+        common = {
+            "symbol": symbol,
+            "qty": desired["qty"],
+            "side": OrderSide.SELL,
+            "time_in_force": desired["tif"],
+            "client_order_id": f"{NATIVE_EXIT_PREFIX}{symbol}-{uuid.uuid4().hex[:12]}",
+        }
+        if desired["sl"] is not None and desired["tp"] is not None:
+            req = LimitOrderRequest(
+                limit_price=desired["tp"],
+                order_class=OrderClass.OCO,
+                take_profit=TakeProfitRequest(limit_price=desired["tp"]),
+                stop_loss=StopLossRequest(stop_price=desired["sl"]),
+                **common,
+            )
+        elif desired["sl"] is not None:
+            req = StopOrderRequest(stop_price=desired["sl"], **common)
+        else:
+            req = LimitOrderRequest(limit_price=desired["tp"], **common)
+        order = self._call("submit_order", order_data=req)
+        print(f"🛡️ NATIVE EXIT: {symbol} qty={desired['qty']} SL={desired['sl']} TP={desired['tp']}")
+        return order
+
+    def cancel_exit_orders(self, symbol, existing=None, wait_seconds=3.0):
+        """Cancels our native exit orders for `symbol` and waits until Alpaca releases the qty."""
+        if existing is None:
+            existing = self.native_exit_levels(self.get_open_sell_orders([symbol])).get(symbol)
+        if not existing:
             return False
+        for order in existing["orders"]:
+            try:
+                self._call("cancel_order_by_id", order.id)
+            except Exception as e:
+                print(f"⚠️ Could not cancel native exit {order.id} for {symbol}: {e}")
+        deadline = time.monotonic() + wait_seconds
+        while time.monotonic() < deadline:
+            remaining = self.native_exit_levels(self.get_open_sell_orders([symbol])).get(symbol)
+            if not remaining:
+                return True
+            time.sleep(0.25)
+        return False
+
+    def amend_exit_orders(self, symbol, qty, sl_price=None, tp_price=None, existing=None):
+        """
+        Moves native SL/TP to new levels. Patches the legs in place when the order
+        shape still fits (keeps the qty reserved), otherwise cancels and re-places.
+        """
+        desired = self._desired_exit(qty, sl_price, tp_price)
+        if existing is None:
+            existing = self.native_exit_levels(self.get_open_sell_orders([symbol])).get(symbol)
+        if not existing:
+            return self.place_exit_orders(symbol, qty, sl_price, tp_price) if desired else None
+        if desired is None:
+            self.cancel_exit_orders(symbol, existing=existing)
+            return None
+
+        same_shape = (
+            (existing["sl"] is None) == (desired["sl"] is None)
+            and (existing["tp"] is None) == (desired["tp"] is None)
+            and existing["qty"] is not None
+            and abs(existing["qty"] - desired["qty"]) < 1e-6
+        )
+        if same_shape:
+            try:
+                for order in existing["orders"]:
+                    for leg in [order] + list(order.legs or []):
+                        if leg.type == OrderType.STOP and desired["sl"] is not None:
+                            if abs(float(leg.stop_price) - desired["sl"]) > 1e-6:
+                                self._call(
+                                    "replace_order_by_id", leg.id, ReplaceOrderRequest(stop_price=desired["sl"])
+                                )
+                        elif leg.type == OrderType.LIMIT and desired["tp"] is not None:
+                            if abs(float(leg.limit_price) - desired["tp"]) > 1e-6:
+                                self._call(
+                                    "replace_order_by_id", leg.id, ReplaceOrderRequest(limit_price=desired["tp"])
+                                )
+                print(f"🛡️ NATIVE EXIT AMENDED: {symbol} SL={desired['sl']} TP={desired['tp']}")
+                return existing["orders"][0]
+            except Exception as e:
+                print(f"⚠️ Native exit amend failed for {symbol}, re-placing: {e}")
+        self.cancel_exit_orders(symbol, existing=existing)
+        return self.place_exit_orders(symbol, qty, sl_price, tp_price)
+
+    def reconcile_exit_orders(self, portfolio, open_orders=None):
+        """
+        Makes exchange-side exits match the local SL/TP of each position: places
+        missing ones, amends drifted ones and cancels orphans (position gone).
+        """
+        if not self.native_exits:
+            return
+        if open_orders is None:
+            open_orders = self.get_open_sell_orders()
+        native = self.native_exit_levels(open_orders)
+        # Symbols with a non-native SELL in flight (e.g. close_position) are left alone
+        busy = {o.symbol for o in open_orders if not self._is_native_exit(o)}
+        today_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+        for symbol, existing in native.items():
+            if symbol not in portfolio.positions:
+                self.cancel_exit_orders(symbol, existing=existing, wait_seconds=0)
+
+        for symbol, position in portfolio.positions.items():
+            if symbol in busy or position.get("open_date") == today_str:
+                continue
+            sl_price = position.get("sl")
+            if self.stop_level is not None:
+                # A trailing stop above the SL moves the exchange stop up with it
+                trailed = self.stop_level(symbol)
+                if trailed is not None and (sl_price is None or trailed > sl_price):
+                    sl_price = trailed
+            desired = self._desired_exit(position.get("qty"), sl_price, position.get("tp"))
+            existing = native.get(symbol)
+            if desired is None and not existing:
+                continue
+            if (
+                existing
+                and desired
+                and existing["sl"] == desired["sl"]
+                and existing["tp"] == desired["tp"]
+                and existing["qty"] is not None
+                and abs(existing["qty"] - desired["qty"]) < 1e-6
+            ):
+                continue
+            try:
+                self.amend_exit_orders(symbol, position.get("qty"), sl_price, position.get("tp"), existing=existing)
+            except Exception as e:
+                print(f"⚠️ Native exit reconcile failed for {symbol}: {e}")
 
     def _pending_exit_result(self, symbol, price, notional):
         timestamp = self._timestamp()
@@ -52,7 +409,7 @@ class AlpacaBroker:
         Uses Alpaca's account.daytrade_count field.
         """
         try:
-            account = self.client.get_account()
+            account = self._call("get_account")
             return int(account.daytrade_count)
         except Exception as e:
             print(f"⚠️ Could not get day trade count: {e}")
@@ -69,14 +426,16 @@ class AlpacaBroker:
             print(f"🛑 PDT GUARD: Day trade count = {count}/3. Cannot open intraday positions!")
         return can_trade
 
-    def sync_portfolio(self, portfolio: Portfolio):
+    def sync_portfolio(self, portfolio: Portfolio, snapshot=None):
         """
         Syncs the local portfolio state with Alpaca's account state.
-        Updates cash and positions.
+        Updates cash and positions. Reads from `snapshot` when given (no extra calls).
         """
         try:
+            if snapshot is not None and (snapshot.account is None or snapshot.positions is None):
+                raise RuntimeError(snapshot.error or "incomplete broker snapshot")
             # Sync Cash & Equity
-            account = self.client.get_account()
+            account = snapshot.account if snapshot is not None else self._call("get_account")
             # CRITICAL: Distinguish Cash (Net Value) from Buying Power (Trading limit)
             portfolio.cash = float(account.cash)
             portfolio.buying_power = float(account.buying_power)
@@ -84,7 +443,10 @@ class AlpacaBroker:
             portfolio.equity = float(account.equity)
 
             # Sync Positions
-            alpaca_positions = self.client.get_all_positions()
+            if snapshot is not None:
+                alpaca_positions = snapshot.positions
+            else:
+                alpaca_positions = self._call("get_all_positions")
             new_positions = {}
             
             for p in alpaca_positions:
@@ -116,15 +478,19 @@ class AlpacaBroker:
                 }
             
             portfolio.positions = new_positions
+            if self.native_exits:
+                open_sells = snapshot.open_sell_orders() if snapshot and snapshot.open_orders is not None else None
+                self.reconcile_exit_orders(portfolio, open_orders=open_sells)
             return portfolio
         except Exception as e:
             print(f"Error syncing with Alpaca: {e}")
             return portfolio
 
-    def execute(self, action, symbol, notional, price, portfolio, sl_price=None, tp_price=None):
+    def execute(self, action, symbol, notional, price, portfolio, sl_price=None, tp_price=None, snapshot=None):
         """
         Executes an order on Alpaca.
         Note: logic differs slightly from PaperBroker. We send the order, then sync.
+        `snapshot` (the current tick's BrokerSnapshot) saves the pending-exit lookup.
         """
         if action.upper() == "HOLD":
             # Just update local SL/TP if provided
@@ -139,6 +505,7 @@ class AlpacaBroker:
                     pos["sl"] = sl_price
                 if tp_price is not None:
                     pos["tp"] = tp_price
+                self.update_exit_orders(symbol, pos)
             
             timestamp = datetime.now(timezone.utc).isoformat()
             return TradeResult("HOLD", symbol, 0, price, 0, timestamp)
@@ -195,12 +562,13 @@ class AlpacaBroker:
             # FIX: Use close_position for SELL to avoid "insufficient qty" errors due to fractional rounding 
             # or price fluctuations when using 'notional'.
             # Assumes we want to close the ENTIRE position.
-            if self.has_pending_exit_order(symbol):
+            if self.has_pending_exit_order(symbol, snapshot=snapshot):
                 print(f"⏳ EXIT PENDING: SELL already open for {symbol}; skipping duplicate close_position.")
                 return self._pending_exit_result(symbol, price, notional)
+            self._release_native_exits(symbol, snapshot=snapshot)
 
             try:
-                self.client.close_position(symbol_or_asset_id=symbol)
+                self._call("close_position", symbol_or_asset_id=symbol)
                 timestamp = self._timestamp()
                 return TradeResult(
                     action="SELL",
@@ -217,7 +585,7 @@ class AlpacaBroker:
                 raise RuntimeError(f"Alpaca Close Failed: {e}")
 
         try:
-            order = self.client.submit_order(order_data=req)
+            order = self._call("submit_order", order_data=req)
             
             # For BUY orders, we handle SL/TP logic locally or separate orders?
             # Creating bracket orders via API is possible but complex for simple "update" logic.
@@ -257,5 +625,17 @@ class AlpacaBroker:
         except Exception as e:
             raise RuntimeError(f"Alpaca Order Failed: {e}")
 
+    def update_exit_orders(self, symbol, position):
+        """Pushes an SL/TP change (HOLD sl_tp_update) to the exchange-side exit orders."""
+        if not self.native_exits:
+            return
+        today_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        if position.get("open_date") == today_str:
+            return
+        try:
+            self.amend_exit_orders(symbol, position.get("qty"), position.get("sl"), position.get("tp"))
+        except Exception as e:
+            print(f"⚠️ Native exit update failed for {symbol}: {e}")
+
     def close_all_positions(self):
-        self.client.close_all_positions(cancel_orders=True)
+        self._call("close_all_positions", cancel_orders=True)
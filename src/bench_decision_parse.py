@@ -0,0 +1,240 @@
+"""
+Decision parser fuzz and throughput benchmark: tolerant scanner vs the legacy loader.
+
+    python3 src/bench_decision_parse.py [--cases 2000] [--seed 1]
+
+Random decisions are serialized, then mangled the way model answers are (code
+fences, prose around the object, trailing commas, an array left open, raw
+newlines in strings, truncation, a trade field cut, random garbage). For each
+mutation the script reports how often the legacy loader (fence strip / extract
+/ repair candidates, kept below as the reference) and the single-pass scanner
+in decision.py do the right thing: recover the decision exactly, or reject a
+cut answer so it falls back to HOLD (it must not execute). It then times both
+on well-formed answers.
+Exits 1 when the scanner misses a recoverable answer, accepts a cut one,
+returns a value that the original did not contain, or raises anything but a
+JSON error.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+
+from decision import _safe_json_load
+
+# -- legacy loader (decision.py before the single-pass scanner) ----------------
+
+
+def legacy_strip_code_fences(text):
+    if "```" not in text:
+        return text
+    parts = text.split("```")
+    if len(parts) < 3:
+        return text
+    block = parts[1]
+    lines = block.splitlines()
+    if lines and lines[0].strip().lower() == "json":
+        return "\n".join(lines[1:]).strip()
+    return block.strip()
+
+
+def legacy_extract_json_object(text):
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end == -1 or end <= start:
+        return None
+    return text[start : end + 1]
+
+
+def legacy_repair_json(text):
+    if not text:
+        return text
+    candidate = text.replace(",}", "}").replace(",]", "]")
+    open_brackets = candidate.count("[")
+    close_brackets = candidate.count("]")
+    if close_brackets < open_brackets and candidate.endswith("}"):
+        candidate = candidate[:-1] + ("]" * (open_brackets - close_brackets)) + "}"
+    return candidate
+
+
+def legacy_safe_json_load(text):
+    cleaned = legacy_strip_code_fences(text).strip()
+    candidates = [cleaned]
+    extracted = legacy_extract_json_object(cleaned)
+    if extracted and extracted != cleaned:
+        candidates.append(extracted)
+    for candidate in list(candidates):
+        repaired = legacy_repair_json(candidate)
+        if repaired and repaired not in candidates:
+            candidates.append(repaired)
+    last_error = None
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError as exc:
+            last_error = exc
+    if last_error:
+        raise last_error
+    raise ValueError("Invalid JSON")
+
+
+# -- fuzz corpus --------------------------------------------------------------
+
+WORDS = ["Achat", "momentum", "résultats", "guidance", "ATR", "support", "\"cassure\"", "volume", "→", "news", "ligne\nsuivante"]
+
+
+def random_decision(rng):
+    action = rng.choice(["BUY", "SELL", "HOLD"])
+    trade = action != "HOLD"
+    return {
+        "action": action,
+        "symbol": rng.choice(["AAPL", "NVDA", "AMD", "TSLA"]) if trade or rng.random() < 0.3 else None,
+        "notional": round(rng.uniform(5, 500), 2) if trade else None,
+        "sl_price": round(rng.uniform(10, 300), 2) if action == "BUY" else None,
+        "tp_price": round(rng.uniform(10, 300), 2) if trade and rng.random() < 0.7 else None,
+        "confidence": round(rng.random(), 2),
+        "reason": " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 30))),
+        "reflection": " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 80))),
+        "evidence": [f"Source {index}: {rng.choice(WORDS)}" for index in range(rng.randint(0, 4))],
+    }
+
+
+def serialize(decision, rng):
+    return json.dumps(decision, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 2]))
+
+
+def cut_trade_field(text, rng):
+    # The answer ends inside (or right before) the value of a trade field
+    key = text.find(f'"{rng.choice(["notional", "sl_price", "tp_price"])}"')
+    value = text.find(":", key) + 1
+    while text[value] == " ":
+        value += 1
+    return text[: value + rng.randint(0, 3)]
+
+
+# name -> (mutate(text, rng), expected): "recover" must parse to the original,
+# "reject" must raise (a cut answer never executes), "any" only must not crash
+MUTATIONS = {
+    "clean": (lambda text, rng: text, "recover"),
+    "fenced": (lambda text, rng: f"```json\n{text}\n```", "recover"),
+    "prose": (lambda text, rng: f"Voici ma décision :\n{text}\nBonne journée.", "recover"),
+    "trailing_comma": (lambda text, rng: text[: text.rfind("}")].rstrip() + ",\n}", "recover"),
+    "array_comma": (lambda text, rng: text.replace('"]', '",]', 1) if '"]' in text else text, "recover"),
+    "open_array": (
+        lambda text, rng: text[: text.rfind("]")] + text[text.rfind("]") + 1 :] if text.rstrip().endswith("]\n}") or text.rstrip().endswith("]}") else text,
+        "recover",
+    ),
+    "raw_newline": (lambda text, rng: text.replace("\\n", "\n"), "recover"),
+    "truncated": (lambda text, rng: text[: rng.randint(1, len(text) - 1)], "reject"),
+    "cut_trade_field": (cut_trade_field, "reject"),
+    "garbage": (lambda text, rng: "".join(rng.choice('{}[]",:0123456789.-truefalsn ') for _ in range(rng.randint(0, 60))), "any"),
+}
+# Answers seen cut by a max_tokens limit: they must not parse into a trade
+MUST_REJECT = [
+    '{"action":"BUY","symbol":"AAPL","notional":50,"sl_price":180,"tp_price":2',
+    '{"action":"SELL","symbol":"NVDA","notional":',
+    '```json\n{"action": "BUY", "symbol": "AMD", "notional": 120.5, "sl_price": 14',
+]
+
+
+def is_prefix_of(value, original):
+    """Truncated answers may lose trailing members, never change or invent one."""
+    if isinstance(value, dict) and isinstance(original, dict):
+        return all(key in original and is_prefix_of(item, original[key]) for key, item in value.items())
+    if isinstance(value, list) and isinstance(original, list):
+        return len(value) <= len(original) and all(is_prefix_of(a, b) for a, b in zip(value, original))
+    return value == original
+
+
+def attempt(loader, text):
+    try:
+        return "ok", loader(text)
+    except ValueError:
+        return "error", None
+    except Exception as exc:
+        return f"crash: {type(exc).__name__}: {exc}", None
+
+
+def fuzz(cases, seed):
+    rng = random.Random(seed)
+    rows = {name: {"cases": 0, "legacy": 0, "scanner": 0} for name in MUTATIONS}
+    failures = []
+    for _ in range(cases):
+        original = random_decision(rng)
+        text = serialize(original, rng)
+        for name, (mutate, expected) in MUTATIONS.items():
+            mangled = mutate(text, rng)
+            row = rows[name]
+            row["cases"] += 1
+            legacy_status, legacy_value = attempt(legacy_safe_json_load, mangled)
+            status, value = attempt(_safe_json_load, mangled)
+            if expected == "reject":
+                row["legacy"] += legacy_status == "error"
+                row["scanner"] += status == "error"
+            else:
+                row["legacy"] += legacy_value == original
+                row["scanner"] += value == original
+            if status.startswith("crash"):
+                failures.append((name, status, mangled[:120]))
+            elif expected == "recover" and value != original:
+                failures.append((name, f"not recovered ({status})", mangled[:120]))
+            elif expected == "reject" and status == "ok":
+                failures.append((name, "cut answer accepted", mangled[:120]))
+            elif expected == "recover" and status == "ok" and not is_prefix_of(value, original):
+                failures.append((name, "value not in the original", mangled[:120]))
+    for text in MUST_REJECT:
+        status, _ = attempt(_safe_json_load, text)
+        if status != "error":
+            failures.append(("must_reject", f"cut answer accepted ({status})", text[:120]))
+    return rows, failures
+
+
+def throughput(seed, count=2000, repeat=3):
+    rng = random.Random(seed)
+    texts = [serialize(random_decision(rng), rng) for _ in range(count)]
+    fenced = [f"```json\n{text}\n```" for text in texts]
+    trailing = [MUTATIONS["trailing_comma"][0](text, rng) for text in texts]
+    results = {}
+    for label, corpus in (("clean", texts), ("fenced", fenced), ("trailing", trailing)):
+        for name, loader in (("legacy", legacy_safe_json_load), ("scanner", _safe_json_load), ("json.loads", json.loads)):
+            if name == "json.loads" and label != "clean":
+                continue
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                for text in corpus:
+                    # Failures (legacy on trailing commas) are timed too: they cost a lost cycle
+                    attempt(loader, text)
+                timings.append(time.perf_counter() - started)
+            results[(label, name)] = statistics.median(timings) / count * 1e6
+    return results
+
+
+def run(cases=2000, seed=1):
+    rows, failures = fuzz(cases, seed)
+    print(f"{'mutation':<16}{'cases':>7}{'legacy':>10}{'scanner':>10}   (recovered exactly, or rejected when cut)")
+    for name, row in rows.items():
+        print(
+            f"{name:<16}{row['cases']:>7}{row['legacy'] / row['cases']:>10.1%}{row['scanner'] / row['cases']:>10.1%}"
+            f"{'   rejected' if MUTATIONS[name][1] == 'reject' else ''}"
+        )
+    print()
+    for (label, name), micros in throughput(seed).items():
+        print(f"{label:<8} {name:<11} {micros:8.1f} µs/answer")
+    if failures:
+        print(f"\n{len(failures)} scanner failures, first ones:")
+        for name, status, text in failures[:10]:
+            print(f"  {name}: {status}: {text!r}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decision parser fuzz and throughput")
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(run(args.cases, args.seed))
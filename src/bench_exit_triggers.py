@@ -0,0 +1,101 @@
+import random
+import time
+
+from exit_triggers import ExitTriggerIndex
+from main import list_exit_triggers
+
+
+def build_positions(count, seed=7):
+    rng = random.Random(seed)
+    positions = {}
+    for i in range(count):
+        price = rng.uniform(5, 500)
+        positions[f"S{i:04d}"] = {
+            "qty": rng.uniform(0.1, 10),
+            "price": price,
+            "sl": price * 0.95,
+            "tp": price * 1.08,
+            "avg_entry": price,
+        }
+    return positions
+
+
+def scan_triggers(positions):
+    # Same walk as the old list_exit_triggers: every position, every refresh.
+    triggers = []
+    for symbol, info in positions.items():
+        price = info["price"]
+        if info["sl"] is not None and price <= info["sl"]:
+            triggers.append((symbol, "SL"))
+        elif info["tp"] is not None and price >= info["tp"]:
+            triggers.append((symbol, "TP"))
+    return triggers
+
+
+def move_prices(positions, base, rng, moved):
+    # A refresh tick: `moved` symbols get a new price, the others keep theirs
+    for symbol in rng.sample(list(positions), moved):
+        positions[symbol]["price"] = base[symbol] * rng.uniform(0.93, 1.1)
+
+
+def run_refresh(position_count, ticks, seed=11):
+    """The refresh loop path: list_exit_triggers on a snapshot vs the plain scan."""
+    positions = build_positions(position_count)
+    base = {symbol: info["price"] for symbol, info in positions.items()}
+    snapshot = {"positions": positions}
+    moved = max(1, position_count // 10)
+
+    rng = random.Random(seed)
+    scan_seconds = 0.0
+    scan_hits = 0
+    for _ in range(ticks):
+        move_prices(positions, base, rng, moved)
+        start = time.perf_counter()
+        scan_hits += len(scan_triggers(positions))
+        scan_seconds += time.perf_counter() - start
+
+    rng = random.Random(seed)
+    positions.update(build_positions(position_count))
+    list_seconds = 0.0
+    list_hits = 0
+    for _ in range(ticks):
+        move_prices(positions, base, rng, moved)
+        start = time.perf_counter()
+        list_hits += len(list_exit_triggers(snapshot))
+        list_seconds += time.perf_counter() - start
+
+    print(
+        f"refresh  positions={position_count:5d}: scan {scan_seconds / ticks * 1e6:9.2f} us/tick "
+        f"({scan_hits} triggers), list_exit_triggers {list_seconds / ticks * 1e6:9.2f} us/tick "
+        f"({list_hits} triggers)"
+    )
+
+
+def run_stream(position_count=1000, updates=200000, seed=11):
+    """The quote stream path: each trade checks its own symbol only."""
+    positions = build_positions(position_count)
+    symbols = list(positions)
+    rng = random.Random(seed)
+    ticks = []
+    for _ in range(updates):
+        symbol = rng.choice(symbols)
+        ticks.append((symbol, positions[symbol]["price"] * rng.uniform(0.93, 1.1)))
+
+    for label, trail_pct in (("stream", None), ("trailing", 3.0)):
+        index = ExitTriggerIndex(trail_pct=trail_pct)
+        index.sync(positions)
+        start = time.perf_counter()
+        hits = 0
+        for symbol, price in ticks:
+            hits += len(index.on_price(symbol, price))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{label:8s} positions={position_count:5d}: {elapsed / updates * 1e6:9.2f} us/trade "
+            f"({updates / elapsed:,.0f} trades/s, {hits} triggers)"
+        )
+
+
+if __name__ == "__main__":
+    for count in (10, 100, 1000):
+        run_refresh(count, ticks=500)
+    run_stream()
@@ -0,0 +1,87 @@
+"""
+LLM tail-latency benchmark: plain requests vs the hedged request policy.
+
+    python3 src/bench_llm_tail.py [--calls 200] [--latency 0.2] [--slow-rate 0.03] [--slow-latency 3]
+
+Both clients call the local stub (llm_stub_server.py), where a `slow_rate` share
+of the requests takes `slow_latency` seconds. The hedged client sends a duplicate
+after the p95 of the latencies it has seen; the script reports p50/p95/p99/max
+per client, the hedges sent and the extra requests they cost.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from decision import is_decision_json
+from llm import HedgedLLMClient, LLMClient
+from llm_stub_server import start_llm_stub
+
+SYSTEM_PROMPT = "You are a trading agent. Return valid JSON only."
+USER_PROMPT = "Positions: none\nWatchlist: AAPL 190.5\nDecide your next action."
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(client, calls):
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        client.decide(SYSTEM_PROMPT, USER_PROMPT)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def describe(label, latencies):
+    print(
+        f"{label:<8} p50 {statistics.median(latencies):6.3f}s  p95 {percentile(latencies, 95):6.3f}s  "
+        f"p99 {percentile(latencies, 99):6.3f}s  max {max(latencies):6.3f}s"
+    )
+
+
+def run(calls=200, latency=0.2, slow_rate=0.03, slow_latency=3.0, seed=7):
+    os.environ.setdefault("XAI_API_KEY", "stub")
+    settings = {"latency": latency, "jitter": latency / 4, "slow_rate": slow_rate, "slow_latency": slow_latency}
+    server, state, base_url = start_llm_stub(seed=seed, **settings)
+    try:
+        plain = LLMClient(base_url=base_url, model="stub", temperature=0.2, timeout=60, max_retries=0)
+        plain_latencies = measure(plain, calls)
+        plain_requests = state.snapshot()["request_count"]
+
+        hedged = HedgedLLMClient(
+            LLMClient(base_url=base_url, model="stub", temperature=0.2, timeout=60, max_retries=0),
+            deadline_seconds=slow_latency * 3,
+            hedge_delay_seconds=latency * 3,
+            validate=is_decision_json,
+        )
+        hedged_latencies = measure(hedged, calls)
+        hedged_requests = state.snapshot()["request_count"] - plain_requests
+        hedged.close()
+        plain.close()
+    finally:
+        server.shutdown()
+
+    print(f"{calls} calls, base latency {latency}s, {slow_rate:.0%} of requests take {slow_latency}s")
+    describe("plain", plain_latencies)
+    describe("hedged", hedged_latencies)
+    extra = hedged_requests - calls
+    print(f"hedges   {extra} extra requests ({extra / calls:.1%}); plain sent {plain_requests}")
+    saved = percentile(plain_latencies, 99) - percentile(hedged_latencies, 99)
+    print(f"p99 saved {saved:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tail latency of plain vs hedged LLM requests")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--slow-rate", type=float, default=0.03)
+    parser.add_argument("--slow-latency", type=float, default=3.0)
+    args = parser.parse_args()
+    sys.exit(run(args.calls, args.latency, args.slow_rate, args.slow_latency))
@@ -0,0 +1,238 @@
+"""
+Offline load test: main() cycles and LLM calls against the local stub, no network.
+
+    python3 src/bench_load.py [--scenario all] [--cycles 10] [--calls 100] [--concurrency 8] [--hedged]
+
+Starts llm_stub_server.py with random decisions and, in a scratch directory,
+writes a config that points the LLM and live search (REST backend) at it, uses
+the offline market provider (offline_market.py) and the local paper broker
+(Alpaca keys are blanked for the run). Each scenario sets the stub's latency
+distribution and error rates, then reports:
+
+- LLM client: `calls` decisions sent from `concurrency` threads with the
+  client main() builds: calls/s, p50/p95/p99/max latency, failures by kind;
+- main(): `cycles` decision cycles in a row, clocked at a fixed in-session time
+  so every cycle asks the LLM: cycles/s, cycle p50/p95/p99, LLM latency from
+  the llm_usage events, failed cycles and HOLD fallbacks.
+
+`--hedged` turns on llm.request_policy (deadline, hedging) to compare how the
+bot rides out a slow provider.
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import market_calendar
+from decision import parse_decision
+from llm_stub_server import start_llm_stub
+from runtime import Runtime
+
+EXAMPLE_CONFIG = Path(__file__).resolve().parents[1] / "config" / "settings.example.json"
+SYSTEM_PROMPT = "You are a trading agent. Return valid JSON only."
+USER_PROMPT = "Positions: none\nWatchlist: AAPL 190.5\nDecide your next action."
+SCENARIOS = {
+    "normal": {"latency": 0.2, "latency_dist": "lognormal", "sigma": 0.3},
+    "slow": {"latency": 0.8, "latency_dist": "lognormal", "sigma": 0.8, "slow_rate": 0.05, "slow_latency": 6.0},
+    "errors": {
+        "latency": 0.2,
+        "latency_dist": "lognormal",
+        "sigma": 0.3,
+        "error_rate": 0.1,
+        "rate_limit_rate": 0.05,
+        "invalid_rate": 0.05,
+    },
+}
+NEUTRAL = {"slow_rate": 0.0, "error_rate": 0.0, "rate_limit_rate": 0.0, "invalid_rate": 0.0}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def describe(label, latencies):
+    if not latencies:
+        print(f"{label:<14} no samples")
+        return
+    print(
+        f"{label:<14} p50 {statistics.median(latencies):6.3f}s  p95 {percentile(latencies, 95):6.3f}s  "
+        f"p99 {percentile(latencies, 99):6.3f}s  max {max(latencies):6.3f}s"
+    )
+
+
+def build_config(base_url, hedged=False):
+    config = json.loads(EXAMPLE_CONFIG.read_text())
+    config["llm"].update(base_url=base_url, model="stub")
+    config["llm"]["streaming"]["enabled"] = False
+    config["llm"]["ensemble"]["enabled"] = False
+    config["llm"]["cache"]["mode"] = "passthrough"
+    policy = config["llm"]["request_policy"]
+    policy.update(enabled=hedged, deadline_seconds=8, hedge_delay_seconds=1.5, min_samples=5)
+    config["clients"].update(llm_timeout_seconds=10, search_timeout_seconds=10, max_retries=1)
+    config["metrics"]["enabled"] = False
+    config["live_search"].update(
+        enabled=True, backend="rest", base_url=None, model="stub", cooldown_minutes=0, max_queries_per_run=3
+    )
+    config["market"]["provider"] = "offline"
+    config["market"]["stream"]["enabled"] = False
+    config["trading"].update(
+        mode="paper",
+        starting_cash=1000.0,
+        watchlist=["AAPL", "MSFT", "NVDA"],
+        universe=[],
+    )
+    config["trading"]["event_triggers"]["enabled"] = False
+    config["trading"]["warmup"]["enabled"] = False
+    return config
+
+
+def in_session_clock():
+    """11:00 New York on the last trading day, so cycles run the full decision path."""
+    day = date.today()
+    while not market_calendar.is_trading_day(day):
+        day -= timedelta(days=1)
+    return datetime.combine(day, datetime.min.time(), tzinfo=market_calendar.NY_TZ).replace(hour=11)
+
+
+def run_llm_calls(llm, calls, concurrency):
+    def call(_):
+        started = time.perf_counter()
+        try:
+            parse_decision(llm.decide(SYSTEM_PROMPT, USER_PROMPT))
+            return time.perf_counter() - started, None
+        except Exception as exc:
+            return time.perf_counter() - started, type(exc).__name__
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, range(calls)))
+    wall = time.perf_counter() - started
+    failures = {}
+    for _, kind in results:
+        if kind:
+            failures[kind] = failures.get(kind, 0) + 1
+    return [seconds for seconds, kind in results if kind is None], failures, wall
+
+
+def run_cycles(cycles, runtime, config_dir, verbose=False):
+    import main as bot
+
+    clock = in_session_clock()
+    real_session_state = bot.get_session_state
+    bot.get_session_state = lambda now=None: real_session_state(now or clock)
+    timings = []
+    failures = []
+    started = time.perf_counter()
+    previous_cwd = os.getcwd()
+    os.chdir(config_dir)
+    try:
+        for _ in range(cycles):
+            cycle_started = time.perf_counter()
+            output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+            try:
+                with output:
+                    bot.main(runtime)
+                timings.append(time.perf_counter() - cycle_started)
+            except Exception as exc:
+                failures.append(f"{type(exc).__name__}: {exc}")
+                runtime.reset()
+    finally:
+        # The refresh thread writes under relative paths: stop it before leaving the scratch dir
+        refresh_thread = bot._refresh_thread_instance
+        if refresh_thread is not None and refresh_thread.is_alive():
+            bot._stop_refresh_thread = True
+            bot._refresh_wake.set()
+            refresh_thread.join(timeout=30)
+        os.chdir(previous_cwd)
+        bot.get_session_state = real_session_state
+    return timings, failures, time.perf_counter() - started
+
+
+def read_events(trades_path):
+    events = []
+    if trades_path.exists():
+        for line in trades_path.read_text().splitlines():
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return events
+
+
+def run_scenario(name, settings, state, base_url, scratch, args):
+    print(f"\n=== {name}: {json.dumps(settings)}")
+    state.update(dict(NEUTRAL, **settings))
+    config_dir = Path(scratch) / name
+    (config_dir / "config").mkdir(parents=True)
+    config = build_config(base_url, hedged=args.hedged)
+    (config_dir / "config" / "settings.json").write_text(json.dumps(config, indent=2))
+
+    before = state.snapshot()
+    llm_runtime = Runtime()
+    latencies, failures, wall = run_llm_calls(llm_runtime.llm(config), args.calls, args.concurrency)
+    llm_runtime.reset()
+    print(f"LLM calls      {args.calls} from {args.concurrency} threads in {wall:.2f}s ({args.calls / wall:.1f} calls/s)")
+    describe("  latency", latencies)
+    print(f"  failures     {failures or 'none'}")
+
+    cycle_runtime = Runtime()
+    timings, cycle_failures, wall = run_cycles(args.cycles, cycle_runtime, config_dir, verbose=args.verbose)
+    cycle_runtime.reset()
+    events = read_events(config_dir / config["paths"]["trades_path"])
+    llm_latencies = [event["latency_seconds"] for event in events if event.get("type") == "llm_usage" and event.get("latency_seconds")]
+    fallbacks = sum(1 for event in events if event.get("type") == "decision_fallback")
+    trades = sum(1 for event in events if event.get("type") == "trade")
+    print(f"main() cycles  {len(timings)}/{args.cycles} ok in {wall:.2f}s ({len(timings) / max(wall, 1e-9):.2f} cycles/s)")
+    describe("  cycle", timings)
+    describe("  llm", llm_latencies)
+    print(f"  HOLD fallbacks {fallbacks}, trades {trades}, failed cycles {len(cycle_failures)}")
+    for failure in cycle_failures[:3]:
+        print(f"    {failure[:160]}")
+    after = state.snapshot()
+    print(
+        "stub           "
+        + ", ".join(
+            f"{key} {after[key] - before[key]}"
+            for key in ("request_count", "search_count", "slow_count", "error_count", "rate_limited_count", "invalid_count")
+        )
+    )
+
+
+def run(args):
+    # Nothing leaves the box: the stub answers the LLM and live search, no Alpaca keys
+    os.environ["XAI_API_KEY"] = "stub"
+    os.environ["ALPACA_API_KEY"] = ""
+    os.environ["ALPACA_SECRET_KEY"] = ""
+    server, state, base_url = start_llm_stub(decisions="random", seed=args.seed)
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            for name in names:
+                run_scenario(name, copy.deepcopy(SCENARIOS[name]), state, base_url, scratch, args)
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test of main() and the LLM client against the local stub")
+    parser.add_argument("--scenario", choices=["all", *SCENARIOS], default="all")
+    parser.add_argument("--cycles", type=int, default=10)
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--hedged", action="store_true", help="Enable llm.request_policy (deadline + hedging)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true", help="Show the cycles' console output")
+    sys.exit(run(parser.parse_args()))
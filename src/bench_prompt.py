@@ -0,0 +1,143 @@
+"""
+Prompt size benchmark on the prompts recorded in the trades log.
+
+    python3 src/bench_prompt.py [--trades data/trades.jsonl] [--limit 50] [--config config/settings.json]
+
+Legacy prompts (raw JSON sections) are split back into their sections and
+rebuilt with the compact, budgeted prompt builder; the script reports tokens
+before/after and the build time. Prompts already built by the prompt builder
+are only measured. Budgets come from the `prompt` section of the config.
+"""
+
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from prompt_builder import (
+    DEFAULT_MAX_TOKENS,
+    PromptBuilder,
+    count_tokens,
+    format_decisions,
+    format_events,
+    format_positions,
+    format_watchlist,
+)
+
+
+def load_prompts(trades_path, limit):
+    prompts = []
+    for line in Path(trades_path).read_text().splitlines():
+        try:
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if event.get("type") == "prompt":
+            user = (event.get("prompt") or {}).get("user")
+            if user:
+                prompts.append(user)
+    return prompts[-limit:]
+
+
+def _json_after(prompt, pattern, default):
+    match = re.search(pattern, prompt, re.MULTILINE)
+    if not match:
+        return default
+    try:
+        return json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return default
+
+
+def rebuild_legacy(prompt, max_tokens, budgets=None):
+    """Compact version of a legacy prompt; None when `prompt` is not in the legacy layout."""
+    if "Market snapshot:\n{" not in prompt or "Portfolio:\n" not in prompt:
+        return None
+    header = prompt.split("Portfolio:\n", 1)[0].strip()
+    positions = _json_after(prompt, r"^Positions: (\{.*\})$", {})
+    snapshot = _json_after(prompt, r"^Market snapshot:\n(\{.*\})$", {})
+    memory = _json_after(prompt, r"^Decision memory:\n(\[.*\])$", [])
+    events = _json_after(prompt, r"^Recent events:\n(\[.*\])$", [])
+    live = re.search(r"Live context:\n(.*?)\n\nDecision memory:", prompt, re.DOTALL)
+    cash_lines = re.findall(r"^(?:Cash|Buying Power): .*$", prompt, re.MULTILINE)
+    metrics = re.search(r"Portfolio metrics:\n(.*?)\n\nLive context:", prompt, re.DOTALL)
+    instructions = prompt[prompt.find("Allowed symbols:"):].strip()
+
+    builder = PromptBuilder(max_tokens=max_tokens, budgets=budgets)
+    builder.add("context", header)
+    builder.add("portfolio", "\n".join(cash_lines + ([metrics.group(1).strip()] if metrics else [])), title="Portfolio")
+    builder.add("positions", format_positions(snapshot.get("positions"), positions), title="Positions", priority=2)
+    builder.add("watchlist", format_watchlist(snapshot.get("watchlist_prices")), title="Watchlist", priority=3)
+    builder.add("live_context", live.group(1).strip() if live else "none", title="Live context", priority=4)
+    builder.add("decision_memory", format_decisions(memory), title="Decision memory", priority=5)
+    builder.add("recent_events", format_events(events), title="Recent events", priority=6)
+    builder.add("instructions", instructions)
+    return builder.build()
+
+
+def run(trades_path, limit=50, max_tokens=DEFAULT_MAX_TOKENS, budgets=None):
+    prompts = load_prompts(trades_path, limit)
+    if not prompts:
+        print(f"No recorded prompts in {trades_path}")
+        return 1
+    before, after, build_ms, sections = [], [], [], {}
+    for prompt in prompts:
+        tokens = count_tokens(prompt)
+        started = time.perf_counter()
+        rebuilt = rebuild_legacy(prompt, max_tokens, budgets)
+        elapsed = (time.perf_counter() - started) * 1000
+        before.append(tokens)
+        if rebuilt is None:
+            after.append(tokens)
+            continue
+        build_ms.append(elapsed)
+        after.append(rebuilt[1]["total_tokens"])
+        for name, section_tokens in rebuilt[1]["sections"].items():
+            sections.setdefault(name, []).append(section_tokens)
+
+    def describe(values):
+        ordered = sorted(values)
+        p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+        return f"median {statistics.median(ordered):7.0f}  p95 {p95:7.0f}  max {ordered[-1]:7.0f}"
+
+    estimated = "" if _tiktoken_available() else " (estimated: tiktoken not installed)"
+    print(f"{len(prompts)} prompts, {len(build_ms)} in the legacy layout{estimated}")
+    print(f"recorded tokens  {describe(before)}")
+    print(f"compact tokens   {describe(after)}")
+    saved = 1 - sum(after) / max(sum(before), 1)
+    print(f"saved            {saved * 100:.1f}%")
+    if build_ms:
+        print(f"build time       median {statistics.median(build_ms):.2f} ms")
+    for name, values in sections.items():
+        print(f"    {name:<16} median {statistics.median(values):6.0f} tokens")
+    return 0
+
+
+def _tiktoken_available():
+    try:
+        import tiktoken  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Token benchmark of the recorded prompts")
+    parser.add_argument("--trades", default="data/trades.jsonl")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--config", default="config/settings.json")
+    args = parser.parse_args()
+    prompt_cfg = {}
+    if Path(args.config).exists():
+        prompt_cfg = json.loads(Path(args.config).read_text()).get("prompt", {})
+    sys.exit(
+        run(
+            args.trades,
+            limit=args.limit,
+            max_tokens=prompt_cfg.get("max_tokens", DEFAULT_MAX_TOKENS),
+            budgets=prompt_cfg.get("section_budgets"),
+        )
+    )
@@ -0,0 +1,101 @@
+"""
+Import-time cost of each entry point, measured in a fresh interpreter with -X importtime.
+
+    python3 src/bench_startup.py [--runs 5] [--record data/bench_startup.json] [--tolerance 25]
+
+Each entry point is imported `--runs` times; the median cumulative import time is
+reported with its heaviest imports. Results are compared with the previous
+record and the script exits 1 when an entry point got slower than `--tolerance` %.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ENTRY_POINTS = ["loop", "price_loop", "reset_all", "main"]
+SRC_DIR = Path(__file__).resolve().parent
+
+
+def import_profile(module):
+    """Returns (total_us, {imported module: cumulative_us}) for one cold import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            cumulative[parts[2].strip()] = int(parts[1])
+        except (IndexError, ValueError):
+            continue
+    return cumulative.get(module, 0), cumulative
+
+
+def heaviest(cumulative, module, baseline, limit=5):
+    # Top-level imports of the entry point, minus what the bare interpreter loads
+    top_level = {
+        name: micros
+        for name, micros in cumulative.items()
+        if "." not in name and name != module and name not in baseline
+    }
+    return sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def run(runs=5, record_path=None, tolerance=25.0):
+    previous = {}
+    if record_path and Path(record_path).exists():
+        previous = json.loads(Path(record_path).read_text()).get("entry_points", {})
+
+    _, baseline = import_profile("sys")
+    results = {}
+    regressions = []
+    for module in ENTRY_POINTS:
+        samples = []
+        cumulative = {}
+        for _ in range(runs):
+            total, cumulative = import_profile(module)
+            samples.append(total)
+        median_ms = statistics.median(samples) / 1000
+        results[module] = {
+            "median_ms": round(median_ms, 1),
+            "heaviest": {name: round(micros / 1000, 1) for name, micros in heaviest(cumulative, module, baseline)},
+        }
+        line = f"{module:<12} {median_ms:8.1f} ms"
+        before = previous.get(module, {}).get("median_ms")
+        if before:
+            delta = (median_ms - before) / before * 100
+            line += f"  (was {before:.1f} ms, {delta:+.0f}%)"
+            if delta > tolerance:
+                regressions.append(module)
+        print(line)
+        for name, ms in results[module]["heaviest"].items():
+            print(f"    {name:<24} {ms:8.1f} ms")
+
+    if record_path:
+        Path(record_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(record_path).write_text(
+            json.dumps({"python": sys.version.split()[0], "runs": runs, "entry_points": results}, indent=2)
+        )
+    if regressions:
+        print(f"❌ Startup regression (> {tolerance:.0f}%): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time benchmark for the bot entry points")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--record", default=None, help="JSON file to compare with and update")
+    parser.add_argument("--tolerance", type=float, default=25.0, help="Allowed slowdown in percent")
+    args = parser.parse_args()
+    sys.exit(run(runs=args.runs, record_path=args.record, tolerance=args.tolerance))
@@ -0,0 +1,89 @@
+import argparse
+import random
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from exit_triggers import ExitTriggerIndex
+from quote_stream import QuoteBoard, QuoteStream
+from tick_replay import load_ticks, start_replay_server
+
+
+def synthetic_ticks(symbols=50, count=20000, seed=3):
+    rng = random.Random(seed)
+    prices = {f"S{i:03d}": rng.uniform(20, 300) for i in range(symbols)}
+    start = datetime(2026, 1, 5, 14, 30, tzinfo=timezone.utc)
+    ticks = []
+    for i in range(count):
+        symbol = rng.choice(list(prices))
+        prices[symbol] *= 1 + rng.gauss(0, 0.002)
+        ticks.append(
+            {
+                "S": symbol,
+                "p": round(prices[symbol], 4),
+                "s": 100,
+                "t": (start + timedelta(milliseconds=5 * i)).isoformat(),
+            }
+        )
+    return ticks
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(ticks, speed):
+    index = ExitTriggerIndex()
+    first_price = {}
+    for tick in ticks:
+        first_price.setdefault(tick["S"], tick["p"])
+    for symbol, price in first_price.items():
+        # Tight levels so a good share of ticks cross one
+        index.upsert(symbol, 1.0, sl=price * 0.995, tp=price * 1.005)
+
+    tick_latencies = []
+    trigger_latencies = []
+    done = threading.Event()
+    received = [0]
+
+    def on_trade(symbol, price, trade):
+        detected = time.time()
+        received[0] += 1
+        if trade.get("sent"):
+            tick_latencies.append(trade["received"] - trade["sent"])
+        if index.on_price(symbol, price) and trade.get("sent"):
+            trigger_latencies.append(detected - trade["sent"])
+        if received[0] >= len(ticks):
+            done.set()
+
+    replay, url = start_replay_server(ticks, speed=speed)
+    stream = QuoteStream(QuoteBoard(), ["*"], url=url, key_id="replay", secret_key="replay", on_trade=on_trade)
+    started = time.perf_counter()
+    stream.start()
+    done.wait(timeout=max(30.0, len(ticks) * 0.01))
+    elapsed = time.perf_counter() - started
+    stream.stop()
+
+    print(f"ticks={len(ticks)} received={received[0]} speed=x{speed} elapsed={elapsed:.2f}s")
+    for label, values in (("tick->board", tick_latencies), ("tick->trigger", trigger_latencies)):
+        if not values:
+            print(f"{label:14s}: no samples")
+            continue
+        print(
+            f"{label:14s}: n={len(values)} p50={percentile(values, 50) * 1000:.3f}ms "
+            f"p95={percentile(values, 95) * 1000:.3f}ms p99={percentile(values, 99) * 1000:.3f}ms "
+            f"mean={statistics.mean(values) * 1000:.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline tick-to-trigger latency via the replay server")
+    parser.add_argument("--ticks", help="Recorded JSONL tick file (default: synthetic)")
+    parser.add_argument("--speed", type=float, default=0.0, help="Replay speed (0 = no pacing)")
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+    tick_list = load_ticks(args.ticks) if args.ticks else synthetic_ticks(count=args.count)
+    run(tick_list, args.speed)
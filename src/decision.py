@@ -1,59 +1,184 @@
 import json
+import re
 
 ALLOWED_ACTIONS = {"BUY", "SELL", "HOLD"}
 
+# Schema of the answer for providers with structured outputs (llm.structured_output);
+# keys in the streaming order of the system prompt (trade fields first)
+DECISION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "action": {"type": "string", "enum": sorted(ALLOWED_ACTIONS)},
+        "symbol": {"type": ["string", "null"]},
+        "notional": {"type": ["number", "null"]},
+        "sl_price": {"type": ["number", "null"]},
+        "tp_price": {"type": ["number", "null"]},
+        "confidence": {"type": "number"},
+        "reason": {"type": "string"},
+        "reflection": {"type": "string"},
+        "evidence": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": [
+        "action", "symbol", "notional", "sl_price", "tp_price", "confidence", "reason", "reflection", "evidence"
+    ],
+    "additionalProperties": False,
+}
 
-def _strip_code_fences(text):
-    if "```" not in text:
-        return text
-    parts = text.split("```")
-    if len(parts) < 3:
-        return text
-    block = parts[1]
-    lines = block.splitlines()
-    if lines and lines[0].strip().lower() == "json":
-        return "\n".join(lines[1:]).strip()
-    return block.strip()
 
+def decision_response_format(mode):
+    """`response_format` for `llm.structured_output`: "json_schema", "json_object" or None (prompt only)."""
+    if mode == "json_schema":
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": "trading_decision", "strict": True, "schema": DECISION_SCHEMA},
+        }
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return None
 
-def _extract_json_object(text):
-    start = text.find("{")
-    end = text.rfind("}")
-    if start == -1 or end == -1 or end <= start:
-        return None
-    return text[start : end + 1]
+
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+# Rest of a string after its opening quote, closing quote included
+_STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+
+
+def _skip_whitespace(text, index):
+    return _WHITESPACE.match(text, index).end()
+
+
+def _string_end(text, index):
+    # `index` is on the opening quote; returns the index after the closing one
+    match = _STRING_REST.match(text, index + 1)
+    return match.end() if match else None
+
+
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_LITERALS = {"true": True, "false": False, "null": None}
+# Escapes or raw control characters: the string goes through json.loads
+_NEEDS_DECODING = re.compile(r"[\\\x00-\x1f]")
 
 
-def _repair_json(text):
-    if not text:
-        return text
-    candidate = text.replace(",}", "}").replace(",]", "]")
-    open_brackets = candidate.count("[")
-    close_brackets = candidate.count("]")
-    if close_brackets < open_brackets and candidate.endswith("}"):
-        candidate = candidate[:-1] + ("]" * (open_brackets - close_brackets)) + "}"
-    return candidate
+class _TolerantScanner:
+    """
+    Single pass over an LLM answer: everything before the first "{" (code fences,
+    prose) and after the object is ignored, repeated and trailing commas are
+    skipped, and an array left open before "}" is closed. An answer cut by the end
+    of the text is an error: its trade fields can't be trusted, so it falls back
+    to HOLD.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.position = 0
+
+    def error(self, message):
+        raise json.JSONDecodeError(message, self.text, self.position)
+
+    def document(self):
+        self.position = self.text.find("{")
+        if self.position == -1:
+            self.position = 0
+            self.error("No JSON object found")
+        return self.object()
+
+    def value(self):
+        text = self.text
+        position = self.position
+        char = text[position]
+        if char == "{":
+            return self.object()
+        if char == "[":
+            return self.array()
+        if char == '"':
+            return self.string()
+        match = _NUMBER.match(text, position)
+        if match:
+            if match.end() == len(text):
+                self.error("Truncated number")
+            self.position = match.end()
+            number = match.group()
+            return float(number) if any(mark in number for mark in ".eE") else int(number)
+        for literal, value in _LITERALS.items():
+            if text.startswith(literal, position):
+                self.position = position + len(literal)
+                return value
+        self.error(f"Unexpected character {char!r}")
+
+    def string(self):
+        end = _string_end(self.text, self.position)
+        if end is None:
+            self.error("Unterminated string")
+        raw = self.text[self.position : end]
+        self.position = end
+        if not _NEEDS_DECODING.search(raw):
+            return raw[1:-1]
+        # Escapes (and raw newlines, which models emit inside strings) go through json
+        return json.loads(raw, strict=False)
+
+    def object(self):
+        text = self.text
+        self.position += 1
+        result = {}
+        while True:
+            self.position = _skip_whitespace(text, self.position)
+            if self.position >= len(text):
+                self.error("Unterminated object")
+            char = text[self.position]
+            if char == "}":
+                self.position += 1
+                return result
+            if char in ",]":
+                # Trailing/repeated comma, or a stray bracket closing an array twice
+                self.position += 1
+                continue
+            if char != '"':
+                self.error("Expected a key")
+            key = self.string()
+            self.position = _skip_whitespace(text, self.position)
+            if self.position >= len(text) or text[self.position] != ":":
+                self.error("Expected ':'")
+            self.position = _skip_whitespace(text, self.position + 1)
+            if self.position >= len(text):
+                self.error("Unterminated object")
+            result[key] = self.value()
+
+    def array(self):
+        text = self.text
+        self.position += 1
+        items = []
+        while True:
+            self.position = _skip_whitespace(text, self.position)
+            if self.position >= len(text):
+                self.error("Unterminated array")
+            char = text[self.position]
+            if char == "]":
+                self.position += 1
+                return items
+            if char == ",":
+                self.position += 1
+                continue
+            if char == "}":
+                # Array left open: the object's closing brace ends both
+                return items
+            items.append(self.value())
+
+
+# strict=False: raw newlines inside strings are accepted, as in the scanner
+_DECODER = json.JSONDecoder(strict=False)
 
 
 def _safe_json_load(text):
-    cleaned = _strip_code_fences(text).strip()
-    candidates = [cleaned]
-    extracted = _extract_json_object(cleaned)
-    if extracted and extracted != cleaned:
-        candidates.append(extracted)
-    for candidate in list(candidates):
-        repaired = _repair_json(candidate)
-        if repaired and repaired not in candidates:
-            candidates.append(repaired)
-    last_error = None
-    for candidate in candidates:
+    start = text.find("{")
+    if start != -1:
         try:
-            return json.loads(candidate)
-        except json.JSONDecodeError as exc:
-            last_error = exc
-    if last_error:
-        raise last_error
-    raise ValueError("Invalid JSON")
+            # Well-formed object (fences and prose around it included): one pass in C
+            return _DECODER.raw_decode(text, start)[0]
+        except json.JSONDecodeError:
+            pass
+    try:
+        return _TolerantScanner(text).document()
+    except RecursionError:
+        raise json.JSONDecodeError("JSON nested too deeply", text, 0) from None
 
 
 def parse_optional_price(value, label):
@@ -73,8 +198,21 @@ def parse_optional_minutes(value, default=30):
     return default
 
 
+def is_decision_json(text):
+    """True when `text` holds a JSON object with an action (validity check of hedged LLM answers)."""
+    try:
+        data = _safe_json_load(text)
+    except ValueError:
+        return False
+    return isinstance(data, dict) and "action" in data
+
+
 def parse_decision(text):
-    data = _safe_json_load(text)
+    return parse_decision_fields(_safe_json_load(text))
+
+
+def parse_decision_fields(data):
+    """Validates an already decoded decision object (see parse_decision)."""
     action = str(data.get("action", "")).upper()
     if action not in ALLOWED_ACTIONS:
         raise ValueError(f"Unsupported action: {action}")
@@ -135,3 +273,119 @@ def parse_decision(text):
         "positions_summary": positions_summary,
         "evidence": evidence,
     }
+
+
+# Fields needed to execute a decision; the schema asks for them first so they
+# stream before the long reason/reflection text.
+EARLY_DECISION_FIELDS = ("action", "symbol", "notional", "sl_price", "tp_price")
+LATE_DECISION_FIELDS = ("confidence", "reason", "reflection", "evidence", "positions_summary", "next_check_minutes")
+
+
+def _value_end(text, index):
+    """Index right after the JSON value starting at `index`, or None while it is incomplete."""
+    char = text[index]
+    if char == '"':
+        return _string_end(text, index)
+    if char in "{[":
+        depth = 0
+        position = index
+        while position < len(text):
+            char = text[position]
+            if char == '"':
+                position = _string_end(text, position)
+                if position is None:
+                    return None
+                continue
+            if char in "{[":
+                depth += 1
+            elif char in "}]":
+                depth -= 1
+                if depth == 0:
+                    return position + 1
+            position += 1
+        return None
+    # Number or literal: only complete once a delimiter follows it
+    position = index
+    while position < len(text) and text[position] not in ",}] \t\r\n":
+        position += 1
+    return position if position < len(text) else None
+
+
+class IncrementalJSONParser:
+    """
+    Top-level members of a JSON object arriving in chunks (LLM streaming).
+
+    `feed()` returns every member whose value is complete so far; text before
+    the first "{" (code fences, prose) is skipped. Parsing stops at the first
+    malformed member and the full-text parser takes over at the end.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields = {}
+        self._position = None
+        self._broken = False
+
+    def feed(self, chunk):
+        self.text += chunk
+        if self._position is None:
+            start = self.text.find("{")
+            if start == -1:
+                return self.fields
+            self._position = start + 1
+        while not self._broken and self._next_member():
+            pass
+        return self.fields
+
+    def _next_member(self):
+        text = self.text
+        index = _skip_whitespace(text, self._position)
+        if index < len(text) and text[index] == ",":
+            index = _skip_whitespace(text, index + 1)
+        if index >= len(text) or text[index] == "}":
+            return False
+        if text[index] != '"':
+            self._broken = True
+            return False
+        key_end = _string_end(text, index)
+        if key_end is None:
+            return False
+        colon = _skip_whitespace(text, key_end)
+        if colon >= len(text):
+            return False
+        if text[colon] != ":":
+            self._broken = True
+            return False
+        value_start = _skip_whitespace(text, colon + 1)
+        if value_start >= len(text):
+            return False
+        value_end = _value_end(text, value_start)
+        if value_end is None:
+            return False
+        try:
+            self.fields[json.loads(text[index:key_end])] = json.loads(text[value_start:value_end])
+        except ValueError:
+            self._broken = True
+            return False
+        self._position = value_end
+        return True
+
+
+def early_decision(fields):
+    """
+    Validated decision from the execution fields of a partially streamed answer,
+    or None while they are incomplete (or invalid: the full answer decides then).
+    """
+    if "action" not in fields:
+        return None
+    complete = all(key in fields for key in EARLY_DECISION_FIELDS)
+    # A later field already started: the model skipped an optional one (e.g. tp_price)
+    if not complete and not any(key in fields for key in LATE_DECISION_FIELDS):
+        return None
+    try:
+        decision = parse_decision_fields(fields)
+    except (TypeError, ValueError):
+        return None
+    if decision["action"] == "BUY" and decision["sl_price"] is None:
+        return None
+    return decision
@@ -0,0 +1,133 @@
+"""
+Decision ensemble: N concurrent LLM samples combined by vote.
+
+All samples are sent at once, so a cycle waits for the slowest one (or the
+deadline), not for their sum. Each answer goes through parse_decision; the
+winning action is the most common one (a tie holds), the symbol the most
+common among its votes, and notional / SL / TP the medians of the samples that
+agree on both. The decision's confidence is their share of all samples.
+"""
+
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from decision import parse_decision
+from llm import chat_messages
+
+USAGE_TOKEN_KEYS = ("prompt_tokens", "cached_tokens", "uncached_tokens", "completion_tokens")
+
+
+def run_ensemble(llm, system_prompt, user_prompt, samples=3, deadline_seconds=60, history=None):
+    """
+    Sends `samples` completions concurrently. Returns one result per sample:
+    {"index", "status" (ok/error/invalid/timeout), "seconds", "raw", "decision", "usage", "error"}.
+    """
+    messages = chat_messages(system_prompt, user_prompt, history)
+    started = time.perf_counter()
+
+    def sample(index):
+        sample_started = time.perf_counter()
+        text, usage = llm.complete(messages, timeout=deadline_seconds)
+        return text, usage, time.perf_counter() - sample_started
+
+    executor = ThreadPoolExecutor(max_workers=samples, thread_name_prefix="llm-sample")
+    futures = [executor.submit(sample, index) for index in range(samples)]
+    wait(futures, timeout=deadline_seconds)
+    # Late samples are abandoned: their HTTP timeout ends them
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    results = []
+    for index, future in enumerate(futures):
+        result = {"index": index, "raw": None, "decision": None, "usage": None, "error": None}
+        if not future.done():
+            result.update(status="timeout", seconds=round(time.perf_counter() - started, 3))
+            results.append(result)
+            continue
+        try:
+            text, usage, seconds = future.result()
+        except Exception as exc:
+            result.update(status="error", seconds=None, error=str(exc))
+            results.append(result)
+            continue
+        result.update(raw=text, usage=usage, seconds=round(seconds, 3))
+        try:
+            result["decision"] = parse_decision(text)
+            result["status"] = "ok"
+        except Exception as exc:
+            result.update(status="invalid", error=str(exc))
+        results.append(result)
+    return results
+
+
+def _median(values):
+    values = [value for value in values if value is not None]
+    return statistics.median(values) if values else None
+
+
+def combine_decisions(results, min_agreement=0.5):
+    """
+    (decision, stats) from the parsed samples; decision is None when none parsed.
+    A BUY/SELL backed by less than `min_agreement` of the samples becomes a HOLD.
+    """
+    votes = [result for result in results if result["decision"] is not None]
+    stats = {
+        "samples": len(results),
+        "parsed": len(votes),
+        "actions": dict(Counter(result["decision"]["action"] for result in votes)),
+        "seconds": [result["seconds"] for result in results],
+    }
+    if not votes:
+        return None, dict(stats, agreement=0.0)
+
+    ranked = Counter(result["decision"]["action"] for result in votes).most_common()
+    tied = [action for action, count in ranked if count == ranked[0][1]]
+    action = tied[0] if len(tied) == 1 else "HOLD"
+    same_action = [result for result in votes if result["decision"]["action"] == action]
+    symbols = Counter(result["decision"]["symbol"] for result in same_action).most_common()
+    symbol = symbols[0][0] if symbols else None
+    agreeing = [result for result in same_action if result["decision"]["symbol"] == symbol]
+    # Samples that failed or timed out count as disagreeing
+    agreement = len(agreeing) / len(results)
+    stats.update(action=action, symbol=symbol, agreement=round(agreement, 3))
+
+    if action != "HOLD" and agreement < min_agreement:
+        stats["downgraded"] = action
+        action, symbol = "HOLD", None
+        agreeing = []
+
+    decisions = [result["decision"] for result in agreeing]
+    # Reason, reflection and evidence (and the logged raw answer) come from the first agreeing sample
+    stats["representative"] = (agreeing or votes)[0]["index"]
+    representative = results[stats["representative"]]["decision"]
+    decision = dict(representative)
+    decision.update(
+        action=action,
+        symbol=symbol,
+        notional=_median([item["notional"] for item in decisions]) if action != "HOLD" else None,
+        sl_price=_median([item["sl_price"] for item in decisions]),
+        tp_price=_median([item["tp_price"] for item in decisions]),
+        confidence=round(agreement if decisions else 0.0, 3),
+    )
+    stats["model_confidence"] = _median(
+        [item["confidence"] for item in decisions if isinstance(item["confidence"], (int, float))]
+    )
+    if not decisions:
+        decision["reason"] = f"Ensemble sans majorité ({stats['actions']}): {representative.get('reason', '')}"
+    return decision, stats
+
+
+def combined_usage(results):
+    """Summed token usage of the answered samples (one llm_usage event per ensemble)."""
+    usages = [result["usage"] for result in results if result["usage"]]
+    if not usages:
+        return None
+    usage = {key: sum(item.get(key) or 0 for item in usages) for key in USAGE_TOKEN_KEYS}
+    usage["model"] = usages[0].get("model")
+    usage["cache_hit_ratio"] = (
+        round(usage["cached_tokens"] / usage["prompt_tokens"], 3) if usage["prompt_tokens"] else None
+    )
+    usage["latency_seconds"] = max(item.get("latency_seconds") or 0 for item in usages)
+    usage["samples"] = len(usages)
+    return usage
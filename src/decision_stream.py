@@ -0,0 +1,89 @@
+import threading
+import time
+
+from decision import IncrementalJSONParser, early_decision
+
+
+class DecisionStream:
+    """
+    Streams one LLM decision in a background thread.
+
+    The answer is fed to an IncrementalJSONParser as it arrives: `wait_early()`
+    returns as soon as the execution fields (action, symbol, notional, SL/TP)
+    are complete and valid, while the reason/reflection text keeps streaming;
+    `wait()` returns the full text. The stream is cut at `deadline_seconds`.
+    """
+
+    def __init__(self, llm, system_prompt, user_prompt, history=None, deadline_seconds=45):
+        self.llm = llm
+        self.system_prompt = system_prompt
+        self.user_prompt = user_prompt
+        self.history = history
+        self.deadline_seconds = deadline_seconds
+        self.parser = IncrementalJSONParser()
+        self.early = None
+        self.early_seconds = None
+        self.raw = None
+        self.error = None
+        self._started = None
+        self._early_ready = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def fields(self):
+        return self.parser.fields
+
+    @property
+    def partial(self):
+        return self.parser.text
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="llm-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def _on_text(self, chunk):
+        fields = self.parser.feed(chunk)
+        if self.early is None:
+            decision = early_decision(fields)
+            if decision is not None:
+                self.early = decision
+                self.early_seconds = round(time.perf_counter() - self._started, 3)
+                self._early_ready.set()
+
+    def _run(self):
+        try:
+            self.raw = self.llm.decide_stream(
+                self.system_prompt,
+                self.user_prompt,
+                history=self.history,
+                on_text=self._on_text,
+                deadline_seconds=self.deadline_seconds,
+            )
+        except Exception as exc:
+            self.error = exc
+        finally:
+            self._done.set()
+            self._early_ready.set()
+
+    def _timeout(self):
+        # Backup in case the client ignores the deadline: a little past it
+        if not self.deadline_seconds:
+            return None
+        elapsed = time.perf_counter() - self._started
+        return max(0.0, self.deadline_seconds + 5 - elapsed)
+
+    def wait_early(self):
+        """The early decision, or None when the stream ended (or failed) without one."""
+        self._early_ready.wait(self._timeout())
+        return self.early
+
+    def wait(self):
+        """Full answer text; raises the stream's error (LLMDeadlineExceeded on deadline)."""
+        if not self._done.wait(self._timeout()):
+            raise TimeoutError(f"LLM stream still running after its {self.deadline_seconds}s deadline")
+        if self.error is not None:
+            raise self.error
+        return self.raw
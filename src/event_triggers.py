@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import deque
+
+
+class EventTriggerEngine:
+    """
+    Out-of-cycle decision triggers, evaluated on every price refresh tick.
+
+    - position_move: a position moved `position_atr_multiple` x ATR since the last decision.
+    - gap: a watchlist symbol trades `gap_pct` % away from its previous close.
+    - volume_spike: a watchlist symbol's session volume reaches `volume_spike_ratio`
+      x its 20-day average.
+
+    Gaps and volume spikes fire once per symbol and day. A fired trigger sets
+    `wake` so the decision loop runs early, as long as the LLM budget
+    (`max_llm_calls_per_hour`, scheduled calls included) and the
+    `cooldown_minutes` of that symbol and kind allow it; otherwise it is reported as suppressed.
+    """
+
+    def __init__(
+        self,
+        position_atr_multiple=1.5,
+        gap_pct=3.0,
+        volume_spike_ratio=3.0,
+        max_llm_calls_per_hour=6,
+        cooldown_minutes=15,
+        clock=time.time,
+    ):
+        self.position_atr_multiple = float(position_atr_multiple)
+        self.gap_pct = float(gap_pct)
+        self.volume_spike_ratio = float(volume_spike_ratio)
+        self.max_llm_calls_per_hour = int(max_llm_calls_per_hour)
+        self.cooldown_seconds = float(cooldown_minutes) * 60
+        self.clock = clock
+        self.wake = threading.Event()
+        self._lock = threading.Lock()
+        self._anchors = {}  # symbol -> price at the last decision
+        self._seen = {}  # (kind, symbol) -> day it last fired or was suppressed
+        self._last_fired = {}  # (kind, symbol) -> clock
+        self._llm_calls = deque()
+        self._pending = []
+        self.fired_total = 0
+        self.suppressed_total = 0
+
+    # -- LLM budget -----------------------------------------------------------
+
+    def record_llm_call(self):
+        with self._lock:
+            self._llm_calls.append(self.clock())
+
+    def _calls_last_hour(self, now):
+        while self._llm_calls and now - self._llm_calls[0] > 3600:
+            self._llm_calls.popleft()
+        return len(self._llm_calls)
+
+    def mark_decision(self, prices):
+        """
+        Called after each decision: position moves are measured from these prices and
+        triggers that fired while the cycle ran are dropped (the decision saw them).
+        """
+        with self._lock:
+            self._anchors = {symbol: price for symbol, price in prices.items() if price}
+            self._pending = []
+            self.wake.clear()
+
+    # -- evaluation -----------------------------------------------------------
+
+    def _candidates(self, positions, watchlist_quotes, day):
+        candidates = []
+        for symbol, position in positions.items():
+            price, atr = position.get("price"), position.get("atr")
+            if not price:
+                continue
+            anchor = self._anchors.setdefault(symbol, price)
+            if atr and abs(price - anchor) >= self.position_atr_multiple * atr:
+                candidates.append({
+                    "kind": "position_move",
+                    "symbol": symbol,
+                    "price": price,
+                    "anchor": anchor,
+                    "atr_multiple": round(abs(price - anchor) / atr, 2),
+                })
+        for symbol, quote in watchlist_quotes.items():
+            if not isinstance(quote, dict) or not quote.get("price"):
+                continue
+            price, prev_close = quote["price"], quote.get("prev_close")
+            if prev_close:
+                gap_pct = (price / prev_close - 1) * 100
+                if abs(gap_pct) >= self.gap_pct and self._seen.get(("gap", symbol)) != day:
+                    candidates.append({
+                        "kind": "gap",
+                        "symbol": symbol,
+                        "price": price,
+                        "prev_close": prev_close,
+                        "gap_pct": round(gap_pct, 2),
+                    })
+            ratio = quote.get("volume_ratio")
+            if ratio and ratio >= self.volume_spike_ratio and self._seen.get(("volume_spike", symbol)) != day:
+                candidates.append({"kind": "volume_spike", "symbol": symbol, "price": price, "volume_ratio": ratio})
+        return candidates
+
+    def evaluate(self, positions, watchlist_quotes, day):
+        """
+        `positions`: symbol -> {"price", "atr"}; `watchlist_quotes`: symbol -> market data
+        (price, prev_close, volume_ratio). Returns (fired, suppressed) trigger lists.
+        """
+        fired = []
+        suppressed = []
+        with self._lock:
+            now = self.clock()
+            for trigger in self._candidates(positions, watchlist_quotes, day):
+                key = (trigger["kind"], trigger["symbol"])
+                last = self._last_fired.get(key)
+                if last is not None and now - last < self.cooldown_seconds:
+                    continue
+                self._last_fired[key] = now
+                self._seen[key] = day
+                # Triggers joining an already pending wake-up share its LLM call
+                if self._pending or fired or self._calls_last_hour(now) < self.max_llm_calls_per_hour:
+                    fired.append(trigger)
+                else:
+                    suppressed.append(trigger)
+            if fired:
+                self._pending.extend(fired)
+                self.wake.set()
+            self.fired_total += len(fired)
+            self.suppressed_total += len(suppressed)
+        return fired, suppressed
+
+    def take(self):
+        """Pending triggers (and clears them)."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self.wake.clear()
+        return pending
+
+    def stats(self):
+        with self._lock:
+            calls = self._calls_last_hour(self.clock())
+        return {
+            "llm_calls_last_hour": calls,
+            "max_llm_calls_per_hour": self.max_llm_calls_per_hour,
+            "fired_total": self.fired_total,
+            "suppressed_total": self.suppressed_total,
+        }
+
+
+def build_trigger_engine(config):
+    """Returns an EventTriggerEngine from `trading.event_triggers`, or None when disabled."""
+    triggers_cfg = config["trading"].get("event_triggers") or {}
+    if not triggers_cfg.get("enabled"):
+        return None
+    return EventTriggerEngine(
+        position_atr_multiple=triggers_cfg.get("position_atr_multiple", 1.5),
+        gap_pct=triggers_cfg.get("gap_pct", 3.0),
+        volume_spike_ratio=triggers_cfg.get("volume_spike_ratio", 3.0),
+        max_llm_calls_per_hour=triggers_cfg.get("max_llm_calls_per_hour", 6),
+        cooldown_minutes=triggers_cfg.get("cooldown_minutes", 15),
+    )
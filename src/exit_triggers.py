@@ -0,0 +1,135 @@
+from datetime import datetime, timezone
+
+
+class ExitTriggerIndex:
+    """
+    SL/TP triggers keyed by symbol.
+
+    Each position keeps its effective stop (SL or trailing stop, whichever is
+    higher) and its target, so a streamed trade only checks its own symbol.
+    Levels stay armed until the position changes, which keeps the old "retry
+    every tick until the exit goes through" behavior.
+    """
+
+    def __init__(self, trail_pct=None):
+        self.trail_pct = trail_pct
+        self._entries = {}  # symbol -> position entry
+        self._suppressed = {}  # (symbol, trigger) -> datetime (UTC)
+
+    def __len__(self):
+        return len(self._entries)
+
+    # -- position bookkeeping -------------------------------------------------
+
+    def upsert(self, symbol, qty, sl=None, tp=None, trail_pct=None, anchor=None):
+        """Add or update one position. The entry is only rebuilt when something changed."""
+        trail = trail_pct if trail_pct is not None else self.trail_pct
+        existing = self._entries.get(symbol)
+        if (
+            existing is not None
+            and existing["qty"] == qty
+            and existing["sl"] == sl
+            and existing["tp"] == tp
+            and existing["trail_pct"] == trail
+        ):
+            return
+        if qty is None or qty <= 0:
+            self.remove(symbol)
+            return
+        high_water = anchor
+        if existing is not None and existing["high_water"] is not None:
+            high_water = max(existing["high_water"], anchor or existing["high_water"])
+        entry = {
+            "qty": qty,
+            "sl": sl,
+            "tp": tp,
+            "trail_pct": trail,
+            "high_water": high_water,
+            "stop": None,
+        }
+        entry["stop"] = self._effective_stop(entry)
+        self._entries[symbol] = entry
+
+    def remove(self, symbol):
+        self._entries.pop(symbol, None)
+
+    def sync(self, positions):
+        """Align the index with a snapshot `positions` dict (symbol -> info)."""
+        for symbol in list(self._entries):
+            if symbol not in positions:
+                self.remove(symbol)
+        for symbol, info in positions.items():
+            self.upsert(
+                symbol,
+                info.get("qty", 0.0),
+                sl=info.get("sl"),
+                tp=info.get("tp"),
+                trail_pct=info.get("trail_pct"),
+                anchor=info.get("avg_entry"),
+            )
+
+    def stop_level(self, symbol):
+        """Effective stop of `symbol` (SL or trailing stop, whichever is higher), or None."""
+        entry = self._entries.get(symbol)
+        return entry["stop"] if entry else None
+
+    def _effective_stop(self, entry):
+        stop = entry["sl"]
+        trail = entry["trail_pct"]
+        if trail and entry["high_water"] is not None:
+            trailing = entry["high_water"] * (1 - float(trail) / 100.0)
+            stop = trailing if stop is None else max(stop, trailing)
+        return stop
+
+    # -- same-day suppression ---------------------------------------------------
+
+    def suppress(self, symbol, trigger_type, until):
+        self._suppressed[(symbol, trigger_type)] = until
+
+    def is_suppressed(self, symbol, trigger_type, now=None):
+        key = (symbol, trigger_type)
+        until = self._suppressed.get(key)
+        if until is None:
+            return False
+        if (now or datetime.now(timezone.utc)) < until:
+            return True
+        self._suppressed.pop(key, None)
+        return False
+
+    # -- price updates ----------------------------------------------------------
+
+    def on_price(self, symbol, price, now=None):
+        """Feed one price update. Returns the trigger it crossed (SL first), if any."""
+        entry = self._entries.get(symbol)
+        if entry is None or price is None:
+            return []
+
+        if entry["trail_pct"] and (entry["high_water"] is None or price > entry["high_water"]):
+            entry["high_water"] = price
+            entry["stop"] = self._effective_stop(entry)
+
+        if entry["stop"] is not None and price <= entry["stop"]:
+            trigger_type = "SL"
+        elif entry["tp"] is not None and price >= entry["tp"]:
+            trigger_type = "TP"
+        else:
+            return []
+        if self.is_suppressed(symbol, trigger_type, now):
+            return []
+        return [
+            {
+                "symbol": symbol,
+                "qty": entry["qty"],
+                "price": price,
+                "trigger": trigger_type,
+                "sl": entry["stop"],
+                "tp": entry["tp"],
+            }
+        ]
+
+    def on_prices(self, updates, now=None):
+        """Feed a batch of (symbol, price) updates; triggers come back in update order."""
+        triggers = []
+        for symbol, price in updates:
+            triggers.extend(self.on_price(symbol, price, now=now))
+        return triggers
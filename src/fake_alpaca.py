@@ -0,0 +1,440 @@
+"""
+Local stand-in for the subset of the Alpaca Trading REST API the bot uses.
+
+Run it, then point the bot at it:
+
+    python3 src/fake_alpaca.py --port 8765
+    ALPACA_URL_OVERRIDE=http://127.0.0.1:8765 ALPACA_API_KEY=x ALPACA_SECRET_KEY=y python3 src/main.py
+
+Prices are set through `POST /_fake/price {"symbol": "AAPL", "price": 190.5}`;
+every price update fills resting stop/limit SELL orders the way the exchange
+would (an OCO fill cancels its sibling leg). `GET /_fake/state` dumps everything.
+"""
+
+import argparse
+import json
+import threading
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+OPEN_STATUSES = {"new", "accepted", "held", "partially_filled", "pending_cancel", "pending_replace"}
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FakeAlpacaState:
+    def __init__(self, cash=1000.0, default_price=100.0):
+        self.lock = threading.RLock()
+        self.account_id = str(uuid.uuid4())
+        self.cash = float(cash)
+        self.default_price = float(default_price)
+        self.prices = {}
+        self.positions = {}  # symbol -> {"qty", "avg_entry", "asset_id"}
+        self.orders = {}  # id -> order dict (legs stored as ids)
+        self.request_count = 0
+
+    # -- helpers ----------------------------------------------------------------
+
+    def price(self, symbol):
+        return self.prices.get(symbol, self.default_price)
+
+    def _held_qty(self, symbol, exclude_id=None):
+        held = 0.0
+        for order in self.orders.values():
+            if order["symbol"] != symbol or order["side"] != "sell" or order["id"] == exclude_id:
+                continue
+            if order["status"] in OPEN_STATUSES and order.get("parent_id") is None:
+                held += float(order["qty"] or 0)
+        return held
+
+    def _new_order(self, body, status="new", parent_id=None):
+        order_id = str(uuid.uuid4())
+        timestamp = _now()
+        order = {
+            "id": order_id,
+            "client_order_id": body.get("client_order_id") or str(uuid.uuid4()),
+            "created_at": timestamp,
+            "updated_at": timestamp,
+            "submitted_at": timestamp,
+            "filled_at": None,
+            "canceled_at": None,
+            "asset_id": self.positions.get(body["symbol"], {}).get("asset_id") or str(uuid.uuid4()),
+            "symbol": body["symbol"],
+            "asset_class": "us_equity",
+            "notional": body.get("notional"),
+            "qty": body.get("qty"),
+            "filled_qty": "0",
+            "filled_avg_price": None,
+            "order_class": body.get("order_class") or "simple",
+            "order_type": body.get("type", "market"),
+            "type": body.get("type", "market"),
+            "side": body.get("side"),
+            "time_in_force": body.get("time_in_force", "day"),
+            "limit_price": body.get("limit_price"),
+            "stop_price": body.get("stop_price"),
+            "status": status,
+            "extended_hours": False,
+            "parent_id": parent_id,
+            "legs": [],
+        }
+        self.orders[order_id] = order
+        return order
+
+    def _fill(self, order, price):
+        symbol = order["symbol"]
+        if order["side"] == "buy":
+            notional = float(order["notional"]) if order.get("notional") else float(order["qty"]) * price
+            qty = notional / price
+            position = self.positions.setdefault(
+                symbol, {"qty": 0.0, "avg_entry": price, "asset_id": order["asset_id"]}
+            )
+            total = position["qty"] + qty
+            position["avg_entry"] = (position["qty"] * position["avg_entry"] + qty * price) / total
+            position["qty"] = total
+            self.cash -= notional
+        else:
+            position = self.positions.get(symbol)
+            if position is None:
+                order["status"] = "canceled"
+                return
+            qty = min(float(order["qty"]), position["qty"])
+            position["qty"] -= qty
+            self.cash += qty * price
+            if position["qty"] <= 1e-9:
+                self.positions.pop(symbol, None)
+        order["status"] = "filled"
+        order["filled_qty"] = str(qty)
+        order["filled_avg_price"] = str(price)
+        order["filled_at"] = _now()
+        order["updated_at"] = order["filled_at"]
+
+    def _cancel(self, order):
+        if order["status"] not in OPEN_STATUSES:
+            return False
+        order["status"] = "canceled"
+        order["canceled_at"] = _now()
+        order["updated_at"] = order["canceled_at"]
+        for leg_id in order["legs"]:
+            self._cancel(self.orders[leg_id])
+        return True
+
+    def _family(self, order):
+        root = self.orders[order["parent_id"]] if order.get("parent_id") else order
+        return [root] + [self.orders[leg_id] for leg_id in root["legs"]]
+
+    def set_price(self, symbol, price):
+        """Update a price and fill any resting SELL stop/limit orders it crosses."""
+        with self.lock:
+            self.prices[symbol] = float(price)
+            for order in list(self.orders.values()):
+                if order["symbol"] != symbol or order["side"] != "sell":
+                    continue
+                if order["status"] not in OPEN_STATUSES:
+                    continue
+                hit = False
+                if order["type"] == "stop" and price <= float(order["stop_price"]):
+                    hit = True
+                elif order["type"] == "limit" and price >= float(order["limit_price"]):
+                    hit = True
+                if not hit:
+                    continue
+                self._fill(order, float(price))
+                for sibling in self._family(order):
+                    if sibling["id"] != order["id"]:
+                        self._cancel(sibling)
+
+    # -- REST views ---------------------------------------------------------------
+
+    def account_view(self):
+        positions_value = sum(p["qty"] * self.price(s) for s, p in self.positions.items())
+        equity = self.cash + positions_value
+        return {
+            "id": self.account_id,
+            "account_number": "FAKE0001",
+            "status": "ACTIVE",
+            "currency": "USD",
+            "cash": f"{self.cash:.2f}",
+            "buying_power": f"{max(self.cash, 0.0):.2f}",
+            "regt_buying_power": f"{max(self.cash, 0.0):.2f}",
+            "daytrading_buying_power": "0",
+            "non_marginable_buying_power": f"{max(self.cash, 0.0):.2f}",
+            "portfolio_value": f"{equity:.2f}",
+            "equity": f"{equity:.2f}",
+            "last_equity": f"{equity:.2f}",
+            "long_market_value": f"{positions_value:.2f}",
+            "short_market_value": "0",
+            "initial_margin": "0",
+            "maintenance_margin": "0",
+            "last_maintenance_margin": "0",
+            "sma": "0",
+            "multiplier": "1",
+            "daytrade_count": 0,
+            "pattern_day_trader": False,
+            "trading_blocked": False,
+            "transfers_blocked": False,
+            "account_blocked": False,
+            "trade_suspended_by_user": False,
+            "shorting_enabled": False,
+            "created_at": _now(),
+        }
+
+    def position_view(self, symbol, position):
+        price = self.price(symbol)
+        qty = position["qty"]
+        cost_basis = qty * position["avg_entry"]
+        market_value = qty * price
+        unrealized = market_value - cost_basis
+        return {
+            "asset_id": position["asset_id"],
+            "symbol": symbol,
+            "exchange": "NASDAQ",
+            "asset_class": "us_equity",
+            "avg_entry_price": str(position["avg_entry"]),
+            "qty": str(qty),
+            "qty_available": str(max(qty - self._held_qty(symbol), 0.0)),
+            "side": "long",
+            "market_value": str(market_value),
+            "cost_basis": str(cost_basis),
+            "unrealized_pl": str(unrealized),
+            "unrealized_plpc": str(unrealized / cost_basis if cost_basis else 0.0),
+            "unrealized_intraday_pl": str(unrealized),
+            "unrealized_intraday_plpc": str(unrealized / cost_basis if cost_basis else 0.0),
+            "current_price": str(price),
+            "lastday_price": str(price),
+            "change_today": "0",
+        }
+
+    def order_view(self, order, nested=True):
+        view = {key: value for key, value in order.items() if key != "parent_id"}
+        for key in ("qty", "limit_price", "stop_price", "notional"):
+            if view.get(key) is not None:
+                view[key] = str(view[key])
+        view["legs"] = [self.order_view(self.orders[leg_id]) for leg_id in order["legs"]] if nested else None
+        return view
+
+    # -- operations -----------------------------------------------------------------
+
+    def submit_order(self, body):
+        with self.lock:
+            symbol = body["symbol"]
+            side = body.get("side")
+            order_class = body.get("order_class") or "simple"
+            if side == "sell" and symbol not in self.positions:
+                return 403, {"code": 40310000, "message": "insufficient qty available for order (requested: 0, available: 0)"}
+            if side == "sell":
+                available = self.positions[symbol]["qty"] - self._held_qty(symbol)
+                if float(body.get("qty") or 0) > available + 1e-9:
+                    return 403, {
+                        "code": 40310000,
+                        "message": f"insufficient qty available for order (requested: {body.get('qty')}, available: {available})",
+                        "held_for_orders": str(self._held_qty(symbol)),
+                    }
+            if order_class == "oco":
+                take_profit = body.get("take_profit") or {}
+                stop_loss = body.get("stop_loss") or {}
+                parent = self._new_order(
+                    dict(body, type="limit", limit_price=take_profit.get("limit_price", body.get("limit_price")))
+                )
+                leg = self._new_order(
+                    dict(
+                        body,
+                        type="stop",
+                        stop_price=stop_loss.get("stop_price"),
+                        limit_price=None,
+                        client_order_id=None,
+                    ),
+                    status="held",
+                    parent_id=parent["id"],
+                )
+                parent["legs"].append(leg["id"])
+                return 200, self.order_view(parent)
+            order = self._new_order(body)
+            if order["type"] == "market":
+                self._fill(order, self.price(symbol))
+            return 200, self.order_view(order)
+
+    def list_orders(self, query):
+        with self.lock:
+            status = (query.get("status") or ["open"])[0]
+            side = (query.get("side") or [None])[0]
+            symbols = None
+            if query.get("symbols"):
+                symbols = set(query["symbols"][0].split(","))
+            nested = (query.get("nested") or ["false"])[0].lower() == "true"
+            results = []
+            for order in self.orders.values():
+                if nested and order.get("parent_id"):
+                    continue
+                is_open = order["status"] in OPEN_STATUSES
+                if status == "open" and not is_open:
+                    continue
+                if status == "closed" and is_open:
+                    continue
+                if side and order["side"] != side:
+                    continue
+                if symbols and order["symbol"] not in symbols:
+                    continue
+                results.append(self.order_view(order, nested=nested))
+            return 200, results
+
+    def cancel_order(self, order_id):
+        with self.lock:
+            order = self.orders.get(order_id)
+            if order is None:
+                return 404, {"code": 40410000, "message": "order not found"}
+            if not self._cancel(order):
+                return 422, {"code": 42210000, "message": "order is not cancelable"}
+            if order.get("parent_id"):
+                self._cancel(self.orders[order["parent_id"]])
+            return 204, None
+
+    def replace_order(self, order_id, body):
+        with self.lock:
+            order = self.orders.get(order_id)
+            if order is None or order["status"] not in OPEN_STATUSES:
+                return 422, {"code": 42210000, "message": "order is not replaceable"}
+            for key in ("qty", "limit_price", "stop_price", "time_in_force"):
+                if body.get(key) is not None:
+                    order[key] = body[key]
+            order["updated_at"] = _now()
+            return 200, self.order_view(order)
+
+    def close_position(self, symbol):
+        with self.lock:
+            position = self.positions.get(symbol)
+            if position is None:
+                return 404, {"code": 40410000, "message": "position not found"}
+            held = self._held_qty(symbol)
+            if held > 0:
+                return 403, {
+                    "code": 40310000,
+                    "message": f"insufficient qty available for order (requested: {position['qty']}, available: 0)",
+                    "held_for_orders": str(held),
+                }
+            order = self._new_order(
+                {"symbol": symbol, "qty": position["qty"], "side": "sell", "type": "market"}
+            )
+            self._fill(order, self.price(symbol))
+            return 200, self.order_view(order)
+
+    def close_all(self):
+        with self.lock:
+            results = []
+            for order in list(self.orders.values()):
+                self._cancel(order)
+            for symbol in list(self.positions):
+                status, body = self.close_position(symbol)
+                results.append({"symbol": symbol, "status": status, "body": body})
+            return 207, results
+
+    def dump(self):
+        with self.lock:
+            return {
+                "cash": self.cash,
+                "prices": self.prices,
+                "positions": self.positions,
+                "orders": [self.order_view(o) for o in self.orders.values() if not o.get("parent_id")],
+                "request_count": self.request_count,
+            }
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status, body):
+            self.send_response(status)
+            if body is None:
+                self.end_headers()
+                return
+            payload = json.dumps(body).encode()
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if not length:
+                return {}
+            return json.loads(self.rfile.read(length))
+
+        def _route(self, method):
+            url = urlparse(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            query = parse_qs(url.query)
+            if parts[:1] == ["_fake"]:
+                if method == "POST" and parts[1:] == ["price"]:
+                    body = self._body()
+                    state.set_price(body["symbol"], float(body["price"]))
+                    return self._send(200, {"ok": True})
+                if method == "GET" and parts[1:] == ["state"]:
+                    return self._send(200, state.dump())
+                return self._send(404, {"message": "unknown fake endpoint"})
+
+            state.request_count += 1
+            if parts[:1] != ["v2"]:
+                return self._send(404, {"message": "not found"})
+            resource = parts[1:]
+            if method == "GET" and resource == ["account"]:
+                with state.lock:
+                    return self._send(200, state.account_view())
+            if method == "GET" and resource == ["positions"]:
+                with state.lock:
+                    return self._send(
+                        200, [state.position_view(s, p) for s, p in state.positions.items()]
+                    )
+            if method == "DELETE" and resource == ["positions"]:
+                return self._send(*state.close_all())
+            if method == "DELETE" and len(resource) == 2 and resource[0] == "positions":
+                return self._send(*state.close_position(resource[1]))
+            if method == "GET" and resource == ["orders"]:
+                return self._send(*state.list_orders(query))
+            if method == "POST" and resource == ["orders"]:
+                return self._send(*state.submit_order(self._body()))
+            if method == "DELETE" and len(resource) == 2 and resource[0] == "orders":
+                return self._send(*state.cancel_order(resource[1]))
+            if method == "PATCH" and len(resource) == 2 and resource[0] == "orders":
+                return self._send(*state.replace_order(resource[1], self._body()))
+            return self._send(404, {"message": f"unsupported {method} {url.path}"})
+
+        def do_GET(self):
+            self._route("GET")
+
+        def do_POST(self):
+            self._route("POST")
+
+        def do_DELETE(self):
+            self._route("DELETE")
+
+        def do_PATCH(self):
+            self._route("PATCH")
+
+    return Handler
+
+
+def start_fake_alpaca(host="127.0.0.1", port=0, cash=1000.0):
+    """Starts the stand-in on a daemon thread. Returns (server, state, base_url)."""
+    state = FakeAlpacaState(cash=cash)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    return server, state, base_url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Alpaca REST stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cash", type=float, default=1000.0)
+    args = parser.parse_args()
+    fake_state = FakeAlpacaState(cash=args.cash)
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(fake_state))
+    print(f"🦙 Fake Alpaca listening on http://{args.host}:{args.port}")
+    httpd.serve_forever()
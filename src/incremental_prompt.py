@@ -0,0 +1,129 @@
+"""
+Incremental prompting: only what changed since the previous LLM cycle.
+
+A full prompt opens a conversation. The next cycles append a short update to
+that conversation (after the model's previous answers) listing only the
+changed sections, the changed rows of the tables and the new lines of the
+news, memory and event sections. A full resync starts a new conversation
+every `resync_cycles` cycles, on a new day and after a failed cycle.
+"""
+
+from prompt_builder import count_tokens
+
+# Sections compared line by line: only the lines not sent before are new
+APPEND_ONLY_SECTIONS = {"live_context", "decision_memory", "recent_events"}
+# Pipe tables keyed by their first column: only new or changed rows are sent
+TABLE_SECTIONS = {"positions", "watchlist"}
+
+
+def _table_delta(previous, current):
+    """Header + rows (keyed by the first column) that are new or changed, and the removed keys."""
+    previous_rows = {line.split(" | ", 1)[0]: line for line in previous.splitlines()[1:]}
+    lines = current.splitlines()
+    current_rows = {line.split(" | ", 1)[0]: line for line in lines[1:]}
+    changed = [line for key, line in current_rows.items() if previous_rows.get(key) != line]
+    removed = [key for key in previous_rows if key not in current_rows]
+    return ([lines[0]] + changed if changed else []), removed
+
+
+class IncrementalContext:
+    """Conversation state kept between cycles by the long-running loop."""
+
+    def __init__(self, resync_cycles=6):
+        self.resync_cycles = max(1, int(resync_cycles))
+        self.reset()
+
+    def reset(self):
+        """Next cycle sends the full prompt in a new conversation."""
+        self._sections = None  # name -> (title, text) last sent
+        self._history = []
+        self._cycles = 0
+        self._day = None
+        self._pending = None
+        self._pending_prompt = None
+
+    def _needs_resync(self, day):
+        return self._sections is None or self._cycles >= self.resync_cycles or day != self._day
+
+    def prepare(self, sections, full_prompt, day):
+        """
+        `sections`: [(name, title, text)] of the full prompt. Returns (history, user_prompt, stats):
+        the messages to replay before `user_prompt` and the tokens sent vs the full prompt.
+        """
+        full_tokens = count_tokens(full_prompt)
+        if self._needs_resync(day):
+            self.reset()
+            self._day = day
+            user_prompt = full_prompt
+            mode = "full"
+        else:
+            user_prompt = self._delta(sections)
+            mode = "delta"
+        self._pending = {name: (title, text) for name, title, text in sections}
+        self._pending_prompt = user_prompt
+        sent_tokens = count_tokens(user_prompt)
+        history = list(self._history)
+        stats = {
+            "mode": mode,
+            "cycle": self._cycles,
+            "full_tokens": full_tokens,
+            "sent_tokens": sent_tokens,
+            "history_tokens": sum(count_tokens(message["content"]) for message in history),
+            "saved_pct": round((1 - sent_tokens / max(full_tokens, 1)) * 100, 1),
+        }
+        return history, user_prompt, stats
+
+    def record(self, raw_reply):
+        """Adds this cycle's prompt and the model's answer to the conversation."""
+        self._history += [
+            {"role": "user", "content": self._pending_prompt},
+            {"role": "assistant", "content": raw_reply},
+        ]
+        self._sections = self._pending
+        self._cycles += 1
+
+    def _delta(self, sections):
+        unchanged = []
+        parts = []
+        current_names = {name for name, _, _ in sections}
+        for name, title, text in sections:
+            label = title or name
+            previous = self._sections.get(name)
+            if previous is not None and previous[1] == text:
+                unchanged.append(name)
+                continue
+            if previous is None:
+                parts.append(f"{label} (new):\n{text}" if title else text)
+            elif name in TABLE_SECTIONS and " | " in text and " | " in previous[1]:
+                rows, removed = _table_delta(previous[1], text)
+                body = "\n".join(rows)
+                if removed:
+                    body = (body + "\n" if body else "") + f"removed: {', '.join(removed)}"
+                parts.append(f"{label} (changed rows):\n{body}")
+            elif name in APPEND_ONLY_SECTIONS:
+                seen = set(previous[1].splitlines())
+                new_lines = [line for line in text.splitlines() if line.strip() and line not in seen]
+                if not new_lines:
+                    unchanged.append(name)
+                    continue
+                parts.append(f"{label} (new items):\n" + "\n".join(new_lines))
+            else:
+                parts.append(f"{label}:\n{text}" if title else text)
+        dropped = [name for name in self._sections if name not in current_names]
+        header = (
+            f"INCREMENTAL UPDATE ({self._cycles} cycle(s) since the full context): only changes are listed, "
+            "everything else is as in the previous messages.\n"
+            f"Unchanged: {', '.join(unchanged) or 'none'}."
+        )
+        if dropped:
+            header += f"\nNo longer present: {', '.join(dropped)}."
+        footer = "Decide your next action. Return valid JSON only, matching the required schema."
+        return "\n\n".join([header] + parts + [footer]) + "\n"
+
+
+def build_incremental_context(config):
+    """Returns an IncrementalContext from `prompt.incremental`, or None when disabled."""
+    incremental_cfg = config.get("prompt", {}).get("incremental") or {}
+    if not incremental_cfg.get("enabled"):
+        return None
+    return IncrementalContext(resync_cycles=incremental_cfg.get("resync_cycles", 6))
@@ -5,18 +5,69 @@ class LiveSearchUnavailable(RuntimeError):
     pass
 
 
-def fetch_live_context(query, model, api_key=None, max_sources=None):
+class RestLiveSearchClient:
+    """
+    Live search over xAI's OpenAI-compatible REST API (chat completions with
+    `search_parameters`), e.g. the local llm_stub_server.py.
+    """
+
+    def __init__(self, api_key, base_url, timeout=None, max_retries=2):
+        try:
+            from openai import OpenAI
+        except ImportError as exc:
+            raise LiveSearchUnavailable("Missing openai package") from exc
+        self.base_url = base_url
+        self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=max_retries)
+
+    def search(self, query, model, max_sources=None):
+        search_parameters = {"mode": "on", "return_citations": True}
+        if max_sources is not None:
+            search_parameters["max_search_results"] = int(max_sources)
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": query}],
+            extra_body={"search_parameters": search_parameters},
+        )
+        return response.choices[0].message.content
+
+
+def create_live_search_client(api_key=None, timeout=None, backend="sdk", base_url=None):
+    """
+    Builds a live search client that can be reused across queries and cycles: an
+    xAI SDK client (one gRPC channel), or a RestLiveSearchClient for backend "rest".
+    """
     key = api_key or os.getenv("XAI_API_KEY")
     if not key:
         raise LiveSearchUnavailable("Missing XAI_API_KEY for live search")
+    if backend == "rest":
+        return RestLiveSearchClient(key, base_url or "https://api.x.ai/v1", timeout=timeout)
+    if backend != "sdk":
+        raise LiveSearchUnavailable(f"Unknown live_search.backend: {backend}")
     try:
         from xai_sdk import Client
+    except ImportError as exc:
+        raise LiveSearchUnavailable("Missing xai-sdk package") from exc
+    return Client(
+        api_key=key,
+        timeout=timeout,
+        channel_options=[
+            ("grpc.keepalive_time_ms", 30000),
+            ("grpc.keepalive_permit_without_calls", 1),
+        ],
+    )
+
+
+def fetch_live_context(query, model, api_key=None, max_sources=None, client=None):
+    if client is None:
+        client = create_live_search_client(api_key=api_key)
+    if isinstance(client, RestLiveSearchClient):
+        return client.search(query, model, max_sources=max_sources)
+    try:
         from xai_sdk.chat import user
         from xai_sdk.tools import web_search
     except ImportError as exc:
         raise LiveSearchUnavailable("Missing xai-sdk package") from exc
 
-    client = Client(api_key=key)
     search_tool = None
     if max_sources is not None:
         try:
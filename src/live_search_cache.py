@@ -1,62 +1,210 @@
+import hashlib
 import json
+import os
+import threading
+from collections import OrderedDict
 from datetime import datetime, timezone
 from pathlib import Path
 
+import metrics
 
-def read_cache(path):
-    cache_path = Path(path)
-    if not cache_path.exists():
-        return None
-    try:
-        data = json.loads(cache_path.read_text())
-    except json.JSONDecodeError:
-        return None
-    if not isinstance(data, dict):
-        return None
-    return data
 
+def query_key(query, model, max_sources=None):
+    """Cache key of one live search query: the same text, model and source cap share an entry."""
+    payload = json.dumps([" ".join(str(query).split()), model, max_sources])
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
 
-def is_cache_fresh(cache, cooldown_minutes):
-    if not cache:
-        return False
-    timestamp = cache.get("timestamp")
+
+def _age_seconds(entry):
+    timestamp = (entry or {}).get("timestamp")
     if not timestamp:
-        return False
+        return None
     try:
         ts = datetime.fromisoformat(timestamp)
     except ValueError:
-        return False
+        return None
     if ts.tzinfo is None:
         ts = ts.replace(tzinfo=timezone.utc)
-    age_seconds = (datetime.now(timezone.utc) - ts).total_seconds()
-    return age_seconds < float(cooldown_minutes) * 60
+    return (datetime.now(timezone.utc) - ts).total_seconds()
+
+
+def is_cache_fresh(entry, cooldown_minutes):
+    """True while a cache entry is younger than `cooldown_minutes`."""
+    age_seconds = _age_seconds(entry)
+    return age_seconds is not None and age_seconds < float(cooldown_minutes) * 60
+
+
+def _truncate(text, max_bytes):
+    """(text, truncated): cut to `max_bytes` of UTF-8, at the last line break that fits."""
+    data = str(text).encode("utf-8")
+    if len(data) <= max_bytes:
+        return text, False
+    cut = data[:max_bytes].decode("utf-8", errors="ignore")
+    line_end = cut.rfind("\n")
+    return (cut[:line_end] if line_end > 0 else cut).rstrip(), True
+
+
+def _entry_size(entry):
+    return len(json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+
 
+class LiveSearchCacheStore:
+    """
+    Per-query live search answers in one JSON file, bounded by LRU + TTL.
 
-def write_cache(path, context, queries):
-    cache_path = Path(path)
-    cache_path.parent.mkdir(parents=True, exist_ok=True)
-    existing = None
-    if cache_path.exists():
+    Entries are held in memory in least-recently-used order (an OrderedDict keyed
+    by query hash, so lookups and LRU moves are O(1)). `put` cuts the answer to
+    `max_context_bytes`; `flush` evicts the entries older than `max_age_minutes`,
+    then the least recently used ones until the store fits `max_entries` and
+    `max_bytes`, and rewrites the file atomically (temp file + rename). The file
+    is reloaded when another process changes it (e.g. reset_all.py).
+    """
+
+    def __init__(
+        self,
+        path,
+        max_entries=64,
+        max_bytes=512 * 1024,
+        max_context_bytes=16 * 1024,
+        max_age_minutes=24 * 60,
+    ):
+        self.path = Path(path)
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self.max_context_bytes = int(max_context_bytes)
+        self.max_age_minutes = float(max_age_minutes)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._signature = None
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.truncations = 0
+        self.writes = 0
+
+    def _file_signature(self):
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _sync(self):
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        self._entries.clear()
+        self._sizes.clear()
+        self._bytes = 0
+        self._signature = signature
+        if signature is None:
+            return
         try:
-            existing = json.loads(cache_path.read_text())
-        except json.JSONDecodeError:
-            existing = None
-    history = []
-    if isinstance(existing, dict):
-        history = existing.get("history", [])
-        if not isinstance(history, list):
-            history = []
-    entry = {
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "context": context,
-        "queries": queries,
-    }
-    history.append(entry)
-    history = history[-5:]
-    payload = {
-        "timestamp": entry["timestamp"],
-        "context": context,
-        "queries": queries,
-        "history": history,
-    }
-    cache_path.write_text(json.dumps(payload, indent=2))
+            data = json.loads(self.path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return
+        entries = data.get("entries") if isinstance(data, dict) else None
+        for key, entry in (entries or {}).items():
+            if isinstance(entry, dict) and entry.get("context") is not None:
+                self._insert(key, entry)
+
+    def _insert(self, key, entry):
+        if key in self._entries:
+            self._bytes -= self._sizes[key]
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._sizes[key] = _entry_size(entry)
+        self._bytes += self._sizes[key]
+
+    def _remove(self, key):
+        del self._entries[key]
+        self._bytes -= self._sizes.pop(key)
+
+    def get(self, key, ttl_minutes):
+        """The entry of `key` when younger than `ttl_minutes` (a hit), else None."""
+        with self._lock:
+            self._sync()
+            entry = self._entries.get(key)
+            fresh = entry is not None and is_cache_fresh(entry, ttl_minutes)
+            if fresh:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.inc("gat_cache_requests_total", cache="live_search", result="hit" if fresh else "miss")
+        return entry if fresh else None
+
+    def peek(self, key):
+        """The entry of `key` whatever its age (fallback answer), without counting a lookup."""
+        with self._lock:
+            self._sync()
+            return self._entries.get(key)
+
+    def put(self, key, query, context, fetch_seconds=None):
+        context, truncated = _truncate(context, self.max_context_bytes)
+        entry = {
+            "query": query,
+            "context": context,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "fetch_seconds": fetch_seconds,
+        }
+        if truncated:
+            entry["truncated"] = True
+        with self._lock:
+            self._sync()
+            self._insert(key, entry)
+            self.truncations += int(truncated)
+            self._dirty = True
+        return entry
+
+    def _evict(self):
+        for key in [key for key, entry in self._entries.items() if (_age_seconds(entry) or 0) > self.max_age_minutes * 60]:
+            self._remove(key)
+            self.expirations += 1
+        # Least recently used first, always keeping the most recent entry
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def flush(self):
+        """Applies the bounds and writes the file if anything changed. Returns True when written."""
+        with self._lock:
+            if not self._dirty:
+                return False
+            self._evict()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            payload = {"version": 2, "entries": self._entries}
+            temp_path = self.path.with_name(self.path.name + ".tmp")
+            temp_path.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+            os.replace(temp_path, self.path)
+            self._signature = self._file_signature()
+            self._dirty = False
+            self.writes += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "truncations": self.truncations,
+                "writes": self.writes,
+            }
+
+
+def build_live_search_store(live_search_cfg):
+    return LiveSearchCacheStore(
+        live_search_cfg.get("cache_path", "data/live_search_cache.json"),
+        max_entries=live_search_cfg.get("cache_max_entries", 64),
+        max_bytes=float(live_search_cfg.get("cache_max_kb", 512)) * 1024,
+        max_context_bytes=float(live_search_cfg.get("max_context_kb", 16)) * 1024,
+        max_age_minutes=float(live_search_cfg.get("cache_max_age_hours", 24)) * 60,
+    )
@@ -1,24 +1,487 @@
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-from openai import OpenAI
+import metrics
+from tracing import span
+
+# Called once per request sent to a provider (see set_request_hook)
+_request_hook = None
+
+
+def set_request_hook(callback):
+    """`callback()` runs for every request actually sent: ensemble samples, hedges and failovers included."""
+    global _request_hook
+    _request_hook = callback
+
+
+def _http_client(max_connections):
+    # Keep-alive pool shared by every call of this client. openai vendors its own
+    # httpx flavour in newer releases; fall back to its default pool in that case.
+    if not max_connections:
+        return None
+    try:
+        import httpx
+        from openai import DefaultHttpxClient
+    except ImportError:
+        return None
+    limits = httpx.Limits(
+        max_connections=int(max_connections),
+        max_keepalive_connections=int(max_connections),
+        keepalive_expiry=120,
+    )
+    return DefaultHttpxClient(limits=limits)
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """The streamed completion did not finish before its deadline; `partial` holds the text so far."""
+
+    def __init__(self, message, partial=""):
+        super().__init__(message)
+        self.partial = partial
+
+
+class CancelToken:
+    """
+    Lets another thread abort a streamed request: cancel() closes its HTTP
+    response, so the provider stops generating (and billing) its tokens.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stream = None
+        self.cancelled = False
+
+    def attach(self, stream):
+        with self._lock:
+            self._stream = stream
+            cancelled = self.cancelled
+        if cancelled:
+            stream.close()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            stream = self._stream
+        if stream is not None:
+            stream.close()
+
+
+def chat_messages(system_prompt, user_prompt, history=None):
+    messages = [{"role": "system", "content": system_prompt}]
+    messages += history or []
+    messages.append({"role": "user", "content": user_prompt})
+    return messages
+
+
+def usage_cost(usage, pricing):
+    """
+    (cost, savings) in USD of one call from `llm.pricing` (per million tokens);
+    savings = what the cached prompt tokens would have cost uncached. None without prices.
+    """
+    pricing = pricing or {}
+    input_price = pricing.get("input_per_million")
+    output_price = pricing.get("output_per_million")
+    if input_price is None or output_price is None:
+        return None, None
+    cached_price = pricing.get("cached_input_per_million")
+    if cached_price is None:
+        cached_price = input_price
+    cost = (
+        usage["uncached_tokens"] * input_price
+        + usage["cached_tokens"] * cached_price
+        + usage["completion_tokens"] * output_price
+    ) / 1_000_000
+    savings = usage["cached_tokens"] * (input_price - cached_price) / 1_000_000
+    return round(cost, 6), round(savings, 6)
 
 
 class LLMClient:
-    def __init__(self, base_url, model, temperature, api_key=None):
+    def __init__(
+        self,
+        base_url,
+        model,
+        temperature,
+        api_key=None,
+        timeout=None,
+        max_retries=2,
+        max_connections=None,
+        response_format=None,
+    ):
+        from openai import OpenAI
+
         key = api_key or os.getenv("XAI_API_KEY") or os.getenv("OPENAI_API_KEY")
         if not key:
             raise ValueError("Missing API key. Set XAI_API_KEY in your environment.")
-        self.client = OpenAI(api_key=key, base_url=base_url)
+        client_kwargs = {"api_key": key, "base_url": base_url, "max_retries": max_retries}
+        if timeout is not None:
+            client_kwargs["timeout"] = float(timeout)
+        http_client = _http_client(max_connections)
+        if http_client is not None:
+            client_kwargs["http_client"] = http_client
+        self.client = OpenAI(**client_kwargs)
+        self.base_url = base_url
         self.model = model
         self.temperature = temperature
+        # Schema-constrained output; dropped for good if the provider rejects it
+        self.response_format = response_format
+        # Usage of the last decide() call (read by the caller right after it)
+        self.last_usage = None
+
+    def close(self):
+        self.client.close()
+
+    def warm(self):
+        """Cheap request that opens the pooled TLS connection the decision call reuses."""
+        self.client.models.list()
+
+    def decide(self, system_prompt, user_prompt, history=None):
+        """`history`: earlier user/assistant messages replayed before `user_prompt` (incremental mode)."""
+        text, self.last_usage = self.complete(chat_messages(system_prompt, user_prompt, history))
+        return text
+
+    def complete(self, messages, timeout=None, cancel=None):
+        """
+        One chat completion: (text, usage). With `timeout`, this call alone uses it and
+        skips the client's retries (the request policy of HedgedLLMClient retries instead).
+        With a `cancel` CancelToken the answer is streamed, so the request can be aborted.
+        """
+        client = self.client
+        if timeout is not None:
+            client = client.with_options(timeout=max(0.1, float(timeout)), max_retries=0)
+        started = time.perf_counter()
+        try:
+            with span("llm.decide"):
+                if cancel is None:
+                    response = self._create(client, messages)
+                    text = response.choices[0].message.content
+                    usage = getattr(response, "usage", None)
+                else:
+                    text, usage = self._collect(client, messages, cancel)
+        except Exception:
+            if cancel is None or not cancel.cancelled:
+                metrics.inc("gat_llm_errors_total", model=self.model)
+            raise
+        finally:
+            metrics.observe("gat_llm_request_seconds", time.perf_counter() - started, model=self.model)
+        return (text or "").strip(), self._usage(usage, time.perf_counter() - started)
+
+    def _collect(self, client, messages, cancel):
+        stream = self._create(client, messages, stream=True, stream_options={"include_usage": True})
+        cancel.attach(stream)
+        parts = []
+        usage = None
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+        except Exception as exc:
+            if cancel.cancelled:
+                raise RuntimeError("LLM request cancelled") from exc
+            raise
+        if cancel.cancelled:
+            raise RuntimeError("LLM request cancelled")
+        return "".join(parts), usage
+
+    def decide_stream(self, system_prompt, user_prompt, history=None, on_text=None, deadline_seconds=None):
+        """
+        Streamed decide(): `on_text(chunk)` sees the answer as it arrives. The stream is
+        closed after `deadline_seconds` and LLMDeadlineExceeded raised with the partial text.
+        """
+        messages = chat_messages(system_prompt, user_prompt, history)
+        started = time.perf_counter()
+        parts = []
+        usage = None
+        first_token_seconds = None
+        expired = threading.Event()
+        timer = None
+        client = self.client
+        if deadline_seconds:
+            # Also bounds the wait for the response headers, before the first chunk
+            client = client.with_options(timeout=float(deadline_seconds), max_retries=0)
+        try:
+            with span("llm.decide_stream"):
+                try:
+                    stream = self._create(client, messages, stream=True, stream_options={"include_usage": True})
+                except Exception as exc:
+                    if deadline_seconds and time.perf_counter() - started >= float(deadline_seconds):
+                        raise LLMDeadlineExceeded(f"LLM stream exceeded its {deadline_seconds}s deadline") from exc
+                    raise
+                if deadline_seconds:
+                    remaining = max(0.0, float(deadline_seconds) - (time.perf_counter() - started))
+                    timer = threading.Timer(remaining, lambda: (expired.set(), stream.close()))
+                    timer.daemon = True
+                    timer.start()
+                try:
+                    for chunk in stream:
+                        if getattr(chunk, "usage", None) is not None:
+                            usage = chunk.usage
+                        if not chunk.choices:
+                            continue
+                        text = chunk.choices[0].delta.content
+                        if not text:
+                            continue
+                        if first_token_seconds is None:
+                            first_token_seconds = time.perf_counter() - started
+                        parts.append(text)
+                        if on_text:
+                            on_text(text)
+                except Exception:
+                    if not expired.is_set():
+                        raise
+                if expired.is_set():
+                    raise LLMDeadlineExceeded(
+                        f"LLM stream exceeded its {deadline_seconds}s deadline", partial="".join(parts)
+                    )
+        except Exception:
+            metrics.inc("gat_llm_errors_total", model=self.model)
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+            metrics.observe("gat_llm_request_seconds", time.perf_counter() - started, model=self.model)
+        self.last_usage = self._usage(usage, time.perf_counter() - started)
+        self.last_usage["first_token_seconds"] = (
+            round(first_token_seconds, 3) if first_token_seconds is not None else None
+        )
+        return "".join(parts).strip()
+
+    def _create(self, client, messages, **kwargs):
+        kwargs.update(model=self.model, temperature=self.temperature, messages=messages)
+        response_format = self.response_format
+        if response_format is not None:
+            try:
+                _count_request()
+                return client.chat.completions.create(response_format=response_format, **kwargs)
+            except Exception as exc:
+                message = str(exc).lower()
+                rejected = getattr(exc, "status_code", None) in (400, 422) and (
+                    "response_format" in message or "schema" in message
+                )
+                if not rejected:
+                    raise
+                print(f"⚠️ {self.model} rejected response_format ({exc}); falling back to prompt-only JSON")
+                self.response_format = None
+        _count_request()
+        return client.chat.completions.create(**kwargs)
+
+    def _usage(self, usage, latency_seconds):
+        """Token usage of one completion, cached prompt tokens included (provider prompt caching)."""
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+        completion_tokens = getattr(usage, "completion_tokens", None) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
+        if usage is not None:
+            metrics.inc("gat_llm_tokens_total", prompt_tokens - cached_tokens, model=self.model, kind="prompt")
+            metrics.inc("gat_llm_tokens_total", cached_tokens, model=self.model, kind="cached")
+            metrics.inc("gat_llm_tokens_total", completion_tokens, model=self.model, kind="completion")
+        return {
+            "model": self.model,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "uncached_tokens": prompt_tokens - cached_tokens,
+            "completion_tokens": completion_tokens,
+            "cache_hit_ratio": round(cached_tokens / prompt_tokens, 3) if prompt_tokens else None,
+            "latency_seconds": round(latency_seconds, 3),
+        }
+
+
+def _count_request():
+    hook = _request_hook
+    if hook is not None:
+        hook()
+
+
+class HedgedLLMClient:
+    """
+    Request policy around LLMClient: per-call deadline, hedged request and failover.
+
+    A call goes to the primary client. If it has not answered after the hedge
+    delay (the `hedge_percentile` of recent latencies, `hedge_delay_seconds` until
+    `min_samples` calls were seen), a duplicate request is sent, to the fallback
+    client when one is configured. The first valid answer wins and the other
+    request is cancelled: attempts are streamed, and closing the loser's response
+    stops its generation and frees its worker. A primary
+    that fails before the hedge fails over right away. Nothing valid within
+    `deadline_seconds` raises LLMDeadlineExceeded.
+    """
+
+    def __init__(
+        self,
+        primary,
+        fallback=None,
+        deadline_seconds=60,
+        hedge=True,
+        hedge_delay_seconds=8.0,
+        hedge_percentile=95,
+        min_samples=10,
+        window=50,
+        validate=None,
+    ):
+        self.primary = primary
+        self.fallback = fallback
+        self.deadline_seconds = float(deadline_seconds)
+        self.hedge = bool(hedge)
+        self.hedge_delay_seconds = float(hedge_delay_seconds)
+        self.hedge_percentile = float(hedge_percentile)
+        self.min_samples = int(min_samples)
+        self.validate = validate or (lambda text: bool(text))
+        self.last_usage = None
+        self._latencies = deque(maxlen=int(window))
+        self._lock = threading.Lock()
+        # A loser still waiting for its response headers keeps a worker until then
+        self._executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="llm-attempt")
+
+    @property
+    def model(self):
+        return self.primary.model
+
+    @property
+    def base_url(self):
+        return self.primary.base_url
+
+    @property
+    def temperature(self):
+        return self.primary.temperature
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.primary.close()
+        if self.fallback is not None:
+            self.fallback.close()
+
+    def warm(self):
+        """Both clients: a hedged or failed-over call must not pay the handshake either."""
+        self.primary.warm()
+        if self.fallback is not None:
+            self.fallback.warm()
+
+    def hedge_delay(self):
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return min(self.hedge_delay_seconds, self.deadline_seconds)
+        index = min(len(samples) - 1, int(round(self.hedge_percentile / 100.0 * (len(samples) - 1))))
+        return min(samples[index], self.deadline_seconds)
+
+    def _attempt(self, client, messages, timeout, cancel):
+        started = time.perf_counter()
+        try:
+            text, usage = client.complete(messages, timeout=timeout, cancel=cancel)
+        except Exception:
+            if cancel.cancelled:
+                # A cancelled loser counts with its time so far (a lower bound),
+                # so the slow tail stays in the window the delay is computed from
+                self._record_latency(time.perf_counter() - started)
+            raise
+        self._record_latency(time.perf_counter() - started)
+        return text, usage
+
+    def _record_latency(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def decide(self, system_prompt, user_prompt, history=None):
+        text, self.last_usage = self.complete(chat_messages(system_prompt, user_prompt, history))
+        return text
+
+    def complete(self, messages, timeout=None):
+        """(text, usage) of one call under the policy; `timeout` can only shorten the deadline."""
+        deadline_seconds = min(self.deadline_seconds, float(timeout)) if timeout else self.deadline_seconds
+        started = time.perf_counter()
+        deadline = started + deadline_seconds
+        backup = self.fallback or self.primary
+        pending = {}
+        errors = []
+
+        def launch(label, client):
+            cancel = CancelToken()
+            future = self._executor.submit(self._attempt, client, messages, deadline - time.perf_counter(), cancel)
+            pending[future] = (label, cancel)
+
+        launch("primary", self.primary)
+        hedge_at = started + self.hedge_delay() if self.hedge else None
+        backup_sent = False
+        while True:
+            now = time.perf_counter()
+            if now >= deadline or (not pending and backup_sent):
+                break
+            if hedge_at is not None and now >= hedge_at and not backup_sent:
+                launch("hedge", backup)
+                backup_sent = True
+                metrics.inc("gat_llm_hedges_total", model=backup.model)
+                continue
+            wake_at = deadline if hedge_at is None or backup_sent else min(deadline, hedge_at)
+            done, _ = wait(list(pending), timeout=max(0.0, wake_at - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                label, _ = pending.pop(future)
+                try:
+                    text, usage = future.result()
+                except Exception as exc:
+                    errors.append(f"{label}: {exc}")
+                    continue
+                if not self.validate(text):
+                    errors.append(f"{label}: invalid answer")
+                    continue
+                for loser, (_, cancel) in pending.items():
+                    loser.cancel()
+                    cancel.cancel()
+                metrics.inc("gat_llm_attempt_wins_total", model=usage["model"], attempt=label)
+                usage = dict(
+                    usage,
+                    attempt=label,
+                    hedged=backup_sent,
+                    latency_seconds=round(time.perf_counter() - started, 3),
+                )
+                return text, usage
+            if errors and not backup_sent and not pending:
+                # Primary failed before the hedge: fail over right away
+                launch("failover", backup)
+                backup_sent = True
+                metrics.inc("gat_llm_failovers_total", model=backup.model)
+        for future, (_, cancel) in pending.items():
+            future.cancel()
+            cancel.cancel()
+        if pending or not errors:
+            raise LLMDeadlineExceeded(
+                f"No valid LLM answer within {deadline_seconds:.0f}s ({'; '.join(errors) or 'no answer'})"
+            )
+        raise RuntimeError(f"LLM request failed: {'; '.join(errors)}")
+
+    def decide_stream(self, system_prompt, user_prompt, history=None, on_text=None, deadline_seconds=None):
+        """
+        Streams from the primary; fails over to the fallback when the primary errors
+        before its first token. Streams are not hedged: their text is consumed as it arrives.
+        """
+        deadline_seconds = deadline_seconds or self.deadline_seconds
+        started = time.perf_counter()
+        emitted = []
+
+        def forward(chunk):
+            emitted.append(chunk)
+            if on_text:
+                on_text(chunk)
 
-    def decide(self, system_prompt, user_prompt):
-        response = self.client.chat.completions.create(
-            model=self.model,
-            temperature=self.temperature,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+        try:
+            text = self.primary.decide_stream(
+                system_prompt, user_prompt, history=history, on_text=forward, deadline_seconds=deadline_seconds
+            )
+            self.last_usage = dict(self.primary.last_usage, attempt="primary", hedged=False)
+            return text
+        except LLMDeadlineExceeded:
+            raise
+        except Exception as exc:
+            remaining = deadline_seconds - (time.perf_counter() - started)
+            if emitted or self.fallback is None or remaining <= 0:
+                raise
+            print(f"🔁 LLM stream failed ({exc}), failing over to {self.fallback.model}")
+            metrics.inc("gat_llm_failovers_total", model=self.fallback.model)
+        text = self.fallback.decide_stream(
+            system_prompt, user_prompt, history=history, on_text=on_text, deadline_seconds=remaining
         )
-        return response.choices[0].message.content.strip()
+        self.last_usage = dict(self.fallback.last_usage, attempt="failover", hedged=False)
+        return text
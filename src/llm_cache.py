@@ -0,0 +1,238 @@
+"""
+LLM response cache with record / replay / passthrough modes (`llm.cache`).
+
+Answers are keyed by a hash of the model, the temperature and the messages
+(whitespace-normalized). `record` calls the model and stores every answer,
+`replay` answers from the store only (no network, no API key; a miss raises
+LLMCacheMiss) and `passthrough` leaves the client alone.
+
+The store is a directory of gzip JSON-lines shards picked by the first hex
+digit of the key. New answers are appended as gzip members; once the shards
+exceed `max_bytes`, they are rewritten without the oldest answers.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+import metrics
+from llm import chat_messages
+
+CACHE_MODES = {"passthrough", "record", "replay"}
+SHARDS = 16
+
+
+class LLMCacheMiss(LookupError):
+    """Replay mode found no recorded answer for a prompt."""
+
+
+def _normalize(content):
+    # Trailing spaces and line endings do not change the prompt
+    return "\n".join(line.rstrip() for line in str(content or "").strip().splitlines())
+
+
+def cache_key(model, temperature, messages):
+    payload = [
+        str(model),
+        round(float(temperature or 0), 4),
+        [[message.get("role"), _normalize(message.get("content"))] for message in messages],
+    ]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode()).hexdigest()
+
+
+class LLMCacheStore:
+    def __init__(self, path, max_bytes=50 * 1024 * 1024):
+        self.path = Path(path)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._index = None  # key -> entry, loaded on first use
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _shard(self, key):
+        return self.path / f"{key[0]}.jsonl.gz"
+
+    @staticmethod
+    def _read_shard(shard):
+        entries = []
+        try:
+            with gzip.open(shard, "rt", encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except (EOFError, OSError, zlib.error):
+            # Cut by a crash mid-append: keep the entries read so far
+            pass
+        return entries
+
+    def _load(self):
+        if self._index is None:
+            self._index = {}
+            for shard in sorted(self.path.glob("*.jsonl.gz")):
+                for entry in self._read_shard(shard):
+                    if entry.get("key"):
+                        self._index[entry["key"]] = entry
+        return self._index
+
+    def size_bytes(self):
+        return sum(shard.stat().st_size for shard in self.path.glob("*.jsonl.gz"))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.inc("gat_cache_requests_total", cache="llm", result="hit" if entry else "miss")
+        return entry
+
+    def put(self, key, text, model, temperature, usage=None):
+        entry = {
+            "key": key,
+            "model": model,
+            "temperature": temperature,
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "text": text,
+            "usage": usage,
+        }
+        with self._lock:
+            self._load()[key] = entry
+            self.path.mkdir(parents=True, exist_ok=True)
+            # One gzip member per answer: appends never rewrite the shard
+            with gzip.open(self._shard(key), "at", encoding="utf-8") as handle:
+                handle.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            if self.size_bytes() > self.max_bytes:
+                self._compact()
+        return entry
+
+    def _compact(self):
+        """Rewrites the shards (one gzip member each) without the oldest answers, down to 80% of max_bytes."""
+        entries = sorted(self._index.values(), key=lambda entry: entry.get("recorded_at") or "")
+        raw_sizes = [len(json.dumps(entry, ensure_ascii=False)) + 1 for entry in entries]
+        # Compression ratio of what is on disk, to size the cut before rewriting
+        ratio = self.size_bytes() / max(sum(raw_sizes), 1)
+        budget = 0.8 * self.max_bytes
+        kept = []
+        total = 0.0
+        for entry, size in zip(reversed(entries), reversed(raw_sizes)):
+            total += size * ratio
+            if total > budget:
+                break
+            kept.append(entry)
+        self.evictions += len(entries) - len(kept)
+        self._index = {entry["key"]: entry for entry in reversed(kept)}
+        shards = {}
+        for entry in self._index.values():
+            shards.setdefault(self._shard(entry["key"]), []).append(entry)
+        for shard in self.path.glob("*.jsonl.gz"):
+            if shard not in shards:
+                shard.unlink()
+        for shard, shard_entries in shards.items():
+            temp_path = shard.with_name(shard.name + ".tmp")
+            with gzip.open(temp_path, "wt", encoding="utf-8") as handle:
+                for entry in shard_entries:
+                    handle.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(temp_path, shard)
+
+    def stats(self):
+        with self._lock:
+            entries = len(self._load())
+        return {
+            "entries": entries,
+            "bytes": self.size_bytes() if self.path.exists() else 0,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class CachedLLMClient:
+    """
+    LLM client wrapper (LLMClient or HedgedLLMClient) reading/writing an LLMCacheStore.
+    In replay mode `llm` can be None: nothing is ever sent.
+    """
+
+    def __init__(self, llm, store, mode="record", model=None, temperature=None):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown llm.cache mode: {mode}")
+        self.llm = llm
+        self.store = store
+        self.mode = mode
+        self.model = model or llm.model
+        self.temperature = temperature if temperature is not None else llm.temperature
+        self.base_url = getattr(llm, "base_url", None)
+        self.last_usage = None
+
+    def close(self):
+        if self.llm is not None:
+            self.llm.close()
+
+    def warm(self):
+        # Replay never sends anything: no connection to open
+        if self.mode != "replay" and self.llm is not None:
+            self.llm.warm()
+
+    def _replayed(self, key, started):
+        entry = self.store.get(key)
+        if entry is None:
+            raise LLMCacheMiss(f"No recorded LLM answer for prompt {key[:12]} (llm.cache replay mode)")
+        usage = {
+            "model": self.model,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "uncached_tokens": 0,
+            "completion_tokens": 0,
+            "cache_hit_ratio": None,
+            "latency_seconds": round(time.perf_counter() - started, 6),
+            "llm_cache": "hit",
+        }
+        return entry["text"], usage
+
+    def complete(self, messages, timeout=None):
+        started = time.perf_counter()
+        key = cache_key(self.model, self.temperature, messages)
+        if self.mode == "replay":
+            return self._replayed(key, started)
+        text, usage = self.llm.complete(messages, timeout=timeout)
+        if self.mode == "record":
+            self.store.put(key, text, self.model, self.temperature, usage)
+        return text, usage
+
+    def decide(self, system_prompt, user_prompt, history=None):
+        text, self.last_usage = self.complete(chat_messages(system_prompt, user_prompt, history))
+        return text
+
+    def decide_stream(self, system_prompt, user_prompt, history=None, on_text=None, deadline_seconds=None):
+        messages = chat_messages(system_prompt, user_prompt, history)
+        started = time.perf_counter()
+        key = cache_key(self.model, self.temperature, messages)
+        if self.mode == "replay":
+            text, self.last_usage = self._replayed(key, started)
+            if on_text and text:
+                on_text(text)
+            return text
+        text = self.llm.decide_stream(
+            system_prompt, user_prompt, history=history, on_text=on_text, deadline_seconds=deadline_seconds
+        )
+        self.last_usage = self.llm.last_usage
+        if self.mode == "record":
+            self.store.put(key, text, self.model, self.temperature, self.last_usage)
+        return text
+
+
+def build_cache_store(cache_cfg):
+    return LLMCacheStore(
+        cache_cfg.get("path", "data/llm_cache"),
+        max_bytes=float(cache_cfg.get("max_mb", 50)) * 1024 * 1024,
+    )
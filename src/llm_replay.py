@@ -0,0 +1,131 @@
+"""
+Replays the decision cycles recorded in the trades log through the LLM cache.
+
+    python3 src/llm_replay.py import [--trades data/trades.jsonl] [--config config/settings.json]
+    python3 src/llm_replay.py run [--trades data/trades.jsonl] [--limit 200] [--repeat 3]
+
+`import` stores every recorded prompt with the answer that followed it (its
+"decision" event) in the `llm.cache` store, so logs written before the cache
+existed can be replayed too. `run` sends the recorded prompts through
+request_decision with the cache in replay mode (no network, no API key) into a
+scratch trades log, checks every decision against the recorded one and reports
+the cycle timings.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from config import load_config
+from llm import chat_messages
+from llm_cache import CachedLLMClient, LLMCacheMiss, build_cache_store, cache_key
+
+COMPARED_FIELDS = ("action", "symbol", "notional", "sl_price", "tp_price")
+
+
+def load_cycles(trades_path, limit=None):
+    """[{"system", "user", "raw", "decision"}] from prompt / decision / decision_parsed events."""
+    cycles = []
+    pending = None
+    for line in Path(trades_path).read_text().splitlines():
+        try:
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        kind = event.get("type")
+        if kind == "prompt":
+            prompt = event.get("prompt") or {}
+            pending = {"system": prompt.get("system") or "", "user": prompt.get("user") or "", "decision": None}
+        elif kind == "decision" and pending is not None and event.get("raw"):
+            pending["raw"] = event["raw"]
+            cycles.append(pending)
+            pending = None
+        elif kind in ("decision_parsed", "decision_fallback") and cycles and cycles[-1]["decision"] is None:
+            cycles[-1]["decision"] = event.get("decision")
+    return cycles[-limit:] if limit else cycles
+
+
+def import_cycles(cycles, store, model, temperature):
+    added = 0
+    for cycle in cycles:
+        key = cache_key(model, temperature, chat_messages(cycle["system"], cycle["user"]))
+        if store.get(key) is None:
+            store.put(key, cycle["raw"], model, temperature)
+            added += 1
+    return added
+
+
+def replay(cycles, llm, repeat=1):
+    # Imported here: main pulls in the whole pipeline, import_cycles does not need it
+    from main import request_decision
+
+    timings = []
+    mismatches = []
+    misses = 0
+    with tempfile.TemporaryDirectory() as scratch:
+        trades_path = Path(scratch) / "trades.jsonl"
+        for _ in range(repeat):
+            for index, cycle in enumerate(cycles):
+                recorded = cycle["decision"] or {}
+                started = time.perf_counter()
+                try:
+                    _, decision, _ = request_decision(
+                        llm,
+                        cycle["system"],
+                        cycle["user"],
+                        trades_path,
+                        positions_open=recorded.get("positions_ack") == "OPEN",
+                        positions_summary_default=recorded.get("positions_summary") or "",
+                    )
+                except LLMCacheMiss:
+                    misses += 1
+                    continue
+                timings.append(time.perf_counter() - started)
+                if recorded and any(decision.get(key) != recorded.get(key) for key in COMPARED_FIELDS):
+                    mismatches.append(index)
+    return timings, mismatches, misses
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record/replay the recorded LLM decision cycles")
+    parser.add_argument("command", choices=["import", "run"])
+    parser.add_argument("--trades", default="data/trades.jsonl")
+    parser.add_argument("--config", default="config/settings.json")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    model, temperature = config["llm"]["model"], config["llm"]["temperature"]
+    store = build_cache_store(config["llm"].get("cache") or {})
+    cycles = load_cycles(args.trades, args.limit)
+    if not cycles:
+        print(f"No recorded prompt/decision pairs in {args.trades}")
+        return 1
+
+    if args.command == "import":
+        added = import_cycles(cycles, store, model, temperature)
+        stats = store.stats()
+        print(f"📼 {len(cycles)} recorded cycles, {added} new answers -> {store.path} ({stats['entries']} entries, {stats['bytes']} bytes)")
+        return 0
+
+    llm = CachedLLMClient(None, store, "replay", model=model, temperature=temperature)
+    started = time.perf_counter()
+    timings, mismatches, misses = replay(cycles, llm, repeat=args.repeat)
+    wall = time.perf_counter() - started
+    print(f"📼 {len(timings)} cycles replayed in {wall:.3f}s ({len(timings) / max(wall, 1e-9):.0f} cycles/s), {misses} cache misses")
+    if timings:
+        ordered = sorted(timings)
+        p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+        print(f"per cycle  median {statistics.median(ordered) * 1000:.2f} ms  p95 {p95 * 1000:.2f} ms")
+    if mismatches:
+        print(f"⚠️ {len(mismatches)} decisions differ from the recorded ones (cycles {mismatches[:10]})")
+    return 1 if misses or mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,428 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions endpoint and xAI live
+search, with injectable latency and errors.
+
+Run it, then point the bot (or a benchmark) at it:
+
+    python3 src/llm_stub_server.py --port 8766 --latency 0.3 --slow-rate 0.05 --slow-latency 10
+    python3 src/llm_stub_server.py --decisions random --latency-dist lognormal --error-rate 0.05
+    # config: "llm": {"base_url": "http://127.0.0.1:8766/v1", ...}, any XAI_API_KEY
+    # live search: "live_search": {"backend": "rest", ...} (base_url defaults to llm.base_url)
+
+Each request waits a latency drawn from `latency_dist`: "uniform" (`latency`
++/- `jitter`), "lognormal" (median `latency`, shape `sigma`) or "exponential"
+(mean `latency`); a `slow_rate` share of requests takes `slow_latency` instead
+(the tail). Then an `error_rate` share gets a 500, a `rate_limit_rate` share a
+429 and an `invalid_rate` share a truncated answer. The others get the
+decision picked by `decisions`: "fixed" (`content`, a HOLD by default),
+"script" (the `script` answers in turn, e.g. from a JSON-lines file) or
+"random" (valid HOLD/BUY/SELL decisions on `symbols`, with stop-loss and
+take-profit around offline_market's prices). Requests carrying xAI's
+`search_parameters` get headlines about `symbols` with citations instead.
+Answers are streamed as server-sent events when the request asks for `stream`.
+With `reject_response_format`, structured-output requests get a 400 like from
+a provider without them. Settings change at runtime with
+`POST /_stub/config {"slow_rate": 0.2}`; `GET /_stub/state` returns them with
+the request counts.
+"""
+
+import argparse
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from offline_market import base_price
+
+DEFAULT_CONTENT = json.dumps(
+    {
+        "action": "HOLD",
+        "symbol": None,
+        "notional": None,
+        "sl_price": None,
+        "tp_price": None,
+        "confidence": 0.5,
+        "reason": "Réponse du serveur de test.",
+        "reflection": "Pas de signal: j'attends.",
+        "evidence": [],
+    }
+)
+DEFAULT_SYMBOLS = ["AAPL", "MSFT", "NVDA", "AMD", "TSLA", "META", "AMZN", "GOOGL"]
+LATENCY_DISTS = {"uniform", "lognormal", "exponential"}
+DECISION_MODES = {"fixed", "script", "random"}
+FLOAT_SETTINGS = (
+    "latency",
+    "jitter",
+    "sigma",
+    "slow_rate",
+    "slow_latency",
+    "error_rate",
+    "rate_limit_rate",
+    "invalid_rate",
+    "buy_rate",
+    "sell_rate",
+)
+HEADLINES = (
+    "{symbol} shares move after analysts revise price targets",
+    "{symbol} trending on social media ahead of its product event",
+    "Options volume spikes in {symbol} as traders position for earnings",
+    "{symbol} gains on upbeat guidance; sector peers follow",
+    "Short interest in {symbol} climbs to a three-month high",
+)
+
+
+def load_script(path):
+    """Answers for decisions="script": one JSON decision (or raw answer text) per line."""
+    with open(path, encoding="utf-8") as handle:
+        return [line.strip() for line in handle if line.strip()]
+
+
+class StubLLMState:
+    def __init__(
+        self,
+        latency=0.2,
+        jitter=0.05,
+        slow_rate=0.0,
+        slow_latency=10.0,
+        content=DEFAULT_CONTENT,
+        reject_response_format=False,
+        seed=None,
+        latency_dist="uniform",
+        sigma=0.5,
+        error_rate=0.0,
+        rate_limit_rate=0.0,
+        invalid_rate=0.0,
+        decisions="fixed",
+        script=None,
+        symbols=None,
+        buy_rate=0.3,
+        sell_rate=0.1,
+    ):
+        self.lock = threading.Lock()
+        self.latency = float(latency)
+        self.jitter = float(jitter)
+        self.sigma = float(sigma)
+        self.slow_rate = float(slow_rate)
+        self.slow_latency = float(slow_latency)
+        self.error_rate = float(error_rate)
+        self.rate_limit_rate = float(rate_limit_rate)
+        self.invalid_rate = float(invalid_rate)
+        self.buy_rate = float(buy_rate)
+        self.sell_rate = float(sell_rate)
+        self.content = content
+        self.reject_response_format = bool(reject_response_format)
+        self.random = random.Random(seed)
+        self._set_latency_dist(latency_dist)
+        self._set_decisions(decisions, script)
+        self.symbols = [symbol.upper() for symbol in (symbols or DEFAULT_SYMBOLS)]
+        self.request_count = 0
+        self.slow_count = 0
+        self.search_count = 0
+        self.error_count = 0
+        self.rate_limited_count = 0
+        self.invalid_count = 0
+
+    def _set_latency_dist(self, latency_dist):
+        if latency_dist not in LATENCY_DISTS:
+            raise ValueError(f"Unknown latency_dist: {latency_dist}")
+        self.latency_dist = latency_dist
+
+    def _set_decisions(self, decisions, script):
+        if decisions not in DECISION_MODES:
+            raise ValueError(f"Unknown decisions mode: {decisions}")
+        if decisions == "script" and not script:
+            raise ValueError('decisions="script" needs a non-empty script')
+        self.decisions = decisions
+        self.script = [item if isinstance(item, str) else json.dumps(item) for item in script or []]
+        self._script_cycle = itertools.cycle(self.script) if self.script else None
+
+    def next_latency(self):
+        with self.lock:
+            self.request_count += 1
+            if self.random.random() < self.slow_rate:
+                self.slow_count += 1
+                return self.slow_latency
+            if self.latency_dist == "lognormal":
+                return self.latency * self.random.lognormvariate(0.0, self.sigma)
+            if self.latency_dist == "exponential":
+                return self.random.expovariate(1.0 / self.latency) if self.latency > 0 else 0.0
+            return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    def next_outcome(self):
+        """Kind of the next answer: "ok", "error" (500), "rate_limited" (429) or "invalid" (truncated)."""
+        with self.lock:
+            draw = self.random.random()
+            for outcome, rate, counter in (
+                ("error", self.error_rate, "error_count"),
+                ("rate_limited", self.rate_limit_rate, "rate_limited_count"),
+                ("invalid", self.invalid_rate, "invalid_count"),
+            ):
+                if draw < rate:
+                    setattr(self, counter, getattr(self, counter) + 1)
+                    return outcome
+                draw -= rate
+            return "ok"
+
+    def next_content(self):
+        with self.lock:
+            if self.decisions == "script":
+                return next(self._script_cycle)
+            if self.decisions == "random":
+                return json.dumps(self._random_decision())
+            return self.content
+
+    def _random_decision(self):
+        draw = self.random.random()
+        action = "BUY" if draw < self.buy_rate else "SELL" if draw < self.buy_rate + self.sell_rate else "HOLD"
+        decision = json.loads(DEFAULT_CONTENT)
+        decision.update(confidence=round(self.random.uniform(0.3, 0.9), 2), action=action)
+        if action == "HOLD":
+            decision["reason"] = "Pas de catalyseur assez fort (réponse aléatoire du serveur de test)."
+            return decision
+        symbol = self.random.choice(self.symbols)
+        price = base_price(symbol)
+        decision.update(
+            symbol=symbol,
+            notional=round(self.random.uniform(5, 25), 2),
+            sl_price=round(price * self.random.uniform(0.90, 0.95), 2),
+            tp_price=round(price * self.random.uniform(1.05, 1.15), 2),
+            reason=f"{action} {symbol} (réponse aléatoire du serveur de test).",
+            evidence=[f"{symbol} near {price}"],
+        )
+        return decision
+
+    def search_answer(self, query, max_results=None):
+        """(headlines text, citations) for a live search request."""
+        with self.lock:
+            self.search_count += 1
+            count = max(1, min(int(max_results or 5), len(self.symbols)))
+            symbols = self.random.sample(self.symbols, count)
+            lines = [f"- {self.random.choice(HEADLINES).format(symbol=symbol)}" for symbol in symbols]
+        citations = [f"https://news.example.com/{symbol.lower()}/{uuid.uuid4().hex[:8]}" for symbol in symbols]
+        return f"Stub results for: {query}\n" + "\n".join(lines), citations
+
+    def update(self, values):
+        with self.lock:
+            for key in FLOAT_SETTINGS:
+                if key in values:
+                    setattr(self, key, float(values[key]))
+            if "content" in values:
+                self.content = values["content"]
+            if "reject_response_format" in values:
+                self.reject_response_format = bool(values["reject_response_format"])
+            if "latency_dist" in values:
+                self._set_latency_dist(values["latency_dist"])
+            if "symbols" in values:
+                self.symbols = [symbol.upper() for symbol in values["symbols"]]
+            if "decisions" in values or "script" in values:
+                self._set_decisions(values.get("decisions", self.decisions), values.get("script", self.script))
+
+    def snapshot(self):
+        with self.lock:
+            snapshot = {key: getattr(self, key) for key in FLOAT_SETTINGS}
+            snapshot.update(
+                latency_dist=self.latency_dist,
+                decisions=self.decisions,
+                script_length=len(self.script),
+                symbols=self.symbols,
+                reject_response_format=self.reject_response_format,
+                request_count=self.request_count,
+                slow_count=self.slow_count,
+                search_count=self.search_count,
+                error_count=self.error_count,
+                rate_limited_count=self.rate_limited_count,
+                invalid_count=self.invalid_count,
+            )
+            return snapshot
+
+
+def _usage(messages, content):
+    # ~4 characters per token, like prompt_builder's estimate
+    prompt_tokens = sum(len(str(message.get("content") or "")) for message in messages) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": 0},
+    }
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            if self.path == "/_stub/state":
+                return self._json(200, state.snapshot())
+            if self.path.rstrip("/").endswith("/models"):
+                return self._json(200, {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]})
+            self._json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        def do_POST(self):
+            if self.path == "/_stub/config":
+                state.update(self._body())
+                return self._json(200, state.snapshot())
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self._json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            request = self._body()
+            if request.get("response_format") and state.reject_response_format:
+                return self._json(400, {"error": {"message": "response_format is not supported by this model"}})
+            time.sleep(state.next_latency())
+            outcome = state.next_outcome()
+            try:
+                if outcome == "error":
+                    return self._json(500, {"error": {"message": "Stub internal error", "type": "server_error"}})
+                if outcome == "rate_limited":
+                    return self._json(
+                        429,
+                        {"error": {"message": "Stub rate limit", "type": "rate_limit_error"}},
+                        headers={"Retry-After": "1"},
+                    )
+                citations = None
+                search_parameters = request.get("search_parameters")
+                if search_parameters:
+                    query = next(
+                        (str(m.get("content")) for m in reversed(request.get("messages") or []) if m.get("role") == "user"),
+                        "",
+                    )
+                    content, citations = state.search_answer(query, search_parameters.get("max_search_results"))
+                else:
+                    content = state.next_content()
+                if outcome == "invalid":
+                    # Cut mid-answer, like a dropped or length-limited completion
+                    content = content[: max(1, len(content) // 2)]
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+                model = request.get("model", "stub")
+                usage = _usage(request.get("messages") or [], content)
+                if request.get("stream"):
+                    self._stream(completion_id, model, content, usage)
+                else:
+                    payload = {
+                        "id": completion_id,
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": content},
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": usage,
+                    }
+                    if citations is not None:
+                        payload["citations"] = citations
+                    self._json(200, payload)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up on this request (deadline or lost hedge)
+                pass
+
+        def _stream(self, completion_id, model, content, usage):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            def send(choices, extra=None):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": choices,
+                }
+                chunk.update(extra or {})
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+
+            for start in range(0, len(content), 16):
+                send([{"index": 0, "delta": {"content": content[start : start + 16]}, "finish_reason": None}])
+            send([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            send([], {"usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients drop connections on purpose (deadlines, lost hedges): no traceback for those
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+def start_llm_stub(host="127.0.0.1", port=0, **settings):
+    """Starts the stub on a daemon thread. Returns (server, state, base_url) with base_url ending in /v1."""
+    state = StubLLMState(**settings)
+    server = StubHTTPServer((host, port), make_handler(state))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{server.server_address[0]}:{server.server_address[1]}/v1"
+    return server, state, base_url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible LLM / live search stub with injectable latency")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--latency-dist", choices=sorted(LATENCY_DISTS), default="uniform")
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-latency", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-rate", type=float, default=0.0)
+    parser.add_argument("--decisions", choices=sorted(DECISION_MODES), default="fixed")
+    parser.add_argument("--script", help="JSON-lines file of answers for --decisions script")
+    parser.add_argument("--symbols", help="Comma-separated symbols for random decisions and search headlines")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    stub_state = StubLLMState(
+        latency=args.latency,
+        jitter=args.jitter,
+        latency_dist=args.latency_dist,
+        sigma=args.sigma,
+        slow_rate=args.slow_rate,
+        slow_latency=args.slow_latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        invalid_rate=args.invalid_rate,
+        decisions="script" if args.script else args.decisions,
+        script=load_script(args.script) if args.script else None,
+        symbols=args.symbols.split(",") if args.symbols else None,
+        seed=args.seed,
+    )
+    httpd = StubHTTPServer((args.host, args.port), make_handler(stub_state))
+    print(f"🤖 LLM stub listening on http://{args.host}:{args.port}/v1")
+    httpd.serve_forever()
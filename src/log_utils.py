@@ -2,6 +2,8 @@ import json
 from datetime import datetime, timezone
 from pathlib import Path
 
+import metrics
+
 
 def append_event(path, event):
     log_path = Path(path)
@@ -10,6 +12,7 @@ def append_event(path, event):
     payload.setdefault("timestamp", datetime.now(timezone.utc).isoformat())
     with log_path.open("a", encoding="utf-8") as handle:
         handle.write(json.dumps(payload) + "\n")
+    metrics.inc("gat_events_written_total", type=payload.get("type", "unknown"))
 
 
 def append_run_log(path, message):
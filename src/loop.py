@@ -1,45 +1,132 @@
 import time
+from datetime import datetime, timedelta
 
 from config import load_config
-from log_utils import append_run_log
-from main import main
+from log_utils import append_event, append_run_log
+import market_calendar
+from main import describe_triggers, get_trigger_engine, load_last_events_by_type, main, warm_up
+from runtime import Runtime
+
+
+def sleep_until(target, wake=None):
+    """Sleeps until `target`; returns True when `wake` (a threading.Event) cut it short."""
+    seconds = (target - datetime.now(target.tzinfo)).total_seconds()
+    if seconds <= 0:
+        return False
+    if wake is not None:
+        return wake.wait(seconds)
+    time.sleep(seconds)
+    return False
+
+
+def log_open_cycle(trades_path, timing, warm, warmup_seconds=None):
+    """Compares the opening cycle with the last cold one (`open_cycle` events)."""
+    if not timing:
+        return
+    cold_reference = None
+    for event in load_last_events_by_type(trades_path, "open_cycle", limit=20):
+        if not event.get("warm"):
+            cold_reference = event.get("wall_seconds")
+            break
+    event = {
+        "type": "open_cycle",
+        "warm": warm,
+        "wall_seconds": timing["wall_seconds"],
+        "warmup_seconds": warmup_seconds,
+        "cold_reference_seconds": cold_reference,
+    }
+    if warm and cold_reference:
+        event["speedup"] = round(cold_reference / max(timing["wall_seconds"], 1e-3), 2)
+        print(
+            f"🔥 Warm open cycle: {timing['wall_seconds']:.1f}s vs {cold_reference:.1f}s cold "
+            f"({event['speedup']}x faster)"
+        )
+    else:
+        print(f"🔔 Open cycle ({'warm' if warm else 'cold'}): {timing['wall_seconds']:.1f}s")
+    append_event(trades_path, event)
 
 
 def run_loop():
     config = load_config()
     default_minutes = config["trading"].get("cycle_minutes", 60)
     run_log_path = config["paths"].get("run_log_path")
+    trades_path = config["paths"]["trades_path"]
+    warmup_cfg = config["trading"].get("warmup") or {}
+    # One set of clients for the whole process: connections stay warm between cycles.
+    runtime = Runtime()
+    # Event triggers (refresh thread) can cut the sleep short for an early decision
+    trigger_engine = get_trigger_engine(config)
+    triggers = None
+    open_cycle = False
+    warmup_seconds = None
     while True:
+        timing = None
         try:
-            main()
+            timing = main(runtime, triggers=triggers)
         except Exception as exc:
             print(f"Loop error: {exc}")
             append_run_log(run_log_path, f"Loop error: {exc}")
+            runtime.reset()
+        if open_cycle:
+            log_open_cycle(trades_path, timing, warmup_seconds is not None, warmup_seconds)
         # Smart Sleep: Align to the next cycle mark (e.g., :00, :30)
         # This ensures we hit 15:30 market open precisely even if started at 15:26
-        from datetime import datetime, timedelta
-        
+
         now = datetime.now()
         cycle = int(default_minutes)
         if cycle < 1: cycle = 1
-        
+
         # Calculate minutes to next grid point
         # Example: cycle=30, now=15:26 -> remainder=26 -> wait=4 -> target 15:30
         remainder = now.minute % cycle
         wait_minutes = cycle - remainder
-        
+
         # Calculate target time (zero seconds)
         target = now + timedelta(minutes=wait_minutes)
         target = target.replace(second=0, microsecond=0)
-        
+
         seconds_to_sleep = (target - now).total_seconds()
-        
+
         # Safety buffering
         if seconds_to_sleep < 1:
             seconds_to_sleep += 60 # wait at least a minute if we are literally on the edge
-            
+            target = now + timedelta(seconds=seconds_to_sleep)
+
+        # Market closed at the next grid point (night, weekend, holiday, early close):
+        # skip the idle cycles and sleep straight to the next NYSE open.
+        target_aware = target.astimezone()
+        session_open, session_close = market_calendar.next_session(target_aware)
+        if target_aware < session_open:
+            target_aware = session_open.astimezone()
+            target = target_aware.astimezone().replace(tzinfo=None)
+            print(f"🌙 Market closed until {session_open.strftime('%a %d/%m %H:%M')} NY, skipping idle cycles.")
+
+        # Is the next cycle the first one of the NY session? Then warm up before the open.
+        next_open = market_calendar.next_open(now.astimezone())
+        open_cycle = next_open <= target_aware
+        warmup_seconds = None
+        if open_cycle and warmup_cfg.get("enabled"):
+            # Relative to the opening cycle (== the open when the grid lands on 09:30 NY)
+            warmup_at = target_aware - timedelta(minutes=float(warmup_cfg.get("minutes_before_open", 5)))
+            print(f"⏳ Waiting until {warmup_at.strftime('%H:%M:%S')} for the pre-open warm-up...")
+            sleep_until(warmup_at)
+            try:
+                warmup_seconds = warm_up(runtime)["wall_seconds"]
+            except Exception as exc:
+                print(f"⚠️ Warm-up failed: {exc}")
+                append_run_log(run_log_path, f"Warm-up failed: {exc}")
+
+        seconds_to_sleep = max(0, (target_aware - datetime.now().astimezone()).total_seconds())
         print(f"⏳ Waiting {int(seconds_to_sleep)}s until {target.strftime('%H:%M:%S')}...")
-        time.sleep(seconds_to_sleep)
+        triggers = None
+        while sleep_until(target_aware, wake=trigger_engine.wake if trigger_engine else None):
+            # Empty when the last decision already covered them: keep sleeping
+            triggers = trigger_engine.take()
+            if triggers:
+                # Early cycle: the opening-cycle comparison only applies to the scheduled one
+                open_cycle = False
+                print(f"⚡ Early decision cycle: {describe_triggers(triggers)}")
+                break
 
 
 if __name__ == "__main__":
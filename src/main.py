@@ -4,28 +4,71 @@ from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
-from dotenv import load_dotenv
-
 from broker import PaperBroker
 from config import load_config
 from dashboard import load_decision_history, load_equity_series, write_dashboard
-from decision import parse_decision
-from llm import LLMClient
+from event_triggers import build_trigger_engine
+from incremental_prompt import build_incremental_context
+from news_store import build_news_store
+from exit_triggers import ExitTriggerIndex
+from decision import EARLY_DECISION_FIELDS, parse_decision
+from decision_ensemble import combine_decisions, combined_usage, run_ensemble
+from decision_stream import DecisionStream
+from runtime import Runtime
+from pipeline import StagePipeline
+from prompt_builder import (
+    PromptBuilder,
+    build_prompt_builder,
+    count_tokens,
+    format_decisions,
+    format_events,
+    format_positions,
+    format_watchlist,
+)
+import metrics
+import tracing
+from llm import set_request_hook, usage_cost
 from log_utils import append_event, append_run_log
+import market_calendar
 from live_search import LiveSearchUnavailable, fetch_live_context
-from live_search_cache import is_cache_fresh, read_cache, write_cache
-from market import get_market_data, get_last_price
+from live_search_cache import build_live_search_store, query_key
+import market
+from market import get_daily_atr, get_market_data, get_last_price, get_ticker, prefetch_daily_bars
+from quote_stream import DEFAULT_STREAM_URL, QuoteBoard, QuoteStream, QuoteStreamUnavailable
+from refresh_scheduler import build_refresh_scheduler
 from state import Portfolio
-from alpaca_broker import AlpacaBroker
 import os
 import threading
 import time
-import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor
 
 # Cache for market regime and top movers (refreshed per cycle)
 _market_regime_cache = {"regime": None, "details": None, "timestamp": None}
 _top_movers_cache = {"gainers": [], "volume_spikes": [], "timestamp": None}
-_same_day_exit_block_until = {}
+# SL/TP trigger index shared by the refresh thread and the main cycle
+_exit_index = ExitTriggerIndex()
+_exit_index_lock = threading.Lock()
+
+# Streaming last-trade board (optional, see market.stream); polling stays the fallback
+_quote_board = QuoteBoard()
+_quote_stream = None
+# Set when the stream could not start: polling only for the rest of the process
+_quote_stream_failed = False
+# Set by the stream when a trade crosses SL/TP so the refresh loop runs right away
+_refresh_wake = threading.Event()
+# (symbol, trigger) -> monotonic time of the last wake it caused: a level still
+# crossed wakes the loop again only every _stream_wake_seconds, until the price
+# moves back inside it or the position is gone
+_stream_crossed = {}
+_stream_wake_seconds = 2.0
+# Out-of-cycle decision triggers (see trading.event_triggers); loop.py waits on its wake event
+_trigger_engine = None
+# Conversation state of the incremental prompt mode (see prompt.incremental)
+_incremental_context = None
+# Per-query live search answers (see live_search.cache_*), one store per cache file
+_live_search_stores = {}
+# Headlines already shown to the model (see live_search.news_dedup)
+_news_store = None
 
 # Top 100 liquid US stocks for screening
 TOP_100_STOCKS = [
@@ -53,10 +96,12 @@ def get_market_regime():
     if _market_regime_cache["timestamp"]:
         age = (datetime.now() - _market_regime_cache["timestamp"]).total_seconds()
         if age < 1800:  # 30 minutes
+            metrics.inc("gat_cache_requests_total", cache="market_regime", result="hit")
             return _market_regime_cache
+    metrics.inc("gat_cache_requests_total", cache="market_regime", result="miss")
     
     try:
-        spy = yf.Ticker("SPY")
+        spy = get_ticker("SPY")
         hist = spy.history(period="1mo")
         
         if len(hist) < 20:
@@ -105,21 +150,17 @@ def get_top_movers():
     if _top_movers_cache["timestamp"]:
         age = (datetime.now() - _top_movers_cache["timestamp"]).total_seconds()
         if age < 1800:
+            metrics.inc("gat_cache_requests_total", cache="top_movers", result="hit")
             return _top_movers_cache
+    metrics.inc("gat_cache_requests_total", cache="top_movers", result="miss")
     
     gainers = []
     volume_spikes = []
     
     try:
-        # Batch download for speed
-        tickers = yf.Tickers(" ".join(TOP_100_STOCKS))
-        
         for symbol in TOP_100_STOCKS:
             try:
-                ticker = tickers.tickers.get(symbol)
-                if not ticker:
-                    continue
-                    
+                ticker = get_ticker(symbol)
                 hist = ticker.history(period="22d")  # ~1 month of trading days
                 if len(hist) < 2:
                     continue
@@ -190,7 +231,18 @@ def load_last_events_by_type(path, event_type, limit=1):
     return matches
 
 
-def build_market_snapshot(portfolio, watchlist=None):
+@tracing.traced("market_snapshot")
+def build_market_snapshot(portfolio, watchlist=None, quotes=None, live_prices=None, previous_prices=None):
+    """
+    `quotes` (symbol -> market data) lets a caller that already fetched prices,
+    like the refresh scheduler, skip the per-symbol yfinance calls.
+    `live_prices` (symbol -> last streamed trade) override every other source.
+    `previous_prices` (symbol -> price of the last snapshot) hold a position the
+    scheduler deferred at its last price instead of fetching it outside the budget.
+    """
+    quotes = quotes or {}
+    live_prices = live_prices or {}
+    previous_prices = previous_prices or {}
     positions = {}
     price_by_symbol = {}
     positions_value = 0.0
@@ -204,9 +256,19 @@ def build_market_snapshot(portfolio, watchlist=None):
         avg_entry = normalized.get("avg_entry")
         # Use trusted price from broker if available, else fetch
         cached_price = normalized.get("current_price")
-        if cached_price is not None:
+        live_price = live_prices.get(symbol)
+        if live_price is not None:
+             price = live_price
+             price_by_symbol[symbol] = price
+        elif cached_price is not None:
              price = cached_price
              price_by_symbol[symbol] = price
+        elif symbol in quotes:
+             price = quotes[symbol].get("price")
+             price_by_symbol[symbol] = price
+        elif previous_prices.get(symbol) is not None:
+             price = previous_prices[symbol]
+             price_by_symbol[symbol] = price
         else:
              price = get_last_price(symbol)
              price_by_symbol[symbol] = price
@@ -220,8 +282,8 @@ def build_market_snapshot(portfolio, watchlist=None):
         pnl = None
         pnl_pct = None
         
-        # Use trusted PnL from broker if available
-        cached_pnl = normalized.get("unrealized_pl")
+        # Use trusted PnL from broker if available (unless a streamed price is newer)
+        cached_pnl = normalized.get("unrealized_pl") if live_price is None else None
         
         if cached_pnl is not None:
              pnl = cached_pnl
@@ -265,7 +327,12 @@ def build_market_snapshot(portfolio, watchlist=None):
             if symbol in price_by_symbol:
                 watchlist_prices[symbol] = price_by_symbol[symbol]
                 continue
-            market_data = get_market_data(symbol) or {}
+            if symbol in quotes:
+                market_data = quotes[symbol]
+            else:
+                market_data = get_market_data(symbol) or {}
+            if symbol in live_prices:
+                market_data = dict(market_data, price=live_prices[symbol])
             price = market_data.get("price")
             price_by_symbol[symbol] = price
             watchlist_prices[symbol] = market_data # Store FULL object (price, atr, volatility_pct)
@@ -282,6 +349,46 @@ def build_market_snapshot(portfolio, watchlist=None):
     }
 
 
+def fetch_quotes(symbols, max_workers=8):
+    """Market data for several symbols at once (symbol -> data, {} when unavailable)."""
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {}
+
+    def fetch(symbol):
+        try:
+            return get_market_data(symbol) or {}
+        except Exception as exc:
+            print(f"⚠️ Quote fetch failed for {symbol}: {exc}")
+            return {}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(int(max_workers), len(symbols)))) as pool:
+        return dict(zip(symbols, pool.map(fetch, symbols)))
+
+
+# Stopwords: common English words + indices + currencies
+TICKER_STOPWORDS = {"THE", "AND", "FOR", "THAT", "WITH", "THIS", "FROM", "HAVE", "ARE", "NOT", "BUT", "ALL", "WHO", "WHAT", "WHEN", "WHERE", "WHY", "HOW", "CAN", "YOU", "YOUR", "THEY", "THEIR", "OUR", "WE", "SHE", "HE", "IT", "IS", "AM", "ARE", "WAS", "WERE", "BE", "BEEN", "BEING", "HAS", "HAD", "DO", "DOES", "DID", "JONES", "DOW", "NASDAQ", "NYSE", "AMEX", "ETF", "USD", "EUR", "GBP", "AUD", "CAD", "JPY", "CNY", "HKD", "CHF", "SEK", "NZD", "KRW", "SGD", "NOK", "MXN", "INR", "RUB", "ZAR", "TRY", "BRL", "TWD", "DKK", "PLN", "THB", "IDR", "HUF", "CZK", "ILS", "CLP", "PHP", "AED", "COP", "SAR", "MYR", "RON"}
+# Crypto blocklist: NOT US equities
+TICKER_CRYPTO_BLOCKLIST = {"BTC", "ETH", "XRP", "BNB", "SOL", "ADA", "DOGE", "DOT", "AVAX", "SHIB", "MATIC", "LTC", "TRX", "LINK", "XLM", "ATOM", "UNI", "ETC", "XMR", "BCH", "FIL", "APT", "NEAR", "VET", "ICP", "QNT", "AAVE", "GRT", "ALGO", "EOS", "THETA", "SAND", "MANA", "AXS", "FTM", "RUNE", "ZEC", "EGLD", "XTZ", "FLOW", "NEO", "MKR", "KAVA", "SNX", "CHZ", "ENJ", "CRV", "LDO", "IMX", "APE", "RPL", "GMX", "STX", "OSMO", "PEPE", "WIF", "BONK", "FLOKI", "ARB", "OP", "SUI", "SEI", "TIA", "JUP", "PYTH", "RNDR", "FET", "TAO", "USDT", "USDC", "DAI", "BUSD", "TUSD", "CNBC", "US", "UK", "EU", "FED", "CEO", "CFO", "CTO", "IPO", "SEC", "FDA", "GDP", "CPI", "PPI", "PMI", "NFT", "DCA", "ATH", "ATL", "ROI", "APY", "APR", "ICO", "IEO", "IDO", "DAO", "DEX", "CEX", "AMM", "TVL", "HODL", "FOMO", "FUD", "RLUSD", "LMAX", "IB", "GSPC", "IXIC", "DJI", "RUT", "VIX", "HQ", "CNN", "DOJ", "EV"}
+# Symbol normalization: common variations to correct tickers
+TICKER_SYMBOL_MAPPING = {"TSMC": "TSM", "GOOGLE": "GOOGL", "FACEBOOK": "META", "FB": "META"}
+
+
+def extract_dynamic_tickers(live_context):
+    """Tickers mentioned in the live search context (DYNAMIC WATCHLIST)."""
+    if not live_context or live_context == "none":
+        return []
+    # Rough regex for tickers (2-5 uppercase letters)
+    potential_tickers = set(re.findall(r'\b[A-Z]{2,5}\b', live_context))
+    dynamic_tickers = []
+    for t in potential_tickers:
+        if t in TICKER_STOPWORDS or t in TICKER_CRYPTO_BLOCKLIST:
+            continue
+        # Normalize if mapping exists
+        dynamic_tickers.append(TICKER_SYMBOL_MAPPING.get(t, t))
+    return dynamic_tickers
+
+
 def build_positions_summary(portfolio):
     if not portfolio.positions:
         return "Aucune position ouverte."
@@ -289,15 +396,23 @@ def build_positions_summary(portfolio):
     return f"Positions ouvertes: {symbols}."
 
 
-def get_session_state():
+def get_session_state(now=None):
+    """Session flags for `now` (default: the current time)."""
     ny_tz = ZoneInfo("America/New_York")
     paris_tz = ZoneInfo("Europe/Paris")
-    now_ny = datetime.now(ny_tz)
-    open_ny = now_ny.replace(hour=9, minute=30, second=0, microsecond=0)
-    # SAFETY: We set "close_ny" to 15:55 (5 mins before actual close)
+    now_ny = now.astimezone(ny_tz) if now else datetime.now(ny_tz)
+    # Holidays and early closes come from the local NYSE calendar
+    trading_session = market_calendar.session_for(now_ny.date())
+    if trading_session:
+        open_ny, real_close_ny = trading_session
+    else:
+        open_ny = now_ny.replace(hour=9, minute=30, second=0, microsecond=0)
+        real_close_ny = now_ny.replace(hour=16, minute=0, second=0, microsecond=0)
+    # SAFETY: We set "close_ny" 5 mins before the actual close (15:55, or 12:55 on early closes)
     # This ensures "after_close" triggers whilst the market is still accepting orders.
-    close_ny = now_ny.replace(hour=15, minute=55, second=0, microsecond=0)
+    close_ny = real_close_ny - timedelta(minutes=5)
     cutoff_ny = close_ny - timedelta(minutes=30)
+    is_weekend = now_ny.weekday() >= 5
     return {
         "now_ny": now_ny,
         "open_ny": open_ny,
@@ -306,9 +421,11 @@ def get_session_state():
         "open_paris": open_ny.astimezone(paris_tz),
         "close_paris": close_ny.astimezone(paris_tz),
         "cutoff_paris": cutoff_ny.astimezone(paris_tz),
-        "is_weekend": now_ny.weekday() >= 5,
-        "in_session": open_ny <= now_ny < close_ny,
-        "in_cutoff": cutoff_ny <= now_ny < close_ny,
+        "is_weekend": is_weekend,
+        "holiday": None if is_weekend else market_calendar.holiday_name(now_ny.date()),
+        "early_close": bool(trading_session) and real_close_ny.hour < 16,
+        "in_session": bool(trading_session) and open_ny <= now_ny < close_ny,
+        "in_cutoff": bool(trading_session) and cutoff_ny <= now_ny < close_ny,
         "after_close": now_ny >= close_ny,
     }
 
@@ -372,55 +489,36 @@ def log_trade(run_log_path, result, reason=None):
     append_run_log(run_log_path, line)
 
 
-def list_exit_triggers(market_snapshot):
-    triggers = []
-    for symbol, info in market_snapshot["positions"].items():
-        qty = info.get("qty", 0.0)
-        price = info.get("price")
-        if price is None or qty <= 0:
-            continue
-        sl_price = info.get("sl")
-        tp_price = info.get("tp")
-        if sl_price is not None and price <= sl_price:
-            triggers.append(
-                {
-                    "symbol": symbol,
-                    "qty": qty,
-                    "price": price,
-                    "trigger": "SL",
-                    "sl": sl_price,
-                    "tp": tp_price,
-                }
-            )
-        elif tp_price is not None and price >= tp_price:
-            triggers.append(
-                {
-                    "symbol": symbol,
-                    "qty": qty,
-                    "price": price,
-                    "trigger": "TP",
-                    "sl": sl_price,
-                    "tp": tp_price,
-                }
-            )
-    return triggers
+def list_exit_triggers(market_snapshot, trail_pct=None):
+    """
+    Returns SL/TP triggers for the snapshot, via the shared trigger index (which
+    also sees the streamed trades and keeps the trailing stops and suppressions).
+    Every position is checked once per call, like build_market_snapshot prices it.
+    """
+    positions = market_snapshot["positions"]
+    with _exit_index_lock:
+        _exit_index.trail_pct = trail_pct
+        _exit_index.sync(positions)
+        return _exit_index.on_prices(
+            (symbol, info.get("price")) for symbol, info in positions.items()
+        )
+
+
+def exit_stop_level(symbol):
+    """Effective local stop of `symbol` (SL raised by the trailing stop), or None."""
+    with _exit_index_lock:
+        return _exit_index.stop_level(symbol)
 
 
 def is_same_day_exit_suppressed(symbol, trigger_type):
-    key = (symbol, trigger_type)
-    until = _same_day_exit_block_until.get(key)
-    if until is None:
-        return False
-    if datetime.now(timezone.utc) < until:
-        return True
-    _same_day_exit_block_until.pop(key, None)
-    return False
+    return _exit_index.is_suppressed(symbol, trigger_type)
 
 
 def suppress_same_day_exit(symbol, trigger_type):
     now = datetime.now(timezone.utc)
     until = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-    _same_day_exit_block_until[(symbol, trigger_type)] = until
+    _exit_index.suppress(symbol, trigger_type, until)
+    metrics.inc("gat_exits_suppressed_total", trigger=trigger_type)
     return until.isoformat()
 
 
@@ -523,7 +621,7 @@ def build_system_prompt():
         "### 1. ANALYSIS\n"
         "- Check **MARKET REGIME**: BULL=aggressive, BEAR=prudent, SIDEWAYS=wait.\n"
         "- Check **TOP MOVERS**: Prioritize stocks with +3% gains or volume spikes.\n"
-        "- Read 'Live context' (recent news) and 'Market snapshot' (price, ATR)\n"
+        "- Read 'Live context' (recent news) and the 'Positions' and 'Watchlist' tables (price, ATR)\n"
         "- Identify catalysts: earnings, upgrades, breaking news\n"
         "\n"
         "### 2. SIGNAL\n"
@@ -578,16 +676,17 @@ def build_system_prompt():
         "  \"action\": \"BUY|SELL|HOLD\",\n"
         "  \"symbol\": \"TICKER\",\n"
         "  \"notional\": 50.0,\n"
-        "  \"reason\": \"Explication courte en français\",\n"
-        "  \"confidence\": 0.85,\n"
-        "  \"reflection\": \"Synthèse courte en français: News → Signal → Risk\",\n"
         "  \"sl_price\": 95.50,\n"
         "  \"tp_price\": 110.00,\n"
+        "  \"confidence\": 0.85,\n"
+        "  \"reason\": \"Explication courte en français\",\n"
+        "  \"reflection\": \"Synthèse courte en français: News → Signal → Risk\",\n"
         "  \"evidence\": [\"Source 1\", \"ATR: 2.5\"]\n"
         "}\n"
         "```\n"
         "\n"
         "**Notes:**\n"
+        "- Keep the keys in this order (trade fields first)\n"
         "- BUY = Open new long position\n"
         "- SELL = Close existing position (never same day as BUY)\n"
         "- HOLD = Wait or adjust SL/TP of existing position\n"
@@ -605,7 +704,12 @@ def build_user_prompt(
     symbol_rules,
     decision_memory,
     fixed_minutes,
+    regime_data=None,
+    movers_data=None,
+    triggers=None,
+    builder=None,
 ):
+    """Returns (prompt, stats): the user prompt and its token counts per section."""
     paris_tz = ZoneInfo("Europe/Paris")
     current_time_paris = datetime.now(paris_tz).strftime("%Y-%m-%d %H:%M:%S %Z")
 
@@ -629,51 +733,97 @@ def build_user_prompt(
     else:
         performance_line = "**PERFORMANCE**: unavailable because equity or starting cash is invalid.\n\n"
     
-    # Get market regime and top movers
-    regime_data = get_market_regime()
-    movers_data = get_top_movers()
+    # Market regime and top movers (main() fetches them concurrently and passes them in)
+    if regime_data is None:
+        regime_data = get_market_regime()
+    if movers_data is None:
+        movers_data = get_top_movers()
     
     # Format top movers
     gainers_str = ", ".join([f"{g['symbol']} +{g['change']:.1f}%" for g in movers_data.get("gainers", [])])
     volume_str = ", ".join([f"{v['symbol']} ({v['vol_ratio']:.1f}x)" for v in movers_data.get("volume_spikes", [])])
-    
-    return (
-        "CONTEXT:\n"
-        f"Current Date/Time: {current_time_paris}\n\n"
-        f"📊 MARKET REGIME: {regime_data.get('regime', 'UNKNOWN')} {regime_data.get('emoji', '')}\n"
-        f"{regime_data.get('details', '')}\n\n"
-        f"🔥 TOP MOVERS TODAY:\n"
-        f"Gainers: {gainers_str or 'None detected'}\n"
-        f"Volume Spikes: {volume_str or 'None detected'}\n\n"
-        "Portfolio:\n"
-        f"Cash: {portfolio.cash} {portfolio.currency}\n"
-        f"Buying Power: {getattr(portfolio, 'buying_power', portfolio.cash)} {portfolio.currency}\n"
-        f"Positions: {json.dumps(portfolio.positions)}\n\n"
-        "Market snapshot:\n"
-        f"{json.dumps(market_snapshot)}\n\n"
-        "Portfolio metrics:\n"
-        f"Equity: {market_snapshot.get('equity')}\n"
-        f"Gross exposure: {market_snapshot.get('gross_exposure')}\n"
-        f"Net exposure: {market_snapshot.get('net_exposure')}\n"
-        f"Leverage: {market_snapshot.get('leverage')}\n"
-        f"Cash ratio: {market_snapshot.get('cash_ratio')}\n\n"
-        f"Equity change since last snapshot: {json.dumps(equity_delta)}\n\n"
-        f"Starting cash budget: {starting_cash} {portfolio.currency}\n"
-        f"{performance_line}"
-        f"Live context:\n{live_context}\n\n"
-        "Decision memory:\n"
-        f"{json.dumps(decision_memory)}\n\n"
-        "Recent events:\n"
-        f"{json.dumps(recent_events)}\n\n"
+
+    # Compact sections with token budgets (see prompt_builder); priority 0 is never trimmed.
+    # Ordered from the most stable to the most volatile so consecutive prompts share a
+    # long prefix (system prompt + rules + cached market context) for provider prompt caching.
+    builder = builder or PromptBuilder()
+    builder.add(
+        "instructions",
         f"Allowed symbols: {', '.join(allowed_symbols) if allowed_symbols else 'any'}.\n"
         f"Symbol rules: {symbol_rules or 'none'}.\n"
         "Decide your next action using the allowed symbols and symbol rules only.\n"
         "If evidence is mixed, incomplete, stale, or low-confidence, return HOLD.\n"
-        "Return valid JSON only, matching the required schema.\n"
-        f"Set next_check_minutes to {fixed_minutes} (system uses a fixed schedule).\n"
+        f"Set next_check_minutes to {fixed_minutes} (system uses a fixed schedule).",
+        title="RULES",
+    )
+    builder.add(
+        "regime",
+        f"📊 MARKET REGIME: {regime_data.get('regime', 'UNKNOWN')} {regime_data.get('emoji', '')}\n"
+        f"{regime_data.get('details', '')}",
+    )
+    builder.add(
+        "movers",
+        f"🔥 TOP MOVERS TODAY:\nGainers: {gainers_str or 'None detected'}\n"
+        f"Volume Spikes: {volume_str or 'None detected'}",
+        priority=1,
+    )
+    builder.add("live_context", str(live_context).strip() or "none", title="Live context", priority=4)
+    builder.add("decision_memory", format_decisions(decision_memory), title="Decision memory", priority=5)
+    builder.add("recent_events", format_events(recent_events), title="Recent events", priority=6)
+    builder.add(
+        "portfolio",
+        f"Cash: {portfolio.cash} {portfolio.currency}\n"
+        f"Buying Power: {getattr(portfolio, 'buying_power', portfolio.cash)} {portfolio.currency}\n"
+        f"Equity: {market_snapshot.get('equity')} | Positions value: {market_snapshot.get('positions_value')} | "
+        f"Open PnL: {market_snapshot.get('open_pnl')}\n"
+        f"Gross exposure: {market_snapshot.get('gross_exposure')} | Net exposure: {market_snapshot.get('net_exposure')} | "
+        f"Leverage: {market_snapshot.get('leverage')} | Cash ratio: {market_snapshot.get('cash_ratio')}\n"
+        f"Equity change since last snapshot: {json.dumps(equity_delta)}\n"
+        f"Starting cash budget: {starting_cash} {portfolio.currency}\n"
+        f"{performance_line.strip()}",
+        title="Portfolio",
+    )
+    builder.add(
+        "positions",
+        format_positions(market_snapshot.get("positions"), portfolio.positions),
+        title="Positions",
+        priority=2,
     )
+    builder.add(
+        "watchlist",
+        format_watchlist(market_snapshot.get("watchlist_prices")),
+        title="Watchlist",
+        priority=3,
+    )
+    # Out-of-cycle decision: tell the model what brought it forward
+    if triggers:
+        builder.add(
+            "triggers",
+            "\n".join(json.dumps(trigger, separators=(",", ":")) for trigger in triggers),
+            title="⚡ EARLY DECISION TRIGGERED BY",
+            priority=1,
+        )
+    # Volatile suffix: the clock changes on every call
+    builder.add(
+        "context",
+        f"CONTEXT:\nCurrent Date/Time: {current_time_paris}\n"
+        "Return valid JSON only, matching the required schema.",
+    )
+    return builder.build()
 
 
+def log_llm_usage(usage, trades_path, pricing=None):
+    if not usage:
+        return
+    # Prompt-cache accounting: cached vs uncached prompt tokens, latency and cost.
+    # Telemetry only: a bad price or usage payload must never cost the decision.
+    try:
+        cost, savings = usage_cost(usage, pricing)
+        append_event(
+            trades_path, {"type": "llm_usage", **usage, "cost_usd": cost, "cache_savings_usd": savings}
+        )
+    except Exception as exc:
+        print(f"⚠️ LLM usage logging failed: {exc}")
 
 
 def request_decision(
@@ -683,11 +833,83 @@ def request_decision(
     trades_path,
     positions_open,
     positions_summary_default,
+    history=None,
+    pricing=None,
+    streaming=None,
+    ensemble=None,
 ):
-    raw = llm.decide(system_prompt, user_prompt)
+    """
+    Returns (raw, decision, stream). With `llm.streaming` enabled and a BUY/SELL whose
+    execution fields arrived early, raw is None and `stream` is still receiving the
+    reason/reflection text: finish it with finish_streamed_decision().
+    `llm.ensemble` takes precedence over streaming: the samples are voted on whole.
+    """
+    ensemble = ensemble or {}
+    streaming = {} if ensemble.get("enabled") else streaming or {}
+    ensemble_decision = None
+    usage = None
+    if streaming.get("enabled"):
+        stream = DecisionStream(
+            llm,
+            system_prompt,
+            user_prompt,
+            history=history,
+            deadline_seconds=streaming.get("deadline_seconds", 45),
+        ).start()
+        if streaming.get("early_execution", True):
+            early = stream.wait_early()
+            # HOLD has nothing to execute: it waits for the full answer like before
+            if early is not None and early["action"] != "HOLD":
+                early["positions_ack"] = "OPEN" if positions_open else "NONE"
+                early["positions_summary"] = early.get("positions_summary") or positions_summary_default
+                append_event(
+                    trades_path,
+                    {"type": "decision_early", "decision": early, "seconds": stream.early_seconds},
+                )
+                print(f"⚡ Early decision after {stream.early_seconds}s: {early['action']} {early['symbol']}")
+                return None, early, stream
+    try:
+        if ensemble.get("enabled"):
+            raw, ensemble_decision, usage = request_ensemble_decision(
+                llm, system_prompt, user_prompt, trades_path, ensemble, history=history
+            )
+        elif streaming.get("enabled"):
+            raw = stream.wait()
+        else:
+            raw = llm.decide(system_prompt, user_prompt, history=history)
+    except TimeoutError as exc:
+        # Stream deadline or request policy deadline (llm.request_policy)
+        message = str(exc)
+        append_event(
+            trades_path,
+            {
+                "type": "decision_error",
+                "message": message,
+                "raw": stream.partial if streaming.get("enabled") else None,
+                "attempt": 1,
+            },
+        )
+        fallback = {
+            "action": "HOLD",
+            "symbol": None,
+            "notional": None,
+            "reason": f"Délai LLM dépassé: {message}",
+            "confidence": 0.0,
+            "reflection": "Je reste en attente.",
+            "sl_price": None,
+            "tp_price": None,
+            "next_check_minutes": None,
+            "positions_ack": "OPEN" if positions_open else "NONE",
+            "positions_summary": positions_summary_default,
+            "evidence": [],
+        }
+        append_event(trades_path, {"type": "decision_fallback", "decision": fallback})
+        print(f"⏱️ {message} -> HOLD")
+        return None, fallback, None
     append_event(trades_path, {"type": "decision", "raw": raw, "attempt": 1})
+    log_llm_usage(usage or getattr(llm, "last_usage", None), trades_path, pricing)
     try:
-        decision = parse_decision(raw)
+        decision = ensemble_decision if ensemble_decision is not None else parse_decision(raw)
     except Exception as exc:
         message = str(exc)
         append_event(
@@ -716,7 +938,7 @@ def request_decision(
         append_event(
             trades_path, {"type": "decision_fallback", "decision": fallback}
         )
-        return raw, fallback
+        return raw, fallback, None
 
     desired_ack = "OPEN" if positions_open else "NONE"
     corrected = False
@@ -754,7 +976,7 @@ def request_decision(
         append_event(
             trades_path, {"type": "decision_fallback", "decision": fallback}
         )
-        return raw, fallback
+        return raw, fallback, None
 
     if corrected:
         append_event(
@@ -764,7 +986,99 @@ def request_decision(
         trades_path,
         {"type": "decision_parsed", "decision": decision, "attempt": 1},
     )
-    return raw, decision
+    return raw, decision, None
+
+
+def request_ensemble_decision(llm, system_prompt, user_prompt, trades_path, ensemble, history=None):
+    """
+    Runs the `llm.ensemble` samples and logs a decision_ensemble event with per-sample
+    timings and the vote. Returns (raw, decision, usage); decision is None when no
+    sample parsed (raw then goes through the usual invalid-decision fallback).
+    """
+    samples = max(1, int(ensemble.get("samples", 3)))
+    deadline_seconds = ensemble.get("deadline_seconds", 60)
+    started = time.perf_counter()
+    results = run_ensemble(
+        llm, system_prompt, user_prompt, samples=samples, deadline_seconds=deadline_seconds, history=history
+    )
+    decision, stats = combine_decisions(results, min_agreement=ensemble.get("min_agreement", 0.5))
+    stats["wall_seconds"] = round(time.perf_counter() - started, 3)
+    stats["serial_seconds"] = round(sum(result["seconds"] or 0 for result in results), 3)
+    append_event(
+        trades_path,
+        {
+            "type": "decision_ensemble",
+            **stats,
+            "votes": [
+                {
+                    "index": result["index"],
+                    "status": result["status"],
+                    "seconds": result["seconds"],
+                    "action": (result["decision"] or {}).get("action"),
+                    "symbol": (result["decision"] or {}).get("symbol"),
+                    "notional": (result["decision"] or {}).get("notional"),
+                    "confidence": (result["decision"] or {}).get("confidence"),
+                    "error": result["error"],
+                }
+                for result in results
+            ],
+        },
+    )
+    metrics.inc("gat_llm_ensembles_total", action=stats.get("action"))
+    print(
+        f"🗳️ Ensemble {stats['parsed']}/{samples}: {stats['actions']} -> {stats.get('action')} "
+        f"(agreement {stats['agreement']:.0%}, {stats['wall_seconds']}s)"
+    )
+    answered = [result for result in results if result["raw"] is not None]
+    if not answered:
+        if any(result["status"] == "timeout" for result in results):
+            raise TimeoutError(f"No ensemble sample answered within {deadline_seconds}s")
+        raise RuntimeError("; ".join(result["error"] or "" for result in results))
+    representative = results[stats["representative"]] if decision is not None else answered[0]
+    return representative["raw"], decision, combined_usage(results)
+
+
+def finish_streamed_decision(stream, decision, llm, trades_path, pricing=None):
+    """
+    Waits for the rest of an early-executed stream and completes `decision` with the
+    reason, confidence, reflection and evidence. Returns the raw answer (None when the
+    stream failed or hit its deadline: the early decision stands as is). The decision
+    is logged as parsed either way, since it was acted on.
+    """
+    try:
+        raw = stream.wait()
+    except Exception as exc:
+        append_event(
+            trades_path,
+            {"type": "decision_error", "message": str(exc), "raw": stream.partial, "attempt": 1},
+        )
+        append_event(
+            trades_path,
+            {"type": "decision_parsed", "decision": decision, "attempt": 1, "early": True, "mismatch": None},
+        )
+        print(f"⏱️ Decision text incomplete ({exc}); keeping the early decision")
+        return None
+    append_event(trades_path, {"type": "decision", "raw": raw, "attempt": 1})
+    log_llm_usage(getattr(llm, "last_usage", None), trades_path, pricing)
+    try:
+        full = parse_decision(raw)
+    except Exception as exc:
+        append_event(trades_path, {"type": "decision_error", "message": str(exc), "raw": raw, "attempt": 1})
+        append_event(
+            trades_path,
+            {"type": "decision_parsed", "decision": decision, "attempt": 1, "early": True, "mismatch": None},
+        )
+        return raw
+    for key in ("reason", "confidence", "reflection", "evidence", "positions_summary"):
+        if full.get(key):
+            decision[key] = full[key]
+    # The execution fields were already acted on; a different final value is only reported
+    mismatch = [key for key in EARLY_DECISION_FIELDS if full.get(key) != decision.get(key)]
+    append_event(
+        trades_path,
+        {"type": "decision_parsed", "decision": decision, "attempt": 1, "early": True, "mismatch": mismatch},
+    )
+    return raw
 
 
 def build_dashboard_payload(
@@ -807,15 +1121,18 @@ def build_dashboard_payload(
         "next_check_minutes": decision.get("next_check_minutes") if decision else None,
         "positions_summary": decision.get("positions_summary") if decision else None,
         "broker_connected": broker_connected,
+        "latency": tracing.percentiles() if tracing.is_enabled() else None,
     }
 
 
-def check_and_execute_exits(portfolio, market_snapshot, broker, trades_path, run_log_path):
+def check_and_execute_exits(
+    portfolio, market_snapshot, broker, trades_path, run_log_path, trail_pct=None, broker_snapshot=None
+):
     """
     Checks for SL/TP triggers and executes them immediately.
     Returns True if any trade was executed, False otherwise.
     """
-    exit_triggers = list_exit_triggers(market_snapshot)
+    exit_triggers = list_exit_triggers(market_snapshot, trail_pct=trail_pct)
     if not exit_triggers:
         return False
     
@@ -826,9 +1143,6 @@ def check_and_execute_exits(portfolio, market_snapshot, broker, trades_path, run
         price = trigger["price"]
         trigger_type = trigger["trigger"]
 
-        if is_same_day_exit_suppressed(symbol, trigger_type):
-            continue
-        
         print(f"🚨 AUTO-EXIT TRIGGERED: {trigger_type} on {symbol} at {price}")
         
         try:
@@ -843,7 +1157,9 @@ def check_and_execute_exits(portfolio, market_snapshot, broker, trades_path, run
                 notional=notional,
                 price=price,
                 portfolio=portfolio,
+                snapshot=broker_snapshot,
             )
+            metrics.inc("gat_exits_total", trigger=trigger_type, status=result.action)
             
             # Log it
             if result.action == "PENDING_EXIT":
@@ -903,6 +1219,126 @@ def check_and_execute_exits(portfolio, market_snapshot, broker, trades_path, run
     return executed
 
 
+def _on_stream_trade(symbol, price, trade):
+    """
+    Quote stream callback: only the levels of the traded symbol are checked. The
+    first crossing wakes the refresh loop; while the price stays past the level
+    (exit pending or failed) the wakes are spaced by `_stream_wake_seconds`.
+    """
+    now = time.monotonic()
+    wake = False
+    with _exit_index_lock:
+        triggers = _exit_index.on_price(symbol, price)
+        crossed = {(symbol, trigger["trigger"]) for trigger in triggers}
+        for key in [key for key in _stream_crossed if key[0] == symbol and key not in crossed]:
+            # Back inside the level, or the position is gone: re-armed
+            del _stream_crossed[key]
+        for key in crossed:
+            last = _stream_crossed.get(key)
+            if last is None or now - last >= _stream_wake_seconds:
+                _stream_crossed[key] = now
+                wake = True
+    if wake:
+        _refresh_wake.set()
+
+
+def start_quote_stream(config, symbols):
+    """Starts (once) or re-targets the streaming quote subscription."""
+    global _quote_stream, _quote_stream_failed, _stream_wake_seconds
+    stream_cfg = config.get("market", {}).get("stream") or {}
+    if not stream_cfg.get("enabled") or _quote_stream_failed:
+        return None
+    # Same spacing as the refresh scheduler's fast cadence
+    schedule_cfg = config["trading"].get("refresh_schedule") or {}
+    _stream_wake_seconds = float(schedule_cfg.get("fast_seconds", 2))
+    if _quote_stream is not None:
+        _quote_stream.set_symbols(symbols)
+        return _quote_stream
+    try:
+        _quote_stream = QuoteStream(
+            _quote_board,
+            symbols,
+            url=stream_cfg.get("url") or os.getenv("ALPACA_STREAM_URL") or DEFAULT_STREAM_URL,
+            key_id=os.getenv("ALPACA_API_KEY"),
+            secret_key=os.getenv("ALPACA_SECRET_KEY"),
+            on_trade=_on_stream_trade,
+            record_path=stream_cfg.get("record_path"),
+        ).start()
+    except QuoteStreamUnavailable as exc:
+        print(f"⚠️ Quote stream unavailable, polling only: {exc}")
+        _quote_stream_failed = True
+        return None
+    return _quote_stream
+
+
+def get_trigger_engine(config):
+    """The process-wide EventTriggerEngine, or None when trading.event_triggers is disabled."""
+    global _trigger_engine
+    if _trigger_engine is None:
+        _trigger_engine = build_trigger_engine(config)
+        if _trigger_engine is not None:
+            # Every request sent counts toward the hourly budget, not just one per cycle
+            set_request_hook(_trigger_engine.record_llm_call)
+    return _trigger_engine
+
+
+def get_incremental_context(config):
+    """The process-wide IncrementalContext, or None when prompt.incremental is disabled."""
+    global _incremental_context
+    if _incremental_context is None:
+        _incremental_context = build_incremental_context(config)
+    return _incremental_context
+
+
+def get_news_store(config):
+    """The process-wide NewsStore, or None when live_search.news_dedup is disabled."""
+    global _news_store
+    if _news_store is None:
+        _news_store = build_news_store(config)
+    return _news_store
+
+
+def get_live_search_store(config):
+    """The process-wide LiveSearchCacheStore of `live_search.cache_path`."""
+    live_search_cfg = config.get("live_search", {})
+    path = Path(live_search_cfg.get("cache_path", "data/live_search_cache.json")).resolve()
+    if path not in _live_search_stores:
+        _live_search_stores[path] = build_live_search_store(live_search_cfg)
+    return _live_search_stores[path]
+
+
+def describe_triggers(triggers):
+    return ", ".join(f"{trigger['kind']} {trigger['symbol']}" for trigger in triggers)
+
+
+def check_event_triggers(engine, market_snapshot, quotes, day, trades_path):
+    """Feeds one refresh tick to the trigger engine; a fired trigger wakes loop.py."""
+    quotes = quotes or {}
+    positions = {}
+    for symbol, entry in market_snapshot["positions"].items():
+        # Without the refresh scheduler's quotes, the ATR comes from the cached daily candles
+        atr = (quotes.get(symbol) or {}).get("atr")
+        if atr is None:
+            atr = get_daily_atr(symbol)
+        positions[symbol] = {"price": entry.get("price"), "atr": atr}
+    fired, suppressed = engine.evaluate(positions, market_snapshot.get("watchlist_prices") or {}, day)
+    for status, triggers in (("fired", fired), ("suppressed", suppressed)):
+        for trigger in triggers:
+            metrics.inc("gat_event_triggers_total", kind=trigger["kind"], status=status)
+    if fired:
+        print(f"⚡ Event trigger: {describe_triggers(fired)} -> early decision cycle")
+    if suppressed:
+        print(
+            f"🚫 Event trigger over the LLM budget ({engine.max_llm_calls_per_hour}/h): "
+            f"{describe_triggers(suppressed)}"
+        )
+    if fired or suppressed:
+        append_event(
+            trades_path, {"type": "event_trigger", "fired": fired, "suppressed": suppressed, **engine.stats()}
+        )
+    return fired
+
+
 # Global flag to control the refresh thread
 _stop_refresh_thread = False
 
@@ -920,10 +1356,26 @@ def price_refresh_loop(config, connected_broker, state_path, dashboard_path, tra
     asyncio.set_event_loop(loop)
     
     print("📊 Price Refresh Loop Started!")
+    scheduler = build_refresh_scheduler(config, interval)
+    broker_snapshot = None
+    broker_status = None
+    previous_prices = {}
+    force_broker_read = True
+
+    def read_broker(portfolio):
+        # One broker read (account + positions + open orders, concurrently);
+        # connection status, sync and pending-exit checks all read from it.
+        with tracing.span("refresh.broker_snapshot"):
+            snapshot = connected_broker.fetch_snapshot()
+        if scheduler:
+            scheduler.broker_read()
+        with tracing.span("refresh.sync"):
+            portfolio = connected_broker.sync_portfolio(portfolio, snapshot=snapshot)
+        portfolio.save(state_path)  # Persist synced state
+        return snapshot, portfolio
     
     while not _stop_refresh_thread:
-        # Capture connection status FIRST (before any potential failures)
-        broker_status = connected_broker.is_connected() if connected_broker else None
+        tick_started = time.perf_counter()
         
         try:
             # 1. Load current portfolio state
@@ -933,20 +1385,80 @@ def price_refresh_loop(config, connected_broker, state_path, dashboard_path, tra
                 currency=config["trading"]["currency"],
             )
             
-            # 1b. Sync with Alpaca to get real-time cash/positions
-            if connected_broker:
-                portfolio = connected_broker.sync_portfolio(portfolio)
-                portfolio.save(state_path)  # Persist synced state
+            # 1b. Sync with Alpaca to get real-time cash/positions, on the broker
+            # cadence: the ticks in between only poll the symbols that are due
+            broker_fresh = bool(connected_broker) and (
+                force_broker_read or scheduler is None or scheduler.broker_due()
+            )
+            if broker_fresh:
+                broker_snapshot, portfolio = read_broker(portfolio)
+                broker_status = broker_snapshot.connected
+                force_broker_read = False
             
             # 2. Build market snapshot (uses yfinance, no broker calls)
             watchlist_symbols = config["trading"].get("watchlist", []) or []
             watchlist_symbols = [s.upper() for s in watchlist_symbols]
-            market_snapshot = build_market_snapshot(portfolio, watchlist=watchlist_symbols)
+            stream_symbols = sorted(set(portfolio.positions) | set(watchlist_symbols))
+            live_prices = None
+            if start_quote_stream(config, stream_symbols):
+                max_age = config["market"]["stream"].get("max_age_seconds", 15)
+                live_prices = _quote_board.prices(max_age_seconds=max_age, symbols=stream_symbols)
+            quotes = None
+            session = get_session_state()
+            in_session = session["in_session"]
+            if scheduler:
+                # Adaptive polling: only fetch symbols that are due, within the tick budget
+                with tracing.span("refresh.quotes"):
+                    quotes = scheduler.collect(
+                        portfolio.positions, watchlist_symbols, in_session, get_market_data
+                    )
+                # Quotes polled since the broker read are newer than its prices
+                live_prices = dict(scheduler.fresh_prices(), **(live_prices or {}))
+            market_snapshot = build_market_snapshot(
+                portfolio,
+                watchlist=watchlist_symbols,
+                quotes=quotes,
+                live_prices=live_prices,
+                previous_prices=previous_prices,
+            )
             
             # 2b. CRITICAL SECURITY: Check for local SL/TP triggers and Execute immediately
             # This ensures we don't wait 30 mins for the main loop.
             if connected_broker:
-                 check_and_execute_exits(portfolio, market_snapshot, connected_broker, trades_path, run_log_path)
+                trail_pct = config["trading"].get("trailing_stop_pct")
+                if not broker_fresh and list_exit_triggers(market_snapshot, trail_pct=trail_pct):
+                    # A level crossed between broker reads: exits act on a fresh read
+                    broker_snapshot, portfolio = read_broker(portfolio)
+                    broker_status = broker_snapshot.connected
+                    market_snapshot = build_market_snapshot(
+                        portfolio,
+                        watchlist=watchlist_symbols,
+                        quotes=quotes,
+                        live_prices=live_prices,
+                        previous_prices=previous_prices,
+                    )
+                with tracing.span("refresh.exits"):
+                    executed = check_and_execute_exits(
+                        portfolio,
+                        market_snapshot,
+                        connected_broker,
+                        trades_path,
+                        run_log_path,
+                        trail_pct=trail_pct,
+                        broker_snapshot=broker_snapshot,
+                    )
+                # Positions and open orders changed: the next tick re-reads them
+                force_broker_read = force_broker_read or executed
+            previous_prices = {
+                symbol: info["price"] for symbol, info in market_snapshot["positions"].items()
+            }
+
+            # 2c. Big moves, gaps and volume spikes bring the next decision forward
+            trigger_engine = get_trigger_engine(config)
+            if trigger_engine and in_session:
+                check_event_triggers(
+                    trigger_engine, market_snapshot, quotes, session["now_ny"].date(), trades_path
+                )
             
             equity = market_snapshot["equity"]
             # equity_series removed for fluidity/performance
@@ -978,14 +1490,23 @@ def price_refresh_loop(config, connected_broker, state_path, dashboard_path, tra
                 "next_check_minutes": config["trading"].get("cycle_minutes", 30),
                 "positions_summary": None,
                 "broker_connected": broker_status,
+                "refresh": scheduler.stats() if scheduler else None,
+                "latency": tracing.percentiles() if tracing.is_enabled() else None,
             }
             write_dashboard(dashboard_path, dashboard_payload)
             
         except Exception as e:
             print(f"⚠️ Price Refresh Error: {e}")
+            force_broker_read = True
+        tick_seconds = time.perf_counter() - tick_started
+        tracing.record("refresh.tick", tick_seconds)
+        metrics.observe("gat_refresh_tick_seconds", tick_seconds)
         
-        # Sleep for interval
-        time.sleep(interval)
+        # Sleep for interval (adaptive when the scheduler is enabled);
+        # a streamed SL/TP cross wakes us up early, with a fresh broker read.
+        if _refresh_wake.wait(scheduler.next_sleep_seconds() if scheduler else interval):
+            force_broker_read = True
+        _refresh_wake.clear()
 
 
 
@@ -1019,29 +1540,275 @@ def start_price_refresh_thread(config, connected_broker, state_path, dashboard_p
     return thread
 
 
-def main():
+DEFAULT_STAGE_TIMEOUTS = {
+    "watchlist_quotes": 45,
+    "regime": 20,
+    "movers": 90,
+    "live_search": 120,
+    "dynamic_quotes": 45,
+}
+
+
+def live_search_queries(live_search_cfg):
+    """[(query, ttl_minutes)]: a query is a string or {"query", "ttl_minutes"} (default `cooldown_minutes`)."""
+    default_ttl = live_search_cfg.get("cooldown_minutes", 60)
+    queries = live_search_cfg.get("queries")
+    if not queries:
+        queries = [live_search_cfg.get("query", "")]
+    max_queries = live_search_cfg.get("max_queries_per_run", len(queries))
+    parsed = []
+    for query in list(queries)[: max(1, int(max_queries))]:
+        if isinstance(query, dict):
+            parsed.append((query.get("query", ""), query.get("ttl_minutes", default_ttl)))
+        else:
+            parsed.append((query, default_ttl))
+    return parsed
+
+
+def add_live_search_stages(pipeline, config, runtime, trades_path, timeout=None):
+    """
+    Adds one stage per stale live search query (at most `max_concurrency` run at
+    once on the shared client) and a `live_context` stage that joins them with the
+    queries still fresh in the cache. Each query is cached under its own key with
+    its own TTL; a query that fails falls back to its last cached answer.
+    """
+    live_search_cfg = config.get("live_search", {})
+    if not live_search_cfg.get("enabled"):
+        return
+    store = get_live_search_store(config)
+    model = live_search_cfg.get("model", config["llm"]["model"])
+    max_sources = live_search_cfg.get("max_sources")
+    queries = live_search_queries(live_search_cfg)
+    keys = [query_key(query, model, max_sources) for query, _ in queries]
+    entries = {}
+    stale = []
+    for idx, (key, (_, ttl_minutes)) in enumerate(zip(keys, queries)):
+        entry = store.get(key, ttl_minutes)
+        if entry is None:
+            stale.append(idx)
+        else:
+            entries[key] = entry
+
+    def savings(fetch_seconds):
+        """
+        {"saved_seconds": wall time the concurrent fetch of every query would have
+        taken minus the actual one, "saved_search_seconds": last fetch time of each
+        cached query, summed}.
+        """
+        cached = [entry.get("fetch_seconds") or 0.0 for entry in entries.values()]
+        fetched = max(fetch_seconds.values(), default=0.0)
+        return {
+            "saved_seconds": round(max(max(cached, default=0.0) - fetched, 0.0), 3),
+            "saved_search_seconds": round(sum(cached, 0.0), 3),
+        }
+
+    def report(event, fetch_seconds):
+        saved = savings(fetch_seconds)
+        append_event(trades_path, {**event, **saved, "cache": store.stats()})
+        print(
+            f"🔎 Live search: {len(fetch_seconds)} fetched, {len(keys) - len(stale)} cached "
+            f"(saved ~{saved['saved_seconds']:.1f}s, {saved['saved_search_seconds']:.1f}s of searches)"
+        )
+
+    def assemble(contexts):
+        parts = [
+            f"[Query {idx}] {query}\n{context}"
+            for idx, ((query, _), context) in enumerate(zip(queries, contexts), start=1)
+            if context is not None
+        ]
+        return "\n\n".join(parts) if parts else None
+
+    if not stale:
+        report({"type": "live_search_cache_hit", "cached": len(keys)}, {})
+        context = assemble([entries[key].get("context") for key in keys])
+        pipeline.add("live_context", lambda: context or "none")
+        return
+
+    def fallback(contexts, failed, message):
+        # Failed queries reuse their last answer, however old
+        previous = {idx: store.peek(keys[idx]) for idx in failed}
+        stale_used = [idx for idx in failed if (previous[idx] or {}).get("context")]
+        for idx in stale_used:
+            contexts[idx] = previous[idx]["context"]
+        live_context = assemble(contexts)
+        if stale_used:
+            append_event(
+                trades_path,
+                {"type": "live_search_fallback_cache", "message": message, "queries": [idx + 1 for idx in stale_used]},
+            )
+        if live_context is None or len(stale_used) < len(failed):
+            append_event(trades_path, {"type": "live_search_error", "message": message})
+        return live_context or "unavailable"
+
+    cached_contexts = [
+        None if idx in stale else entries[key].get("context") for idx, key in enumerate(keys)
+    ]
+    try:
+        search_client = runtime.search_client(config)
+    except LiveSearchUnavailable as exc:
+        pipeline.add(
+            "live_context", lambda: fallback(list(cached_contexts), stale, str(exc)), default="unavailable"
+        )
+        return
+
+    # Bounds the xAI calls in flight, whatever the pipeline's pool size
+    slots = threading.BoundedSemaphore(max(1, int(live_search_cfg.get("max_concurrency", 3))))
+
+    def search(query):
+        with slots:
+            started = time.perf_counter()
+            context = fetch_live_context(query=query, model=model, max_sources=max_sources, client=search_client)
+            return context, time.perf_counter() - started
+
+    names = []
+    for idx in stale:
+        name = f"live_search_{idx + 1}"
+        pipeline.add(name, lambda query=queries[idx][0]: search(query), timeout=timeout)
+        names.append(name)
+
+    def join(*results):
+        contexts = list(cached_contexts)
+        fetch_seconds = {}
+        failed = []
+        for idx, name, result in zip(stale, names, results):
+            if result is None:
+                failed.append(idx)
+                continue
+            context, seconds = result
+            fetch_seconds[idx] = round(seconds, 3)
+            contexts[idx] = store.put(keys[idx], queries[idx][0], context, fetch_seconds[idx])["context"]
+        if failed:
+            message = "; ".join(pipeline.error(names[stale.index(idx)]) or f"query {idx + 1} failed" for idx in failed)
+            live_context = fallback(contexts, failed, message)
+        else:
+            live_context = assemble(contexts)
+        if fetch_seconds:
+            store.flush()
+            report(
+                {
+                    "type": "live_search_cache_write",
+                    "fetched": len(fetch_seconds),
+                    "cached": len(keys) - len(stale),
+                    "failed": len(failed),
+                    "fetch_seconds": max(fetch_seconds.values()),
+                },
+                fetch_seconds,
+            )
+        return live_context
+
+    pipeline.add("live_context", join, deps=names, default="unavailable")
+
+
+def main(runtime=None, triggers=None):
+    from dotenv import load_dotenv
+
     load_dotenv()
     config = load_config()
+    if runtime is None:
+        runtime = Runtime()
+    tracing.configure(config)
+    market.configure(config)
+    metrics.start_metrics_server(config)
+    collector = tracing.start_collecting()
+    pipeline_cfg = config.get("pipeline", {})
+    pipeline = StagePipeline(max_workers=int(pipeline_cfg.get("max_workers", 6)))
+    try:
+        with tracing.span("cycle"):
+            run_cycle(config, runtime, pipeline, triggers=triggers)
+    finally:
+        pipeline.shutdown()
+        tracing.stop_collecting()
+        timing = pipeline.timings()
+        if tracing.is_enabled():
+            timing["spans"] = collector.summary()
+        metrics.observe("gat_cycle_seconds", timing["wall_seconds"])
+        if triggers:
+            timing["triggers"] = [trigger["kind"] for trigger in triggers]
+        append_event(config["paths"]["trades_path"], {"type": "cycle_timing", **timing})
+        print(
+            f"⏱️ Cycle: {timing['wall_seconds']:.1f}s "
+            f"(sequential: {timing['serial_seconds']:.1f}s, saved {timing['saved_seconds']:.1f}s)"
+        )
+    return timing
+
+
+def warm_up(runtime):
+    """
+    Pre-open warm-up (run by loop.py a few minutes before the NY open): opens the
+    broker and LLM connections and fills the caches the opening cycle reads
+    (regime, top movers, live search, daily bars for ATR), so that cycle is left
+    with quotes, the LLM call and execution.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    config = load_config()
+    tracing.configure(config)
+    market.configure(config)
+    trades_path = config["paths"]["trades_path"]
+    pipeline_cfg = config.get("pipeline", {})
+    timeouts = dict(DEFAULT_STAGE_TIMEOUTS, **pipeline_cfg.get("stage_timeouts", {}))
+    allowed_symbols = [symbol.upper() for symbol in config["trading"].get("universe", [])]
+    watchlist_symbols = config["trading"].get("watchlist", []) or allowed_symbols
+    portfolio = Portfolio.load(
+        config["paths"]["state_path"],
+        starting_cash=config["trading"]["starting_cash"],
+        currency=config["trading"]["currency"],
+    )
+    symbols = sorted({symbol.upper() for symbol in watchlist_symbols} | set(portfolio.positions))
+
+    def connect_broker():
+        broker = runtime.broker(config)
+        return broker.fetch_snapshot().connected if broker else None
+
+    def connect_llm():
+        runtime.llm(config).warm()
+        return True
+
+    print(f"🔥 Pre-open warm-up ({len(symbols)} symbols)...")
+    pipeline = StagePipeline(max_workers=int(pipeline_cfg.get("max_workers", 6)))
+    pipeline.add("broker_connect", connect_broker)
+    pipeline.add("llm_connect", connect_llm, timeout=timeouts.get("llm_connect", 30), default=False)
+    pipeline.add("regime", get_market_regime, timeout=timeouts.get("regime"))
+    pipeline.add("movers", get_top_movers, timeout=timeouts.get("movers"))
+    pipeline.add("daily_bars", lambda: prefetch_daily_bars(symbols), timeout=timeouts.get("watchlist_quotes"), default=0)
+    add_live_search_stages(pipeline, config, runtime, trades_path, timeout=timeouts.get("live_search"))
+    if pipeline.has("live_context"):
+        pipeline.add(
+            "dynamic_bars",
+            lambda live_context: prefetch_daily_bars(
+                [t for t in extract_dynamic_tickers(live_context) if t not in symbols]
+            ),
+            deps=["live_context"],
+            timeout=timeouts.get("dynamic_quotes"),
+            default=0,
+        )
+    pipeline.wait()
+    pipeline.shutdown()
+    timing = pipeline.timings()
+    append_event(trades_path, {"type": "warmup", **timing})
+    print(f"🔥 Warm-up done in {timing['wall_seconds']:.1f}s")
+    return timing
+
+
+def run_cycle(config, runtime, pipeline, triggers=None):
+    """One decision cycle; independent stages run concurrently on `pipeline`."""
     state_path = config["paths"]["state_path"]
     trades_path = config["paths"]["trades_path"]
     dashboard_path = config["paths"]["dashboard_path"]
     run_log_path = config["paths"].get("run_log_path")
     
-    # Init Broker (Alpaca)
-    alpaca_key = os.getenv("ALPACA_API_KEY")
-    alpaca_secret = os.getenv("ALPACA_SECRET_KEY")
-    connected_broker = None
-    trading_mode = str(config["trading"].get("mode", "paper")).lower()
-    if alpaca_key and alpaca_secret:
-        connected_broker = AlpacaBroker(
-            key_id=alpaca_key,
-            secret_key=alpaca_secret,
-            paper=trading_mode != "live",
-        )
-    else:
+    # Init Broker (Alpaca) - reused across cycles when run from loop.py
+    connected_broker = runtime.broker(config)
+    if connected_broker is None:
         message = "Alpaca credentials missing; using local paper broker only."
         print(f"⚠️ {message}")
         append_run_log(run_log_path, message)
+    else:
+        # Exchange-side stops follow the local trailing stop
+        connected_broker.stop_level = exit_stop_level
+    # Built before any LLM request so that each one counts toward its hourly budget
+    get_trigger_engine(config)
     
     # Start background price refresh thread (updates dashboard every 10s)
     start_price_refresh_thread(config, connected_broker, state_path, dashboard_path, trades_path, run_log_path)
@@ -1060,9 +1827,35 @@ def main():
         currency=config["trading"]["currency"],
     )
 
+    # Independent stages start together: broker sync and watchlist quotes. Regime,
+    # top movers and live search start once the cycle is known to reach the LLM.
+    session = get_session_state()
+    pipeline_cfg = config.get("pipeline", {})
+    timeouts = dict(DEFAULT_STAGE_TIMEOUTS, **pipeline_cfg.get("stage_timeouts", {}))
+    quote_workers = pipeline_cfg.get("quote_workers", 8)
+
+    def sync_from_broker():
+        # One snapshot read shared by this phase of the cycle
+        snapshot = connected_broker.fetch_snapshot()
+        return connected_broker.sync_portfolio(portfolio, snapshot=snapshot), snapshot
+
+    if connected_broker:
+        # No stage timeout: the sync mutates the portfolio, Alpaca calls have their own timeout
+        pipeline.add("broker_sync", sync_from_broker)
+    pipeline.add(
+        "watchlist_quotes",
+        lambda: fetch_quotes(watchlist_symbols, quote_workers),
+        timeout=timeouts.get("watchlist_quotes"),
+        default={},
+    )
+    broker_connected = None
+    broker_snapshot = None
     if connected_broker:
-        # Sync portfolio from Alpaca
-        portfolio = connected_broker.sync_portfolio(portfolio)
+        synced = pipeline.result("broker_sync")
+        if synced is None:
+            raise RuntimeError(f"Broker sync failed: {pipeline.error('broker_sync')}")
+        portfolio, broker_snapshot = synced
+        broker_connected = broker_snapshot.connected
         
         # AUTO-UPDATE CONFIG IF FRESH START
         # If we have no history, we align the "starting point" with reality to have clean PnL
@@ -1081,7 +1874,8 @@ def main():
 
     last_equity_events = load_last_events_by_type(trades_path, "equity", limit=1)
     last_equity = last_equity_events[0] if last_equity_events else None
-    market_snapshot = build_market_snapshot(portfolio, watchlist=watchlist_symbols)
+    watchlist_quotes = pipeline.result("watchlist_quotes")
+    market_snapshot = build_market_snapshot(portfolio, watchlist=watchlist_symbols, quotes=watchlist_quotes)
     equity = market_snapshot["equity"]
     equity_delta = None
     if last_equity and last_equity.get("equity") is not None:
@@ -1097,7 +1891,9 @@ def main():
     )
     equity_series = load_equity_series(trades_path, limit=200)
 
-    exit_triggers = list_exit_triggers(market_snapshot)
+    exit_triggers = list_exit_triggers(
+        market_snapshot, trail_pct=config["trading"].get("trailing_stop_pct")
+    )
     if exit_triggers:
         broker = PaperBroker(
             allow_negative_cash=config["trading"]["allow_negative_cash"],
@@ -1116,10 +1912,8 @@ def main():
         for trigger in exit_triggers:
             symbol = trigger["symbol"]
             trigger_type = trigger["trigger"]
-            if is_same_day_exit_suppressed(symbol, trigger_type):
-                continue
-
             notional = trigger["qty"] * trigger["price"]
+            execute_kwargs = {"snapshot": broker_snapshot} if connected_broker else {}
             try:
                 result = active_broker.execute(
                     action="SELL",
@@ -1127,6 +1921,7 @@ def main():
                     notional=notional,
                     price=trigger["price"],
                     portfolio=portfolio,
+                    **execute_kwargs,
                 )
             except Exception as exc:
                 append_event(
@@ -1142,6 +1937,7 @@ def main():
                 append_run_log(run_log_path, f"Auto-exit error for {symbol}: {exc}")
                 continue
             last_trade = result
+            metrics.inc("gat_exits_total", trigger=trigger_type, status=result.action)
             blocked_until = None
             if result.action == "BLOCKED_SAME_DAY":
                 blocked_until = suppress_same_day_exit(symbol, trigger_type)
@@ -1193,7 +1989,9 @@ def main():
             log_trade(run_log_path, result, reason=reason)
         
         if connected_broker:
-            portfolio = connected_broker.sync_portfolio(portfolio)
+            broker_snapshot = connected_broker.fetch_snapshot()
+            broker_connected = broker_snapshot.connected
+            portfolio = connected_broker.sync_portfolio(portfolio, snapshot=broker_snapshot)
             
         portfolio.save(state_path)
         market_snapshot = build_market_snapshot(portfolio, watchlist=watchlist_symbols)
@@ -1242,12 +2040,11 @@ def main():
             error=None,
             equity_series=equity_series,
             decision_history=decision_history,
-            broker_connected=connected_broker.is_connected() if connected_broker else None,
+            broker_connected=broker_connected,
         )
         write_dashboard(dashboard_path, dashboard_payload)
         return
 
-    session = get_session_state()
     positions_open = len(portfolio.positions) > 0
     positions_summary_default = build_positions_summary(portfolio)
     fixed_next_minutes = config["trading"].get("cycle_minutes", 60)
@@ -1255,15 +2052,19 @@ def main():
     # NOTE: No auto-close at session end - we are SWING TRADERS (hold overnight)
     # Positions will only be closed via SL/TP or Grok's decision.
 
-    if session["is_weekend"]:
+    if session["is_weekend"] or session["holiday"]:
+        if session["holiday"]:
+            reason, note = f"Jour férié NYSE ({session['holiday']}) : marchés US fermés.", "HOLIDAY"
+        else:
+            reason, note = "Week-end : marchés US fermés.", "WEEKEND"
         decision = build_hold_decision(
-            "Week-end : marchés US fermés.",
+            reason,
             positions_open,
             positions_summary_default,
             fixed_next_minutes,
             reflection=positions_summary_default,
         )
-        log_decision(run_log_path, decision, note="WEEKEND")
+        log_decision(run_log_path, decision, note=note)
         append_event(
             trades_path, {"type": "decision_parsed", "decision": decision, "attempt": 0}
         )
@@ -1281,7 +2082,7 @@ def main():
             error=None,
             equity_series=equity_series,
             decision_history=decision_history,
-            broker_connected=connected_broker.is_connected() if connected_broker else None,
+            broker_connected=broker_connected,
         )
         write_dashboard(dashboard_path, dashboard_payload)
         return
@@ -1292,12 +2093,15 @@ def main():
     if not session["in_session"]:
         open_time = session["open_paris"].strftime("%H:%M")
         close_time = session["close_paris"].strftime("%H:%M")
+        next_open_time = (
+            market_calendar.next_open(session["now_ny"]).astimezone(ZoneInfo("Europe/Paris")).strftime("%d/%m %H:%M")
+        )
         decision = build_hold_decision(
             f"Hors session NY ({open_time}–{close_time} heure FR).",
             positions_open,
             positions_summary_default,
             fixed_next_minutes,
-            reflection="En attente de l'ouverture du marché (15h30).",
+            reflection=f"En attente de l'ouverture du marché ({next_open_time} heure FR).",
         )
         log_decision(run_log_path, decision, note="OUT_OF_SESSION")
         append_event(
@@ -1317,118 +2121,170 @@ def main():
             error=None,
             equity_series=equity_series,
             decision_history=decision_history,
-            broker_connected=connected_broker.is_connected() if connected_broker else None,
+            broker_connected=broker_connected,
         )
         write_dashboard(dashboard_path, dashboard_payload)
         return
 
-    live_context = "none"
-    live_search_cfg = config.get("live_search", {})
-    if live_search_cfg.get("enabled"):
-        cache_path = live_search_cfg.get("cache_path", "data/live_search_cache.json")
-        cooldown_minutes = live_search_cfg.get("cooldown_minutes", 60)
-        cached = read_cache(cache_path)
-        if is_cache_fresh(cached, cooldown_minutes):
-            live_context = cached.get("context", "none")
-            append_event(trades_path, {"type": "live_search_cache_hit"})
-        else:
-            queries = live_search_cfg.get("queries")
-            if not queries:
-                queries = [live_search_cfg.get("query", "")]
-            max_queries = live_search_cfg.get("max_queries_per_run", len(queries))
-            queries = list(queries)[: max(1, int(max_queries))]
-            try:
-                contexts = []
-                for idx, query in enumerate(queries, start=1):
-                    context = fetch_live_context(
-                        query=query,
-                        model=live_search_cfg.get("model", config["llm"]["model"]),
-                        max_sources=live_search_cfg.get("max_sources"),
-                    )
-                    contexts.append(f"[Query {idx}] {query}\n{context}")
-                live_context = "\n\n".join(contexts)
-                write_cache(cache_path, live_context, queries)
-                append_event(trades_path, {"type": "live_search_cache_write"})
-            except LiveSearchUnavailable as exc:
-                live_context = "unavailable"
-                if cached and cached.get("context"):
-                    live_context = cached.get("context")
-                    append_event(
-                        trades_path,
-                        {"type": "live_search_fallback_cache", "message": str(exc)},
-                    )
-                else:
-                    append_event(
-                        trades_path, {"type": "live_search_error", "message": str(exc)}
-                    )
+    # Only now, with no auto-exit and the market open, is the LLM called: the
+    # stages that feed its prompt (and pay for live searches) start here.
+    pipeline.add(
+        "regime",
+        get_market_regime,
+        timeout=timeouts.get("regime"),
+        default={"regime": "UNKNOWN", "emoji": "❓", "details": "Regime unavailable (timeout)"},
+    )
+    pipeline.add(
+        "movers",
+        get_top_movers,
+        timeout=timeouts.get("movers"),
+        default={"gainers": [], "volume_spikes": []},
+    )
+    add_live_search_stages(pipeline, config, runtime, trades_path, timeout=timeouts.get("live_search"))
+    if pipeline.has("live_context"):
+        news_store = get_news_store(config)
+        if news_store:
+            # Only the headlines not shown recently go to the ticker scan and the prompt
+            pipeline.add("news", news_store.select, deps=["live_context"])
+
+        def fetch_dynamic_quotes(context):
+            if isinstance(context, dict):
+                context = context["context"]
+            tickers = [t for t in extract_dynamic_tickers(context) if t not in watchlist_symbols]
+            return tickers, fetch_quotes(tickers, quote_workers)
+
+        pipeline.add(
+            "dynamic_quotes",
+            fetch_dynamic_quotes,
+            deps=["news" if news_store else "live_context"],
+            timeout=timeouts.get("dynamic_quotes"),
+            default=([], {}),
+        )
 
-    # DYNAMIC WATCHLIST: Extract tickers from news to fetch their prices
-    if live_context and live_context != "none":
-        # Rough regex for tickers (2-5 uppercase letters)
-        potential_tickers = set(re.findall(r'\b[A-Z]{2,5}\b', live_context))
-        # Stopwords: common English words + indices + currencies
-        stopwords = {"THE", "AND", "FOR", "THAT", "WITH", "THIS", "FROM", "HAVE", "ARE", "NOT", "BUT", "ALL", "WHO", "WHAT", "WHEN", "WHERE", "WHY", "HOW", "CAN", "YOU", "YOUR", "THEY", "THEIR", "OUR", "WE", "SHE", "HE", "IT", "IS", "AM", "ARE", "WAS", "WERE", "BE", "BEEN", "BEING", "HAS", "HAD", "DO", "DOES", "DID", "JONES", "DOW", "NASDAQ", "NYSE", "AMEX", "ETF", "USD", "EUR", "GBP", "AUD", "CAD", "JPY", "CNY", "HKD", "CHF", "SEK", "NZD", "KRW", "SGD", "NOK", "MXN", "INR", "RUB", "ZAR", "TRY", "BRL", "TWD", "DKK", "PLN", "THB", "IDR", "HUF", "CZK", "ILS", "CLP", "PHP", "AED", "COP", "SAR", "MYR", "RON"}
-        # Crypto blocklist: NOT US equities
-        crypto_blocklist = {"BTC", "ETH", "XRP", "BNB", "SOL", "ADA", "DOGE", "DOT", "AVAX", "SHIB", "MATIC", "LTC", "TRX", "LINK", "XLM", "ATOM", "UNI", "ETC", "XMR", "BCH", "FIL", "APT", "NEAR", "VET", "ICP", "QNT", "AAVE", "GRT", "ALGO", "EOS", "THETA", "SAND", "MANA", "AXS", "FTM", "RUNE", "ZEC", "EGLD", "XTZ", "FLOW", "NEO", "MKR", "KAVA", "SNX", "CHZ", "ENJ", "CRV", "LDO", "IMX", "APE", "RPL", "GMX", "STX", "OSMO", "PEPE", "WIF", "BONK", "FLOKI", "ARB", "OP", "SUI", "SEI", "TIA", "JUP", "PYTH", "RNDR", "FET", "TAO", "USDT", "USDC", "DAI", "BUSD", "TUSD", "CNBC", "US", "UK", "EU", "FED", "CEO", "CFO", "CTO", "IPO", "SEC", "FDA", "GDP", "CPI", "PPI", "PMI", "NFT", "DCA", "ATH", "ATL", "ROI", "APY", "APR", "ICO", "IEO", "IDO", "DAO", "DEX", "CEX", "AMM", "TVL", "HODL", "FOMO", "FUD", "RLUSD", "LMAX", "IB", "GSPC", "IXIC", "DJI", "RUT", "VIX", "HQ", "CNN", "DOJ", "EV"}
-        
-        # Symbol normalization: common variations to correct tickers
-        symbol_mapping = {"TSMC": "TSM", "GOOGLE": "GOOGL", "FACEBOOK": "META", "FB": "META"}
-        
-        # Apply normalization and filtering
-        dynamic_tickers = []
-        for t in potential_tickers:
-            if t in stopwords or t in crypto_blocklist:
-                continue
-            # Normalize if mapping exists
-            normalized = symbol_mapping.get(t, t)
-            dynamic_tickers.append(normalized)
-        
+    live_context = "none"
+    news_selection = None
+    if pipeline.has("live_context"):
+        live_context = pipeline.result("live_context")
+    if pipeline.has("news"):
+        news_selection = pipeline.result("news")
+        if news_selection is not None:
+            live_context = news_selection["context"]
+
+    # DYNAMIC WATCHLIST: tickers found in the news, priced while live search finished
+    if pipeline.has("dynamic_quotes"):
+        dynamic_tickers, dynamic_quotes = pipeline.result("dynamic_quotes")
         if dynamic_tickers:
-            # Append to watchlist (deduplicated)
-            old_count = len(watchlist_symbols)
             watchlist_symbols = list(set(watchlist_symbols + dynamic_tickers))
-            new_count = len(watchlist_symbols)
-            
-            if new_count > old_count:
-                # RE-BUILD Snapshot to fetch prices for these new tickers
-                append_event(trades_path, {"type": "dynamic_watchlist", "added": dynamic_tickers})
-                market_snapshot = build_market_snapshot(portfolio, watchlist=watchlist_symbols)
-                equity = market_snapshot["equity"]
-
-    recent_events = load_recent_events(trades_path, limit=5)
-    system_prompt = build_system_prompt()
-    decision_memory = load_decision_history(trades_path, limit=6)
-    user_prompt = build_user_prompt(
-        portfolio,
-        recent_events,
-        market_snapshot,
-        equity_delta,
-        config["trading"]["starting_cash"],
-        live_context,
-        allowed_symbols,
-        symbol_rules,
-        decision_memory,
-        fixed_next_minutes,
-    )
+            append_event(trades_path, {"type": "dynamic_watchlist", "added": dynamic_tickers})
+            market_snapshot = build_market_snapshot(
+                portfolio,
+                watchlist=watchlist_symbols,
+                quotes=dict(watchlist_quotes, **dynamic_quotes),
+            )
+            equity = market_snapshot["equity"]
+
+    regime_data = pipeline.result("regime")
+    movers_data = pipeline.result("movers")
+    with tracing.span("prompt_build"):
+        # Wider window: format_events drops raw prompt/decision payloads and keeps the last 5
+        recent_events = load_recent_events(trades_path, limit=20)
+        system_prompt = build_system_prompt()
+        decision_memory = load_decision_history(trades_path, limit=6)
+        builder = build_prompt_builder(config)
+        user_prompt, prompt_stats = build_user_prompt(
+            portfolio,
+            recent_events,
+            market_snapshot,
+            equity_delta,
+            config["trading"]["starting_cash"],
+            live_context,
+            allowed_symbols,
+            symbol_rules,
+            decision_memory,
+            fixed_next_minutes,
+            regime_data=regime_data,
+            movers_data=movers_data,
+            triggers=triggers,
+            builder=builder,
+        )
+        # Incremental mode: only the changes since the last cycle, in the same conversation
+        history = None
+        incremental = get_incremental_context(config)
+        if incremental:
+            history, user_prompt, prompt_stats["incremental"] = incremental.prepare(
+                builder.sections(), user_prompt, session["now_ny"].date()
+            )
     prompt_payload = {"system": system_prompt, "user": user_prompt}
     append_event(trades_path, {"type": "prompt", "prompt": prompt_payload})
+    if news_selection and news_selection["stats"]:
+        get_news_store(config).record(news_selection)
+        news_stats = news_selection["stats"]
+        append_event(trades_path, {"type": "news_dedup", **news_stats})
+        print(
+            f"📰 News: {news_stats['novel']} new, {news_stats['repeated']} already shown "
+            f"({news_stats['saved_tokens']} tokens saved)"
+        )
+    prompt_stats["system_tokens"] = count_tokens(system_prompt)
+    append_event(trades_path, {"type": "prompt_tokens", **prompt_stats})
+    if prompt_stats["trimmed"]:
+        print(f"✂️ Prompt trimmed to budget: {', '.join(prompt_stats['trimmed'])} ({prompt_stats['total_tokens']} tokens)")
+    if history is not None:
+        incremental_stats = prompt_stats["incremental"]
+        print(
+            f"🧩 Prompt ({incremental_stats['mode']}): {incremental_stats['sent_tokens']} tokens sent "
+            f"vs {incremental_stats['full_tokens']} full ({incremental_stats['saved_pct']}% saved)"
+        )
 
-    llm = LLMClient(
-        base_url=config["llm"]["base_url"],
-        model=config["llm"]["model"],
-        temperature=config["llm"]["temperature"],
-    )
+    llm = runtime.llm(config)
 
-    raw, decision = request_decision(
-        llm,
-        system_prompt,
-        user_prompt,
-        trades_path,
-        positions_open=positions_open,
-        positions_summary_default=positions_summary_default,
+    # Runs as a stage only so its duration shows up in cycle_timing
+    pipeline.add(
+        "llm",
+        lambda: request_decision(
+            llm,
+            system_prompt,
+            user_prompt,
+            trades_path,
+            positions_open=positions_open,
+            positions_summary_default=positions_summary_default,
+            history=history,
+            pricing=config["llm"].get("pricing"),
+            streaming=config["llm"].get("streaming"),
+            ensemble=config["llm"].get("ensemble"),
+        ),
     )
+    llm_result = pipeline.result("llm")
+    if incremental:
+        if llm_result is None or (llm_result[0] is None and llm_result[2] is None):
+            incremental.reset()
+        elif llm_result[2] is None:
+            incremental.record(llm_result[0])
+    trigger_engine = get_trigger_engine(config)
+    if trigger_engine:
+        # Moves are measured from the prices this decision saw
+        trigger_engine.mark_decision(
+            {symbol: entry.get("price") for symbol, entry in market_snapshot["positions"].items()}
+        )
+    if llm_result is None:
+        raise RuntimeError(f"LLM decision failed: {pipeline.error('llm')}")
+    raw, decision, stream = llm_result
     decision["next_check_minutes"] = fixed_next_minutes
-    log_decision(run_log_path, decision, note="LLM")
+    if stream is None:
+        log_decision(run_log_path, decision, note="LLM")
+
+    def complete_decision():
+        # Streaming: the trade fields were parsed early, wait for the reason/reflection text
+        nonlocal raw, stream
+        if stream is None:
+            return
+        raw = finish_streamed_decision(stream, decision, llm, trades_path, pricing=config["llm"].get("pricing"))
+        stream = None
+        if incremental:
+            if raw is None:
+                incremental.reset()
+            else:
+                incremental.record(raw)
+        log_decision(run_log_path, decision, note="LLM")
 
     if decision["action"] == "HOLD":
         updated_position = False
@@ -1444,6 +2300,8 @@ def main():
                     position["tp"] = decision["tp_price"]
                 portfolio.positions[symbol] = position
                 portfolio.save(state_path)
+                if connected_broker:
+                    connected_broker.update_exit_orders(symbol, position)
                 append_event(
                     trades_path,
                     {
@@ -1480,7 +2338,7 @@ def main():
             error=None,
             equity_series=equity_series,
             decision_history=decision_history,
-            broker_connected=connected_broker.is_connected() if connected_broker else None,
+            broker_connected=broker_connected,
         )
         write_dashboard(dashboard_path, dashboard_payload)
         return
@@ -1488,6 +2346,7 @@ def main():
     if allowed_symbols:
         symbol = decision["symbol"]
         if symbol not in allowed_symbols and symbol not in portfolio.positions:
+            complete_decision()
             append_event(
                 trades_path,
                 {
@@ -1510,7 +2369,7 @@ def main():
                 error=f"Symbol not allowed: {symbol}",
                 equity_series=equity_series,
                 decision_history=decision_history,
-            broker_connected=connected_broker.is_connected() if connected_broker else None,
+            broker_connected=broker_connected,
             )
             write_dashboard(dashboard_path, dashboard_payload)
             return
@@ -1529,6 +2388,7 @@ def main():
                 print(f"📊 Auto-notional SELL: {symbol} → {notional:.2f}$ (qty={qty}, price={current_price})")
 
     if is_crypto_or_fx(symbol):
+        complete_decision()
         append_event(
             trades_path,
             {
@@ -1552,13 +2412,14 @@ def main():
             error=f"Crypto/FX symbol blocked: {symbol}",
             equity_series=equity_series,
             decision_history=decision_history,
-            broker_connected=connected_broker.is_connected() if connected_broker else None,
+            broker_connected=broker_connected,
         )
         write_dashboard(dashboard_path, dashboard_payload)
         return
 
     price = get_last_price(symbol)
     if price is None:
+        complete_decision()
         append_event(
             trades_path,
             {
@@ -1590,18 +2451,26 @@ def main():
     )
     active_broker = connected_broker if connected_broker else broker
 
-    result = active_broker.execute(
-        action=decision["action"],
-        symbol=symbol,
-        notional=notional,
-        price=price,
-        portfolio=portfolio,
-        sl_price=decision.get("sl_price"),
-        tp_price=decision.get("tp_price"),
-    )
-    
+    try:
+        # A SELL releases the qty held by our exchange-side SL/TP first (see AlpacaBroker.execute)
+        result = active_broker.execute(
+            action=decision["action"],
+            symbol=symbol,
+            notional=notional,
+            price=price,
+            portfolio=portfolio,
+            sl_price=decision.get("sl_price"),
+            tp_price=decision.get("tp_price"),
+        )
+    finally:
+        # The order is in (or was refused): the reason and confidence logged with the
+        # trade come from the full answer, and a failed order still completes the stream
+        complete_decision()
+
     if connected_broker:
-        portfolio = connected_broker.sync_portfolio(portfolio)
+        broker_snapshot = connected_broker.fetch_snapshot()
+        broker_connected = broker_snapshot.connected
+        portfolio = connected_broker.sync_portfolio(portfolio, snapshot=broker_snapshot)
     log_trade(run_log_path, result, reason=decision.get("reason"))
 
     portfolio.save(state_path)
@@ -1644,7 +2513,7 @@ def main():
         error=None,
         equity_series=equity_series,
         decision_history=load_decision_history(trades_path, limit=12),
-        broker_connected=connected_broker.is_connected() if connected_broker else None,
+        broker_connected=broker_connected,
     )
     write_dashboard(dashboard_path, dashboard_payload)
 
@@ -1,4 +1,60 @@
-import yfinance as yf
+import threading
+import time
+from datetime import datetime
+
+import market_calendar
+import metrics
+
+# Daily candles only feed the ATR and barely move within a session, so they are
+# reused for DAILY_BARS_TTL_SECONDS (the pre-open warm-up fills this cache).
+DAILY_BARS_TTL_SECONDS = 1800
+_daily_bars_cache = {}
+_daily_bars_lock = threading.Lock()
+# Floor of the elapsed session the volume ratio is measured against
+MIN_VOLUME_MINUTES = 30
+# "yfinance", or "offline" for the synthetic candles of offline_market.py (market.provider)
+PROVIDERS = {"yfinance", "offline"}
+_provider = "yfinance"
+
+
+def configure(config):
+    """Reads `market.provider`."""
+    global _provider
+    provider = str(config.get("market", {}).get("provider", "yfinance")).lower()
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown market.provider: {provider}")
+    if provider != _provider:
+        with _daily_bars_lock:
+            _daily_bars_cache.clear()
+    _provider = provider
+
+
+def get_ticker(symbol):
+    """Object with yfinance's Ticker.history() for `symbol`, from the configured provider."""
+    if _provider == "offline":
+        from offline_market import OfflineTicker
+
+        return OfflineTicker(symbol)
+    # yfinance pulls in pandas/numpy (~0.1s+); load it on the first fetch, not at import
+    import yfinance as yf
+
+    return yf.Ticker(symbol)
+
+
+def _history(ticker, **kwargs):
+    started = time.perf_counter()
+    try:
+        return ticker.history(**kwargs)
+    except Exception:
+        metrics.inc("gat_market_fetch_errors_total", provider=_provider)
+        raise
+    finally:
+        metrics.observe(
+            "gat_market_fetch_seconds",
+            time.perf_counter() - started,
+            provider=_provider,
+            call=f"history_{kwargs.get('period')}_{kwargs.get('interval')}",
+        )
 
 
 def _extract_last_close(data):
@@ -10,21 +66,52 @@ def _extract_last_close(data):
     return float(close.iloc[-1])
 
 
-def _get_intraday_price(ticker):
+def _get_intraday_quote(ticker):
+    """
+    (last price, session volume, time of the last candle); the volume is only
+    known from the 1-minute candles of the last candle's session.
+    """
     for period, interval in (("1d", "1m"), ("5d", "5m")):
         try:
-            data = ticker.history(period=period, interval=interval)
+            data = _history(ticker, period=period, interval=interval)
         except Exception:
             continue
         price = _extract_last_close(data)
         if price is not None:
-            return price
-    return None
+            volume = None
+            as_of = _ny_time(data.index[-1])
+            if period == "1d" and "Volume" in data:
+                session = data[[_ny_time(stamp).date() == as_of.date() for stamp in data.index]]
+                volume = float(session["Volume"].fillna(0).sum())
+            return price, volume, as_of
+    return None, None, None
+
+
+def _ny_time(stamp):
+    moment = stamp.to_pydatetime()
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=market_calendar.NY_TZ)
+    return moment.astimezone(market_calendar.NY_TZ)
+
+
+def _session_elapsed_share(as_of):
+    """
+    Share of the regular session elapsed at `as_of` (1.0 once it closed), floored
+    at MIN_VOLUME_MINUTES so the opening auction does not read as a volume spike.
+    """
+    session = market_calendar.session_for(as_of.date())
+    if session is None:
+        return 1.0
+    open_ny, close_ny = session
+    total = (close_ny - open_ny).total_seconds()
+    # The last 1-minute candle is counted in full
+    elapsed = max((as_of - open_ny).total_seconds() + 60, MIN_VOLUME_MINUTES * 60)
+    return min(1.0, elapsed / total)
 
 
 def _get_recent_daily_close(ticker):
     try:
-        data = ticker.history(period="5d", interval="1d")
+        data = _history(ticker, period="5d", interval="1d")
     except Exception:
         return None
     return _extract_last_close(data)
@@ -32,12 +119,23 @@ def _get_recent_daily_close(ticker):
 
 def _get_current_price(ticker):
     # Prefer intraday data for live SL/TP checks, then fall back to the most recent daily close.
-    intraday_price = _get_intraday_price(ticker)
+    intraday_price, _, _ = _get_intraday_quote(ticker)
     if intraday_price is not None:
         return intraday_price
     return _get_recent_daily_close(ticker)
 
 
+def _daily_reference(data):
+    """(previous close, 20-day average volume) from the daily candles completed before today."""
+    today = datetime.now(market_calendar.NY_TZ).date()
+    completed = data[[stamp.date() < today for stamp in data.index]]
+    prev_close = _extract_last_close(completed)
+    avg_volume = None
+    if "Volume" in completed and len(completed) >= 5:
+        avg_volume = float(completed["Volume"].tail(20).mean()) or None
+    return prev_close, avg_volume
+
+
 def calculate_atr(data, period=14):
     """
     Calculate ATR (Average True Range) securely using pandas.
@@ -63,17 +161,59 @@ def calculate_atr(data, period=14):
     return atr.iloc[-1]
 
 
+def _get_daily_bars(symbol, ticker=None):
+    now = time.time()
+    with _daily_bars_lock:
+        cached = _daily_bars_cache.get(symbol)
+    if cached and now - cached[0] < DAILY_BARS_TTL_SECONDS:
+        metrics.inc("gat_cache_requests_total", cache="daily_bars", result="hit")
+        return cached[1]
+    metrics.inc("gat_cache_requests_total", cache="daily_bars", result="miss")
+    data = _history(ticker or get_ticker(symbol), period="1mo", interval="1d")
+    if data is not None and not data.empty:
+        with _daily_bars_lock:
+            _daily_bars_cache[symbol] = (now, data)
+    return data
+
+
+def prefetch_daily_bars(symbols):
+    """Loads the daily candles of `symbols` into the ATR cache. Returns how many loaded."""
+    loaded = 0
+    for symbol in symbols:
+        try:
+            data = _get_daily_bars(symbol)
+        except Exception:
+            continue
+        if data is not None and not data.empty:
+            loaded += 1
+    return loaded
+
+
+def get_daily_atr(symbol):
+    """14-day ATR of `symbol` from the cached daily candles, or None."""
+    try:
+        data = _get_daily_bars(symbol)
+    except Exception:
+        return None
+    if data is None or data.empty:
+        return None
+    atr_value = calculate_atr(data, period=14)
+    return float(atr_value) if atr_value else None
+
+
 def get_market_data(symbol):
     """
     Fetch comprehensive market data: current price, ATR, Volatility %.
     Used for safe decision making in V2.
     """
-    ticker = yf.Ticker(symbol)
-    current_price = _get_current_price(ticker)
+    ticker = get_ticker(symbol)
+    current_price, session_volume, as_of = _get_intraday_quote(ticker)
+    if current_price is None:
+        current_price = _get_recent_daily_close(ticker)
 
-    # Fetch daily candles for ATR calculation.
+    # Fetch daily candles for ATR calculation (cached).
     try:
-        data = ticker.history(period="1mo", interval="1d")
+        data = _get_daily_bars(symbol, ticker)
     except Exception:
         data = None
 
@@ -84,6 +224,8 @@ def get_market_data(symbol):
             "price": current_price,
             "atr": None,
             "volatility_pct": None,
+            "prev_close": None,
+            "volume_ratio": None,
         }
 
     last_close = _extract_last_close(data)
@@ -102,10 +244,19 @@ def get_market_data(symbol):
         else None
     )
 
+    # Gap and volume references for the event triggers
+    prev_close, avg_volume = _daily_reference(data)
+    # Partial-session volume against the same share of the average day
+    volume_ratio = None
+    if session_volume is not None and avg_volume:
+        volume_ratio = session_volume / (avg_volume * _session_elapsed_share(as_of))
+
     return {
         "price": float(current_price),
         "atr": float(atr_value) if atr_value else None,
         "volatility_pct": float(volatility_pct) if volatility_pct else None,
+        "prev_close": prev_close,
+        "volume_ratio": round(volume_ratio, 2) if volume_ratio is not None else None,
     }
 
 
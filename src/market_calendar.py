@@ -0,0 +1,155 @@
+"""
+NYSE trading calendar computed locally from the exchange's holiday rules (no network).
+
+Regular session 09:30-16:00 New York, early close at 13:00 on the day before
+Independence Day, the day after Thanksgiving and Christmas Eve. Sessions are
+precomputed per year on first use.
+"""
+
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+NY_TZ = ZoneInfo("America/New_York")
+REGULAR_OPEN = time(9, 30)
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+# One-off closures that no rule produces (national days of mourning)
+SPECIAL_CLOSURES = {
+    date(2018, 12, 5): "National Day of Mourning (George H.W. Bush)",
+    date(2025, 1, 9): "National Day of Mourning (Jimmy Carter)",
+}
+
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th `weekday` (Mon=0) of the month; n=-1 for the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    # Anonymous Gregorian algorithm
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed(day):
+    # Saturday -> Friday, Sunday -> Monday
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def holidays(year):
+    """{date: name} of full-day NYSE closures in `year`."""
+    days = {}
+    new_year = date(year, 1, 1)
+    # NYSE does not close on Friday Dec 31 when Jan 1 falls on a Saturday
+    if new_year.weekday() != 5:
+        days[_observed(new_year)] = "New Year's Day"
+    days[_nth_weekday(year, 1, 0, 3)] = "Martin Luther King Jr. Day"
+    days[_nth_weekday(year, 2, 0, 3)] = "Washington's Birthday"
+    days[_easter(year) - timedelta(days=2)] = "Good Friday"
+    days[_nth_weekday(year, 5, 0, -1)] = "Memorial Day"
+    if year >= 2022:
+        days[_observed(date(year, 6, 19))] = "Juneteenth"
+    days[_observed(date(year, 7, 4))] = "Independence Day"
+    days[_nth_weekday(year, 9, 0, 1)] = "Labor Day"
+    days[_nth_weekday(year, 11, 3, 4)] = "Thanksgiving Day"
+    days[_observed(date(year, 12, 25))] = "Christmas Day"
+    for day, name in SPECIAL_CLOSURES.items():
+        if day.year == year:
+            days[day] = name
+    return days
+
+
+@lru_cache(maxsize=None)
+def early_closes(year):
+    """{date: reason} of 13:00 closes in `year`."""
+    closed = holidays(year)
+    days = {}
+    july_3 = date(year, 7, 3)
+    if july_3.weekday() <= 3 and july_3 not in closed:
+        days[july_3] = "Independence Day eve"
+    days[_nth_weekday(year, 11, 3, 4) + timedelta(days=1)] = "Day after Thanksgiving"
+    christmas_eve = date(year, 12, 24)
+    if christmas_eve.weekday() <= 3 and christmas_eve not in closed:
+        days[christmas_eve] = "Christmas Eve"
+    return days
+
+
+@lru_cache(maxsize=None)
+def sessions(year):
+    """Precomputed {date: (open, close)} (aware, New York) for every trading day of `year`."""
+    closed = holidays(year)
+    early = early_closes(year)
+    table = {}
+    day = date(year, 1, 1)
+    while day.year == year:
+        if day.weekday() < 5 and day not in closed:
+            close = EARLY_CLOSE if day in early else REGULAR_CLOSE
+            table[day] = (
+                datetime.combine(day, REGULAR_OPEN, tzinfo=NY_TZ),
+                datetime.combine(day, close, tzinfo=NY_TZ),
+            )
+        day += timedelta(days=1)
+    return table
+
+
+def holiday_name(day):
+    return holidays(day.year).get(day)
+
+
+def session_for(day):
+    """(open, close) for `day`, or None when the exchange is closed."""
+    return sessions(day.year).get(day)
+
+
+def is_trading_day(day):
+    return session_for(day) is not None
+
+
+def _aware(moment):
+    # Defaults to now; naive datetimes are taken as New York time
+    if moment is None:
+        return datetime.now(NY_TZ)
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=NY_TZ)
+    return moment
+
+
+def next_session(after=None):
+    """The session still running at `after` or the next one: (open, close), aware."""
+    after = _aware(after)
+    day = after.astimezone(NY_TZ).date()
+    for _ in range(370):
+        session = session_for(day)
+        if session and session[1] > after:
+            return session
+        day += timedelta(days=1)
+    raise RuntimeError(f"No NYSE session found after {after}")
+
+
+def next_open(after=None):
+    """Next session open strictly after `after` (aware, New York)."""
+    after = _aware(after)
+    open_at, close_at = next_session(after)
+    if open_at > after:
+        return open_at
+    return next_session(close_at)[0]
@@ -0,0 +1,144 @@
+"""
+In-process counters and histograms, served in the Prometheus text format.
+
+    curl http://127.0.0.1:9464/metrics
+
+Recording is always on (a dict update under a lock); the HTTP endpoint only
+starts when `metrics.enabled` is set in the config.
+"""
+
+import threading
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# name -> (type, help)
+METRICS = {
+    "gat_market_fetch_seconds": ("histogram", "Market data fetch latency by provider and call."),
+    "gat_market_fetch_errors_total": ("counter", "Market data fetches that raised, by provider."),
+    "gat_cache_requests_total": ("counter", "Cache lookups by cache and result (hit/miss)."),
+    "gat_alpaca_requests_total": ("counter", "Alpaca Trading API calls by method."),
+    "gat_alpaca_errors_total": ("counter", "Alpaca Trading API calls that raised, by method."),
+    "gat_alpaca_request_seconds": ("histogram", "Alpaca Trading API call latency by method."),
+    "gat_llm_request_seconds": ("histogram", "LLM completion latency by model."),
+    "gat_llm_errors_total": ("counter", "LLM completions that raised, by model."),
+    "gat_llm_tokens_total": ("counter", "LLM tokens by model and kind (prompt = uncached, cached, completion)."),
+    "gat_llm_hedges_total": ("counter", "Hedged duplicate LLM requests sent, by model."),
+    "gat_llm_failovers_total": ("counter", "LLM requests failed over after an error, by model."),
+    "gat_llm_ensembles_total": ("counter", "Ensemble decisions by winning action."),
+    "gat_llm_attempt_wins_total": ("counter", "Answers used per LLM attempt (primary/hedge/failover), by model."),
+    "gat_refresh_tick_seconds": ("histogram", "Price refresh loop tick duration."),
+    "gat_cycle_seconds": ("histogram", "Decision cycle wall time."),
+    "gat_events_written_total": ("counter", "Events appended to the trades log, by type."),
+    "gat_exits_total": ("counter", "SL/TP exits triggered, by trigger and status."),
+    "gat_exits_suppressed_total": ("counter", "SL/TP exits suppressed by the same-day guard, by trigger."),
+    "gat_event_triggers_total": ("counter", "Out-of-cycle decision triggers by kind and status (fired/suppressed)."),
+    "gat_news_items_total": ("counter", "Live search news items by result (novel/repeated)."),
+}
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_server = None
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        entry = _histograms.get(key)
+        if entry is None:
+            entry = _histograms[key] = {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0}
+        for idx, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                entry["buckets"][idx] += 1
+                break
+        entry["sum"] += value
+        entry["count"] += 1
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + (list(extra) if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def render():
+    """All metrics in the Prometheus text exposition format (0.0.4)."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: {"buckets": list(e["buckets"]), "sum": e["sum"], "count": e["count"]} for key, e in _histograms.items()}
+    lines = []
+    for name, (metric_type, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        if metric_type == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            continue
+        for (metric, labels), entry in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, entry["buckets"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', str(bound))])} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {entry['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {entry['sum']:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {entry['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def _metrics_handler():
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+
+def start_metrics_server(config):
+    """Starts the /metrics endpoint once per process when `metrics.enabled` is set."""
+    global _server
+    metrics_cfg = config.get("metrics", {})
+    if _server is not None or not metrics_cfg.get("enabled"):
+        return _server
+    from http.server import ThreadingHTTPServer  # only when the endpoint is enabled
+
+    host = metrics_cfg.get("host", "127.0.0.1")
+    port = int(metrics_cfg.get("port", 9464))
+    try:
+        _server = ThreadingHTTPServer((host, port), _metrics_handler())
+    except OSError as exc:
+        print(f"⚠️ Metrics endpoint unavailable on {host}:{port}: {exc}")
+        return None
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    print(f"📈 Metrics: http://{host}:{_server.server_address[1]}/metrics")
+    return _server
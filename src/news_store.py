@@ -0,0 +1,268 @@
+"""
+News novelty filter for the live search context (`live_search.news_dedup`).
+
+The live context is split into items (one per line, bullets and numbering
+stripped) and each item gets a 64-bit SimHash of its words, stopwords left
+out. Reworded headlines land a few bits apart (0-13 on typical rewrites) and
+unrelated ones about 30 (rarely under 20). An item is a near-duplicate when a
+stored fingerprint is within `max_distance` bits of it and was shown in the
+last `window_cycles` cycles. Lookups go through a
+block index: the 64 bits are cut into `max_distance + 1` blocks, and two
+fingerprints that close always share one block exactly, so only the items
+sharing a block are compared.
+
+Lines too short to fingerprint reliably (under MIN_ITEM_WORDS words, e.g.
+"TSLA halted") are kept verbatim as if always novel; only intro lines ending
+in ":" are dropped. Only novel items reach the prompt and the ticker scan,
+with a short "still relevant" digest of the repeated ones. Items count as
+shown once the prompt carrying them is built (record()); the store is saved
+after each cycle.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+import metrics
+from prompt_builder import count_tokens
+
+BITS = 64
+QUERY_HEADER = re.compile(r"^\[Query \d+\]")
+BULLET = re.compile(r"^\s*(?:[-*•]+|\d+[.)])\s*")
+WORD = re.compile(r"[a-z0-9$%.]+")
+MIN_ITEM_WORDS = 4
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "it", "its", "of", "on", "or", "over", "that", "the", "their", "this", "to", "was", "will", "with",
+}
+DIGEST_ITEM_CHARS = 60
+
+
+def split_items(context):
+    """[(header, item)]: the lines of the live context under their `[Query n]` header, intros left out."""
+    items = []
+    header = None
+    for line in str(context or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if QUERY_HEADER.match(line):
+            header = line
+            continue
+        text = BULLET.sub("", line).strip().strip("*").strip()
+        # Intros ("Here are the headlines:") carry no news
+        if not text or text.endswith(":"):
+            continue
+        items.append((header, text))
+    return items
+
+
+def simhash(text):
+    """64-bit SimHash of the words of `text` (case, punctuation and stopwords ignored)."""
+    words = WORD.findall(text.lower())
+    features = [word for word in words if word not in STOPWORDS] or words
+    weights = [0] * BITS
+    for feature in features:
+        value = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+        for bit in range(BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(BITS) if weights[bit] > 0)
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def _shorten(text, limit=DIGEST_ITEM_CHARS):
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0].rstrip(",;:") + "…"
+
+
+class NewsStore:
+    def __init__(self, path, window_cycles=12, max_distance=10, digest_items=3, max_items=500):
+        self.path = Path(path)
+        self.window_cycles = max(1, int(window_cycles))
+        self.max_distance = max(0, int(max_distance))
+        self.digest_items = max(0, int(digest_items))
+        self.max_items = max(1, int(max_items))
+        self._lock = threading.Lock()
+        self._blocks = self._block_masks(self.max_distance + 1)
+        self._items = {}  # fingerprint -> {"text", "first_cycle", "cycle", "seen"}
+        self._index = {}  # (block, bits) -> set of fingerprints
+        self.cycle = 0
+        self._load()
+
+    @staticmethod
+    def _block_masks(count):
+        width, extra = divmod(BITS, count)
+        masks = []
+        start = 0
+        for block in range(count):
+            size = width + (1 if block < extra else 0)
+            masks.append(((1 << size) - 1) << start)
+            start += size
+        return masks
+
+    def _keys(self, fingerprint):
+        return [(block, fingerprint & mask) for block, mask in enumerate(self._blocks)]
+
+    def _add(self, fingerprint, record):
+        self._items[fingerprint] = record
+        for key in self._keys(fingerprint):
+            self._index.setdefault(key, set()).add(fingerprint)
+
+    def _remove(self, fingerprint):
+        del self._items[fingerprint]
+        for key in self._keys(fingerprint):
+            bucket = self._index.get(key)
+            if bucket:
+                bucket.discard(fingerprint)
+                if not bucket:
+                    del self._index[key]
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return
+        if not isinstance(data, dict):
+            return
+        self.cycle = int(data.get("cycle", 0))
+        for fingerprint, record in (data.get("items") or {}).items():
+            self._add(int(fingerprint, 16), record)
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"cycle": self.cycle, "items": {f"{fp:016x}": record for fp, record in self._items.items()}}
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        temp_path.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+        os.replace(temp_path, self.path)
+
+    def _nearest(self, fingerprint):
+        candidates = set()
+        for key in self._keys(fingerprint):
+            candidates |= self._index.get(key, set())
+        best = None
+        for candidate in candidates:
+            distance = hamming(fingerprint, candidate)
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (distance, candidate)
+        return best[1] if best else None
+
+    def select(self, live_context):
+        """
+        Splits `live_context` and sorts its items into novel and repeated ones, without
+        recording anything. Returns {"context", "novel", "repeated", "stats"} where
+        `context` is the filtered text for the prompt and the ticker scan.
+        """
+        items = split_items(live_context)
+        if not items:
+            return {"context": live_context, "novel": [], "repeated": [], "stats": None}
+        novel = []
+        repeated = []
+        seen_now = []
+        short = 0
+        with self._lock:
+            for header, text in items:
+                if len(text.split()) < MIN_ITEM_WORDS:
+                    # Too few words for a stable fingerprint: passed through, never recorded
+                    novel.append({"fp": None, "match": None, "header": header, "text": text})
+                    short += 1
+                    continue
+                fingerprint = simhash(text)
+                # Near-duplicates within this context (the same story from two queries)
+                if any(hamming(fingerprint, other) <= self.max_distance for other in seen_now):
+                    continue
+                seen_now.append(fingerprint)
+                match = self._nearest(fingerprint)
+                record = self._items.get(match) if match is not None else None
+                if record and self.cycle - record["cycle"] < self.window_cycles:
+                    repeated.append(
+                        {"fp": match, "text": text, "seen": record["seen"], "first_cycle": record.get("first_cycle", 0)}
+                    )
+                else:
+                    novel.append({"fp": fingerprint, "match": match, "header": header, "text": text})
+
+        lines = []
+        header = None
+        for item in novel:
+            if item["header"] and item["header"] != header:
+                if lines:
+                    lines.append("")
+                lines.append(item["header"])
+                header = item["header"]
+            lines.append(f"- {item['text']}")
+        # Newest stories first
+        digest = sorted(repeated, key=lambda item: (-item["first_cycle"], -item["seen"]))[: self.digest_items]
+        if digest:
+            if lines:
+                lines.append("")
+            lines.append(
+                f"Still relevant (already shown, {len(repeated)} items): "
+                + "; ".join(_shorten(item["text"]) for item in digest)
+            )
+        elif repeated and not lines:
+            # digest_items 0: say so rather than fall back to the whole context
+            lines.append(f"No new items ({len(repeated)} already shown).")
+        context = "\n".join(lines) if lines else live_context
+        full_tokens = count_tokens(str(live_context))
+        sent_tokens = count_tokens(context)
+        stats = {
+            "items": len(items),
+            "novel": len(novel),
+            "repeated": len(repeated),
+            "short": short,
+            "duplicates_in_context": len(items) - short - len(seen_now),
+            "full_tokens": full_tokens,
+            "sent_tokens": sent_tokens,
+            "saved_tokens": full_tokens - sent_tokens,
+        }
+        return {"context": context, "novel": novel, "repeated": repeated, "stats": stats}
+
+    def record(self, selection):
+        """Marks the items of a `select` result as shown this cycle, prunes and saves the store."""
+        with self._lock:
+            self.cycle += 1
+            for item in selection["novel"]:
+                fingerprint = item["fp"]
+                if fingerprint is None:
+                    continue
+                if item["match"] is not None and item["match"] in self._items:
+                    # Seen long ago: it replaces the old fingerprint
+                    previous = self._items[item["match"]]
+                    self._remove(item["match"])
+                    record = dict(previous, text=item["text"], cycle=self.cycle, seen=previous["seen"] + 1)
+                else:
+                    record = {"text": item["text"], "first_cycle": self.cycle, "cycle": self.cycle, "seen": 1}
+                if fingerprint in self._items:
+                    self._remove(fingerprint)
+                self._add(fingerprint, record)
+            for item in selection["repeated"]:
+                record = self._items.get(item["fp"])
+                if record:
+                    record.update(cycle=self.cycle, seen=record["seen"] + 1)
+            # Oldest shown first
+            for fingerprint in sorted(self._items, key=lambda fp: self._items[fp]["cycle"])[: max(0, len(self._items) - self.max_items)]:
+                self._remove(fingerprint)
+            self._save()
+        if selection["stats"]:
+            metrics.inc("gat_news_items_total", value=selection["stats"]["novel"], result="novel")
+            metrics.inc("gat_news_items_total", value=selection["stats"]["repeated"], result="repeated")
+
+
+def build_news_store(config):
+    """Returns a NewsStore from `live_search.news_dedup`, or None when disabled."""
+    dedup_cfg = config.get("live_search", {}).get("news_dedup") or {}
+    if not dedup_cfg.get("enabled"):
+        return None
+    return NewsStore(
+        dedup_cfg.get("path", "data/news_store.json"),
+        window_cycles=dedup_cfg.get("window_cycles", 12),
+        max_distance=dedup_cfg.get("max_distance", 10),
+        digest_items=dedup_cfg.get("digest_items", 3),
+        max_items=dedup_cfg.get("max_items", 500),
+    )
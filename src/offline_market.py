@@ -0,0 +1,91 @@
+"""
+Synthetic market data for `market.provider: "offline"` (load tests, no network).
+
+OfflineTicker answers the yfinance `history()` calls the bot makes with
+deterministic candles: every symbol gets a fixed base price (see base_price,
+which llm_stub_server.py also uses for its stop-loss levels) and a seeded random
+walk, so the same symbol and day always give the same daily candles. Intraday
+candles end at the current minute, so prices move a little between cycles.
+"""
+
+import random
+import zlib
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import market_calendar
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+MINUTES = {"1m": 1, "2m": 2, "5m": 5, "15m": 15, "30m": 30, "60m": 60, "1h": 60}
+
+
+def _seed(*parts):
+    return zlib.crc32("|".join(str(part) for part in parts).encode())
+
+
+def base_price(symbol):
+    """Reference price of `symbol` (between 10 and 500), stable across runs."""
+    return round(10 + _seed(symbol.upper()) % 49000 / 100.0, 2)
+
+
+def _period_days(period):
+    period = str(period or "1mo")
+    if period.endswith("mo"):
+        return 22 * int(period[:-2] or 1)
+    if period.endswith("y"):
+        return 252 * int(period[:-1] or 1)
+    if period.endswith("d"):
+        return int(period[:-1] or 1)
+    return 22
+
+
+def _walk(rng, start, steps, step_pct, volume):
+    rows = []
+    close = start
+    for _ in range(steps):
+        open_ = close
+        close = max(0.5, open_ * (1 + rng.gauss(0, step_pct)))
+        spread = abs(rng.gauss(0, step_pct / 2)) * open_
+        rows.append(
+            [open_, max(open_, close) + spread, min(open_, close) - spread, close, volume * rng.uniform(0.5, 1.5)]
+        )
+    return rows
+
+
+class OfflineTicker:
+    def __init__(self, symbol):
+        self.symbol = symbol.upper()
+
+    def _daily(self, days, today):
+        dates = []
+        day = today
+        while len(dates) < days:
+            if day.weekday() < 5:
+                dates.append(day)
+            day -= timedelta(days=1)
+        dates.reverse()
+        rng = random.Random(_seed(self.symbol, today))
+        base = base_price(self.symbol)
+        rows = _walk(rng, base * rng.uniform(0.95, 1.05), len(dates), 0.02, 2_000_000)
+        # One symbol in eight opens with a volume spike, so the movers scan has candidates
+        if rows and _seed(self.symbol, today, "spike") % 8 == 0:
+            rows[-1][4] *= 4
+        index = pd.DatetimeIndex(
+            [datetime(day.year, day.month, day.day, tzinfo=market_calendar.NY_TZ) for day in dates]
+        )
+        return pd.DataFrame(rows, columns=COLUMNS, index=index)
+
+    def _intraday(self, days, step, now):
+        bars = max(1, days * 390 // step)
+        rng = random.Random(_seed(self.symbol, now.strftime("%Y-%m-%d %H:%M")))
+        rows = _walk(rng, base_price(self.symbol) * rng.uniform(0.99, 1.01), bars, 0.001 * step**0.5, 5000 * step)
+        index = pd.DatetimeIndex([now - timedelta(minutes=step * (bars - 1 - i)) for i in range(bars)])
+        return pd.DataFrame(rows, columns=COLUMNS, index=index)
+
+    def history(self, period="1mo", interval="1d", **kwargs):
+        now = datetime.now(market_calendar.NY_TZ).replace(second=0, microsecond=0)
+        days = _period_days(period)
+        if interval in MINUTES:
+            return self._intraday(days, MINUTES[interval], now)
+        return self._daily(days, now.date())
@@ -0,0 +1,154 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import tracing
+
+
+class StagePipeline:
+    """
+    Runs the stages of a decision cycle as a small dependency graph on a bounded
+    thread pool. A stage starts as soon as its dependencies are done and gets
+    their results as positional arguments (in `deps` order).
+
+    A stage that raises or runs past its `timeout` resolves to its `default`;
+    its dependents still run. A timed-out call keeps running in the background
+    (threads cannot be killed), but its late result is discarded.
+    """
+
+    def __init__(self, max_workers=6, default_timeout=None):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage")
+        self.default_timeout = default_timeout
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._collector = tracing.current_collector()
+        self.started = time.perf_counter()
+
+    def add(self, name, fn, deps=(), timeout=None, default=None):
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"Unknown dependency for stage {name}: {dep}")
+        stage = {
+            "name": name,
+            "fn": tracing.bind(fn),
+            "deps": list(deps),
+            "timeout": timeout if timeout is not None else self.default_timeout,
+            "default": default,
+            "future": Future(),
+            "status": "pending",
+            "error": None,
+            "start": None,
+            "end": None,
+            "waiting": len(deps),
+        }
+        self._stages[name] = stage
+        if not deps:
+            self._launch(stage)
+        for dep in deps:
+            self._stages[dep]["future"].add_done_callback(lambda _, stage=stage: self._dep_done(stage))
+        return stage["future"]
+
+    def _dep_done(self, stage):
+        with self._lock:
+            stage["waiting"] -= 1
+            ready = stage["waiting"] == 0
+        if ready:
+            self._launch(stage)
+
+    def _launch(self, stage):
+        stage["start"] = time.perf_counter()
+        stage["status"] = "running"
+        if stage["timeout"]:
+            timer = threading.Timer(stage["timeout"], self._finish, args=(stage, "timeout", stage["default"]))
+            timer.daemon = True
+            timer.start()
+        self._pool.submit(self._run, stage)
+
+    def _run(self, stage):
+        if stage["future"].done():
+            return  # timed out while queued
+        stage["start"] = time.perf_counter()  # queue wait is not stage time
+        args = [self._stages[dep]["future"].result() for dep in stage["deps"]]
+        try:
+            result = stage["fn"](*args)
+        except Exception as exc:
+            print(f"⚠️ Stage {stage['name']} failed: {exc}")
+            stage["error"] = str(exc)
+            self._finish(stage, "error", stage["default"])
+            return
+        self._finish(stage, "ok", result)
+
+    def _finish(self, stage, status, result):
+        with self._lock:
+            if stage["end"] is not None:
+                return
+            stage["end"] = time.perf_counter()
+            stage["status"] = status
+        tracing.record(f"stage.{stage['name']}", stage["end"] - stage["start"], collector=self._collector)
+        # Outside the lock: set_result runs the dependents' callbacks
+        stage["future"].set_result(result)
+        if status == "timeout":
+            print(f"⏱️ Stage {stage['name']} timed out after {stage['timeout']}s")
+
+    def result(self, name):
+        """Blocks until the stage resolved (result, default on error/timeout)."""
+        return self._stages[name]["future"].result()
+
+    def wait(self):
+        """Blocks until every stage added so far resolved."""
+        for name in list(self._stages):
+            self.result(name)
+
+    def has(self, name):
+        return name in self._stages
+
+    def error(self, name):
+        """Error message of a failed stage, or a note for a timed-out one."""
+        stage = self._stages[name]
+        if stage["status"] == "timeout":
+            return f"{name} timed out after {stage['timeout']}s"
+        return stage["error"]
+
+    def timings(self):
+        """
+        Per-stage durations, cycle wall time, and `serial_seconds`: the wall time the
+        same stages would have taken back to back (the old sequential cycle).
+        """
+        wall = time.perf_counter() - self.started
+        stages = {}
+        serial = 0.0
+        intervals = []
+        for name, stage in self._stages.items():
+            if stage["start"] is None or stage["end"] is None:
+                stages[name] = {"status": stage["status"]}
+                continue
+            seconds = stage["end"] - stage["start"]
+            serial += seconds
+            intervals.append((stage["start"], stage["end"]))
+            stages[name] = {
+                "status": stage["status"],
+                "seconds": round(seconds, 3),
+                "offset": round(stage["start"] - self.started, 3),
+            }
+            if stage["error"]:
+                stages[name]["error"] = stage["error"]
+        # Time covered by at least one stage; the rest of the wall time is serial glue.
+        covered = 0.0
+        cursor = None
+        for start, end in sorted(intervals):
+            if cursor is None or start > cursor:
+                covered += end - start
+                cursor = end
+            elif end > cursor:
+                covered += end - cursor
+                cursor = end
+        serial_wall = wall - covered + serial
+        return {
+            "wall_seconds": round(wall, 3),
+            "serial_seconds": round(serial_wall, 3),
+            "saved_seconds": round(serial_wall - wall, 3),
+            "stages": stages,
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,228 @@
+"""
+User prompt assembly with per-section token budgets.
+
+Sections are rendered compactly (pipe tables instead of raw JSON), measured and
+trimmed to their own budget. If the whole prompt is still over `max_tokens`,
+sections are trimmed further by priority (highest number first); priority 0
+sections are never trimmed. Token counts use tiktoken when it is installed,
+otherwise an estimate of ~4 characters per token.
+"""
+
+import json
+
+# Tokens per section (None = unbounded); overridden by `prompt.section_budgets`
+DEFAULT_SECTION_BUDGETS = {
+    "movers": 200,
+    "triggers": 300,
+    "positions": 600,
+    "watchlist": 800,
+    "live_context": 1500,
+    "decision_memory": 500,
+    "recent_events": 300,
+}
+DEFAULT_MAX_TOKENS = 6000
+
+# Raw payload events: already summarized elsewhere in the prompt (or useless to the model)
+NOISY_EVENT_TYPES = {
+    "prompt",
+    "decision",
+    "decision_parsed",
+    "prompt_tokens",
+    "cycle_timing",
+    "warmup",
+    "equity",
+    "live_search_cache_hit",
+    "live_search_cache_write",
+    "news_dedup",
+    "llm_usage",
+    "decision_ensemble",
+    "decision_early",
+    "event_trigger",
+    "open_cycle",
+}
+
+_encoding = None
+
+
+def count_tokens(text):
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def trim_to_tokens(text, max_tokens):
+    """Keeps the leading lines of `text` that fit in `max_tokens`, with a marker for the rest."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    lines = text.splitlines()
+    low, high = 0, len(lines)
+    # Largest number of leading lines that fits, marker included
+    while low < high:
+        middle = (low + high + 1) // 2
+        candidate = "\n".join(lines[:middle] + [f"... [{len(lines) - middle} lines trimmed]"])
+        if count_tokens(candidate) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    if low == 0:
+        # Not even one line fits: cut the first one by characters
+        return lines[0][: max(0, max_tokens * 4 - 20)] + " ... [trimmed]"
+    return "\n".join(lines[:low] + [f"... [{len(lines) - low} lines trimmed]"])
+
+
+class PromptBuilder:
+    """Collects prompt sections in order, then applies the budgets in `build()`."""
+
+    def __init__(self, max_tokens=DEFAULT_MAX_TOKENS, budgets=None):
+        self.max_tokens = max_tokens
+        self.budgets = dict(DEFAULT_SECTION_BUDGETS, **(budgets or {}))
+        self._sections = []
+
+    def add(self, name, text, title=None, priority=0):
+        self._sections.append({"name": name, "title": title, "text": text, "priority": priority})
+
+    def sections(self):
+        """[(name, title, text)] in prompt order (trimmed once `build()` ran)."""
+        return [(section["name"], section["title"], section["text"]) for section in self._sections]
+
+    @staticmethod
+    def _render(section):
+        if section["title"]:
+            return f"{section['title']}:\n{section['text']}\n\n"
+        return f"{section['text']}\n\n"
+
+    def build(self):
+        """Returns (prompt, stats) with the token count of every section after trimming."""
+        trimmed = {}
+        for section in self._sections:
+            budget = self.budgets.get(section["name"])
+            section["tokens"] = count_tokens(self._render(section))
+            if budget is not None and section["priority"] > 0 and section["tokens"] > budget:
+                trimmed[section["name"]] = section["tokens"]
+                section["text"] = trim_to_tokens(section["text"], budget)
+                section["tokens"] = count_tokens(self._render(section))
+
+        total = sum(section["tokens"] for section in self._sections)
+        if self.max_tokens:
+            for section in sorted(self._sections, key=lambda item: -item["priority"]):
+                if total <= self.max_tokens or section["priority"] <= 0:
+                    break
+                keep = max(0, section["tokens"] - (total - self.max_tokens))
+                trimmed.setdefault(section["name"], section["tokens"])
+                section["text"] = trim_to_tokens(section["text"], keep)
+                before = section["tokens"]
+                section["tokens"] = count_tokens(self._render(section))
+                total -= before - section["tokens"]
+
+        prompt = "".join(self._render(section) for section in self._sections).rstrip("\n") + "\n"
+        stats = {
+            "total_tokens": count_tokens(prompt),
+            "max_tokens": self.max_tokens,
+            "sections": {section["name"]: section["tokens"] for section in self._sections},
+            "trimmed": trimmed,
+            "estimated": not _encoding,
+        }
+        return prompt, stats
+
+
+# -- compact formatting -------------------------------------------------------
+
+
+def fmt(value, precision=2):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.{precision}f}"
+    return str(value)
+
+
+def format_table(header, rows):
+    return "\n".join([" | ".join(header)] + [" | ".join(fmt(cell) for cell in row) for row in rows])
+
+
+def format_positions(snapshot_positions, portfolio_positions=None):
+    if not snapshot_positions:
+        return "none"
+    portfolio_positions = portfolio_positions or {}
+    rows = []
+    for symbol, entry in sorted(snapshot_positions.items()):
+        rows.append([
+            symbol,
+            entry.get("qty"),
+            entry.get("price"),
+            entry.get("avg_entry"),
+            entry.get("pnl"),
+            entry.get("pnl_pct"),
+            entry.get("sl"),
+            entry.get("tp"),
+            (portfolio_positions.get(symbol) or {}).get("open_date"),
+        ])
+    return format_table(["symbol", "qty", "price", "avg_entry", "pnl", "pnl%", "sl", "tp", "opened"], rows)
+
+
+def format_watchlist(watchlist_prices):
+    rows = []
+    for symbol, data in sorted((watchlist_prices or {}).items()):
+        if not isinstance(data, dict):
+            # Positions already in the table above only carry a price
+            data = {"price": data}
+        price, prev_close = data.get("price"), data.get("prev_close")
+        gap_pct = (price / prev_close - 1) * 100 if price and prev_close else None
+        volatility = data.get("volatility_pct")
+        rows.append([
+            symbol,
+            price,
+            data.get("atr"),
+            volatility * 100 if volatility is not None else None,
+            gap_pct,
+            data.get("volume_ratio"),
+        ])
+    if not rows:
+        return "none"
+    return format_table(["symbol", "price", "atr", "atr%", "gap%", "vol_x"], rows)
+
+
+def format_decisions(decisions):
+    lines = []
+    for decision in decisions:
+        reason = " ".join(str(decision.get("reason") or "").split())
+        lines.append(
+            f"{str(decision.get('timestamp') or '-')[:16]} {decision.get('action')} "
+            f"{decision.get('symbol') or '-'} notional={fmt(decision.get('notional'))} "
+            f"sl={fmt(decision.get('sl_price'))} tp={fmt(decision.get('tp_price'))} "
+            f"conf={fmt(decision.get('confidence'))} | {reason[:200]}"
+        )
+    return "\n".join(lines) or "none"
+
+
+def format_events(events, limit=5):
+    lines = []
+    for event in events:
+        if event.get("type") in NOISY_EVENT_TYPES:
+            continue
+        fields = []
+        for key, value in event.items():
+            if key in ("type", "timestamp") or value is None:
+                continue
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value, separators=(",", ":"))
+            fields.append(f"{key}={str(value)[:80]}")
+        lines.append(f"{str(event.get('timestamp') or '-')[:16]} {event.get('type')} {' '.join(fields)}")
+    return "\n".join(lines[-limit:]) or "none"
+
+
+def build_prompt_builder(config):
+    """PromptBuilder with the budgets from the `prompt` config section."""
+    prompt_cfg = config.get("prompt", {})
+    return PromptBuilder(
+        max_tokens=prompt_cfg.get("max_tokens", DEFAULT_MAX_TOKENS),
+        budgets=prompt_cfg.get("section_budgets"),
+    )
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+DEFAULT_STREAM_URL = "wss://stream.data.alpaca.markets/v2/iex"
+
+
+class QuoteStreamUnavailable(RuntimeError):
+    pass
+
+
+class QuoteBoard:
+    """Thread-safe last-trade board fed by the stream, read by the refresh loop."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trades = {}
+
+    def update(self, symbol, price, size=None, exchange_ts=None, sent=None):
+        trade = {
+            "price": float(price),
+            "size": size,
+            "exchange_ts": exchange_ts,
+            "sent": sent,  # replay server send time, when present
+            "received": time.time(),
+        }
+        with self._lock:
+            self._trades[symbol] = trade
+        return trade
+
+    def get(self, symbol):
+        with self._lock:
+            trade = self._trades.get(symbol)
+            return dict(trade) if trade else None
+
+    def prices(self, max_age_seconds=None, symbols=None):
+        """Fresh last prices (symbol -> price); stale or unknown symbols are left out."""
+        now = time.time()
+        with self._lock:
+            items = list(self._trades.items())
+        prices = {}
+        for symbol, trade in items:
+            if symbols is not None and symbol not in symbols:
+                continue
+            if max_age_seconds is not None and now - trade["received"] > max_age_seconds:
+                continue
+            prices[symbol] = trade["price"]
+        return prices
+
+
+class QuoteStream:
+    """
+    Background websocket client for an Alpaca-style trade feed (JSON protocol):
+    connect -> auth -> subscribe trades -> [{"T": "t", "S": ..., "p": ...}, ...].
+
+    Every trade lands on the QuoteBoard and is handed to `on_trade(symbol, price, trade)`.
+    The stream reconnects with backoff; callers keep polling as the fallback
+    whenever the board has nothing fresh.
+    """
+
+    def __init__(
+        self,
+        board,
+        symbols,
+        url=DEFAULT_STREAM_URL,
+        key_id=None,
+        secret_key=None,
+        on_trade=None,
+        record_path=None,
+        max_backoff_seconds=60,
+    ):
+        try:
+            import websockets  # noqa: F401
+        except ImportError as exc:
+            raise QuoteStreamUnavailable("Missing websockets package") from exc
+        self.board = board
+        self.url = url
+        self.key_id = key_id
+        self.secret_key = secret_key
+        self.on_trade = on_trade
+        self.record_path = Path(record_path) if record_path else None
+        self.max_backoff_seconds = max_backoff_seconds
+        self.connected = False
+        self.trade_count = 0
+        self._symbols = set(symbols)
+        self._subscribed = set()
+        self._stop = False
+        self._loop = None
+        self._ws = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop = True
+        if self._loop and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+
+    def set_symbols(self, symbols):
+        """Changes the subscription (positions + watchlist) without reconnecting."""
+        self._symbols = set(symbols)
+        if self._loop and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._sync_subscription(), self._loop)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        backoff = 1
+        while not self._stop:
+            try:
+                self._loop.run_until_complete(self._session())
+                backoff = 1
+            except Exception as exc:
+                print(f"⚠️ Quote stream error: {exc}")
+            self.connected = False
+            self._ws = None
+            self._subscribed = set()
+            if self._stop:
+                break
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff_seconds)
+
+    async def _send(self, payload):
+        await self._ws.send(json.dumps(payload))
+
+    async def _sync_subscription(self):
+        wanted = set(self._symbols)
+        added = sorted(wanted - self._subscribed)
+        removed = sorted(self._subscribed - wanted)
+        if added:
+            await self._send({"action": "subscribe", "trades": added})
+        if removed:
+            await self._send({"action": "unsubscribe", "trades": removed})
+        self._subscribed = wanted
+
+    async def _session(self):
+        import websockets
+
+        async with websockets.connect(self.url, max_size=2**22) as ws:
+            self._ws = ws
+            await self._expect(ws, "connected")
+            await self._send({"action": "auth", "key": self.key_id, "secret": self.secret_key})
+            await self._expect(ws, "authenticated")
+            await self._sync_subscription()
+            self.connected = True
+            print(f"📡 Quote stream connected ({len(self._subscribed)} symbols)")
+            async for raw in ws:
+                if self._stop:
+                    break
+                self._handle(raw)
+
+    @staticmethod
+    async def _expect(ws, status):
+        messages = json.loads(await ws.recv())
+        for message in messages:
+            if message.get("T") == "error":
+                raise QuoteStreamUnavailable(f"Stream error: {message.get('msg')}")
+            if message.get("T") == "success" and message.get("msg") == status:
+                return
+        raise QuoteStreamUnavailable(f"Unexpected stream handshake: {messages}")
+
+    def _handle(self, raw):
+        received = time.time()
+        try:
+            messages = json.loads(raw)
+        except json.JSONDecodeError:
+            return
+        for message in messages:
+            if message.get("T") != "t":
+                continue
+            symbol = message.get("S")
+            price = message.get("p")
+            if not symbol or price is None:
+                continue
+            trade = self.board.update(
+                symbol, price, size=message.get("s"), exchange_ts=message.get("t"), sent=message.get("rt")
+            )
+            self.trade_count += 1
+            if self.record_path:
+                self._record(message, received)
+            if self.on_trade:
+                try:
+                    self.on_trade(symbol, float(price), trade)
+                except Exception as exc:
+                    print(f"⚠️ Quote stream callback error for {symbol}: {exc}")
+
+    def _record(self, message, received):
+        self.record_path.parent.mkdir(parents=True, exist_ok=True)
+        line = {
+            "S": message.get("S"),
+            "p": message.get("p"),
+            "s": message.get("s"),
+            "t": message.get("t") or datetime.fromtimestamp(received, timezone.utc).isoformat(),
+        }
+        with self.record_path.open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps(line) + "\n")
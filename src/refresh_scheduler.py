@@ -0,0 +1,205 @@
+import time
+from collections import deque
+
+
+class RefreshScheduler:
+    """
+    Per-symbol polling schedule for the price refresh loop.
+
+    - Positions within `near_atr_multiple` x ATR of their SL/TP: `fast_seconds`.
+    - Other positions: `normal_seconds`.
+    - Watchlist names: `watchlist_seconds`.
+    - Outside the NY session everything drops to `closed_seconds`.
+
+    Each tick fetches only the symbols that are due, most urgent first, and
+    stops once `tick_budget_seconds` is spent; the rest roll over to the next tick
+    and keep their last quote meanwhile.
+
+    The broker snapshot (account, positions, open orders) has its own cadence,
+    `broker_seconds`, in and out of session: a fast-polled symbol does not make
+    the loop re-read the broker, its quote overrides the older broker price.
+    """
+
+    def __init__(
+        self,
+        fast_seconds=2,
+        normal_seconds=10,
+        watchlist_seconds=60,
+        closed_seconds=300,
+        near_atr_multiple=1.0,
+        tick_budget_seconds=3.0,
+        broker_seconds=None,
+        clock=time.monotonic,
+    ):
+        self.fast_seconds = float(fast_seconds)
+        self.normal_seconds = float(normal_seconds)
+        self.watchlist_seconds = float(watchlist_seconds)
+        self.closed_seconds = float(closed_seconds)
+        self.near_atr_multiple = float(near_atr_multiple)
+        self.tick_budget_seconds = float(tick_budget_seconds)
+        self.broker_seconds = float(broker_seconds if broker_seconds is not None else normal_seconds)
+        self.clock = clock
+        self._next_due = {}
+        self._quotes = {}
+        self._fetched_at = {}
+        self._poll_times = deque()
+        self._tick_interval = self.normal_seconds
+        self._broker_read_at = None
+        self.last_tick = {}
+
+    def is_near_levels(self, price, sl, tp, atr):
+        if price is None or not atr:
+            return False
+        band = self.near_atr_multiple * float(atr)
+        if sl is not None and abs(price - sl) <= band:
+            return True
+        if tp is not None and abs(tp - price) <= band:
+            return True
+        return False
+
+    def position_interval(self, position, in_session):
+        if not in_session:
+            return self.closed_seconds
+        atr = (self._quotes.get(position["symbol"]) or {}).get("atr")
+        if self.is_near_levels(position.get("price"), position.get("sl"), position.get("tp"), atr):
+            return self.fast_seconds
+        return self.normal_seconds
+
+    def _plan(self, positions, watchlist, in_session):
+        plan = {}
+        tick_interval = self.closed_seconds if not in_session else self.normal_seconds
+        for symbol, entry in positions.items():
+            position = {
+                "symbol": symbol,
+                "price": entry.get("current_price"),
+                "sl": entry.get("sl"),
+                "tp": entry.get("tp"),
+            }
+            if position["price"] is None:
+                position["price"] = (self._quotes.get(symbol) or {}).get("price")
+            interval = self.position_interval(position, in_session)
+            tick_interval = min(tick_interval, interval)
+            if entry.get("current_price") is not None and interval >= self.broker_seconds:
+                # The broker read refreshes this price often enough; we only need ATR.
+                interval = max(interval, self.watchlist_seconds if in_session else self.closed_seconds)
+            plan[symbol] = interval
+        for symbol in watchlist:
+            if symbol in plan:
+                continue
+            plan[symbol] = self.watchlist_seconds if in_session else self.closed_seconds
+        return plan, tick_interval
+
+    def collect(self, positions, watchlist, in_session, fetch):
+        """
+        Fetch due symbols (within the latency budget) and return the last quote of
+        every planned symbol that has one. A failed fetch keeps the last quote.
+        Symbols never priced yet are left out.
+        """
+        started = self.clock()
+        plan, self._tick_interval = self._plan(positions, watchlist, in_session)
+        for symbol in list(self._next_due):
+            if symbol not in plan:
+                self._next_due.pop(symbol, None)
+                self._quotes.pop(symbol, None)
+                self._fetched_at.pop(symbol, None)
+        for symbol, interval in plan.items():
+            # A position now near its levels does not wait out its slower due time
+            if symbol in self._fetched_at:
+                self._next_due[symbol] = min(
+                    self._next_due.get(symbol, 0.0), self._fetched_at[symbol] + interval
+                )
+
+        due = [
+            (interval, self._next_due.get(symbol, 0.0), symbol)
+            for symbol, interval in plan.items()
+            if self._next_due.get(symbol, 0.0) <= started
+        ]
+        due.sort()
+        fetched = 0
+        deferred = 0
+        for interval, _, symbol in due:
+            if self.clock() - started >= self.tick_budget_seconds:
+                deferred += 1
+                continue
+            try:
+                quote = fetch(symbol) or {}
+            except Exception as exc:
+                print(f"⚠️ Scheduled fetch failed for {symbol}: {exc}")
+                quote = {}
+            now = self.clock()
+            if quote.get("price") is not None:
+                self._quotes[symbol] = quote
+                self._fetched_at[symbol] = now
+            self._next_due[symbol] = now + interval
+            self._poll_times.append(now)
+            fetched += 1
+
+        elapsed = self.clock() - started
+        self.last_tick = {
+            "fetched": fetched,
+            "deferred": deferred,
+            "symbols": len(plan),
+            "tick_seconds": round(elapsed, 3),
+            "budget_seconds": self.tick_budget_seconds,
+            "in_session": in_session,
+        }
+        return {
+            symbol: self._quotes[symbol]
+            for symbol in plan
+            if self._quotes.get(symbol, {}).get("price") is not None
+        }
+
+    def broker_due(self):
+        return self._broker_read_at is None or self.clock() - self._broker_read_at >= self.broker_seconds
+
+    def broker_read(self):
+        """Call after each broker snapshot read."""
+        self._broker_read_at = self.clock()
+
+    def fresh_prices(self):
+        """Prices fetched since the last broker read: newer than the broker's."""
+        since = self._broker_read_at if self._broker_read_at is not None else float("-inf")
+        return {
+            symbol: quote["price"]
+            for symbol, quote in self._quotes.items()
+            if self._fetched_at.get(symbol, float("-inf")) > since
+        }
+
+    def poll_rate(self, window_seconds=60.0):
+        """Effective fetches per minute over the last `window_seconds`."""
+        now = self.clock()
+        while self._poll_times and now - self._poll_times[0] > window_seconds:
+            self._poll_times.popleft()
+        return len(self._poll_times) * 60.0 / window_seconds
+
+    def next_sleep_seconds(self):
+        """Seconds until the next tick: the next fetch or broker read due."""
+        now = self.clock()
+        sleep_for = self._tick_interval
+        if self._broker_read_at is not None:
+            sleep_for = min(sleep_for, self._broker_read_at + self.broker_seconds - now)
+        if self._next_due:
+            sleep_for = min(sleep_for, min(self._next_due.values()) - now)
+        return max(self.fast_seconds, sleep_for)
+
+    def stats(self):
+        stats = dict(self.last_tick)
+        stats["poll_rate_per_min"] = round(self.poll_rate(), 2)
+        stats["next_tick_seconds"] = round(self.next_sleep_seconds(), 2)
+        return stats
+
+
+def build_refresh_scheduler(config, default_interval):
+    """Returns a RefreshScheduler from `trading.refresh_schedule`, or None when disabled."""
+    schedule_cfg = config["trading"].get("refresh_schedule") or {}
+    if not schedule_cfg.get("enabled"):
+        return None
+    return RefreshScheduler(
+        fast_seconds=schedule_cfg.get("fast_seconds", 2),
+        normal_seconds=schedule_cfg.get("normal_seconds", default_interval),
+        watchlist_seconds=schedule_cfg.get("watchlist_seconds", 60),
+        closed_seconds=schedule_cfg.get("closed_seconds", 300),
+        near_atr_multiple=schedule_cfg.get("near_atr_multiple", 1.0),
+        tick_budget_seconds=schedule_cfg.get("tick_budget_seconds", 3.0),
+        broker_seconds=schedule_cfg.get("broker_seconds", default_interval),
+    )
@@ -0,0 +1,177 @@
+import json
+import os
+
+from decision import decision_response_format, is_decision_json
+from live_search import create_live_search_client
+
+# AlpacaBroker (alpaca-py + pandas) and LLMClient (openai) are imported on first
+# use so entry points that never build a client start fast.
+
+
+class Runtime:
+    """
+    Long-lived clients shared across decision cycles (Alpaca, LLM, xAI live search).
+
+    Each client is built on first use and kept, so its HTTP/gRPC connections stay
+    warm between cycles. A client is rebuilt when the settings it depends on change,
+    and `reset()` drops everything after a failed cycle so the next one reconnects.
+    """
+
+    def __init__(self):
+        self._broker = None
+        self._broker_key = None
+        self._llm = None
+        self._llm_key = None
+        self._search_client = None
+        self._search_key = None
+
+    @staticmethod
+    def _clients_config(config):
+        return config.get("clients", {})
+
+    def broker(self, config):
+        """Returns the shared AlpacaBroker, or None when credentials are missing."""
+        key_id = os.getenv("ALPACA_API_KEY")
+        secret_key = os.getenv("ALPACA_SECRET_KEY")
+        if not (key_id and secret_key):
+            self._broker = None
+            self._broker_key = None
+            return None
+        clients_cfg = self._clients_config(config)
+        trading_mode = str(config["trading"].get("mode", "paper")).lower()
+        broker_key = (
+            key_id,
+            secret_key,
+            trading_mode != "live",
+            os.getenv("ALPACA_URL_OVERRIDE") or None,
+            float(clients_cfg.get("broker_timeout_seconds", 15)),
+            int(clients_cfg.get("broker_pool_size", 10)),
+            int(clients_cfg.get("max_retries", 2)),
+        )
+        if self._broker is None or broker_key != self._broker_key:
+            from alpaca_broker import AlpacaBroker
+
+            self._broker = AlpacaBroker(
+                key_id=key_id,
+                secret_key=secret_key,
+                paper=broker_key[2],
+                url_override=broker_key[3],
+                timeout=broker_key[4],
+                pool_size=broker_key[5],
+                max_retries=broker_key[6],
+            )
+            self._broker_key = broker_key
+        # Cheap to flip between cycles without rebuilding the connection pool.
+        self._broker.native_exits = bool(config["trading"].get("native_exit_orders", False))
+        return self._broker
+
+    def llm(self, config):
+        clients_cfg = self._clients_config(config)
+        llm_key = (
+            config["llm"]["base_url"],
+            config["llm"]["model"],
+            config["llm"]["temperature"],
+            clients_cfg.get("llm_timeout_seconds", 60),
+            int(clients_cfg.get("max_retries", 2)),
+            clients_cfg.get("llm_max_connections", 10),
+            json.dumps(config["llm"].get("request_policy") or {}, sort_keys=True),
+            config["llm"].get("structured_output"),
+            json.dumps(config["llm"].get("cache") or {}, sort_keys=True),
+        )
+        if self._llm is None or llm_key != self._llm_key:
+            if self._llm is not None:
+                self._llm.close()
+            cache_cfg = config["llm"].get("cache") or {}
+            cache_mode = cache_cfg.get("mode", "passthrough")
+            if cache_mode == "replay":
+                # Recorded answers only: no client, no API key, no network
+                from llm_cache import CachedLLMClient, build_cache_store
+
+                self._llm = CachedLLMClient(
+                    None, build_cache_store(cache_cfg), "replay", model=llm_key[1], temperature=llm_key[2]
+                )
+                self._llm_key = llm_key
+                return self._llm
+            from llm import LLMClient
+
+            self._llm = LLMClient(
+                base_url=llm_key[0],
+                model=llm_key[1],
+                temperature=llm_key[2],
+                timeout=llm_key[3],
+                max_retries=llm_key[4],
+                max_connections=llm_key[5],
+                response_format=decision_response_format(llm_key[7]),
+            )
+            policy = config["llm"].get("request_policy") or {}
+            if policy.get("enabled"):
+                self._llm = self._hedged_llm(self._llm, policy, llm_key)
+            if cache_mode == "record":
+                from llm_cache import CachedLLMClient, build_cache_store
+
+                self._llm = CachedLLMClient(self._llm, build_cache_store(cache_cfg), "record")
+            self._llm_key = llm_key
+        return self._llm
+
+    @staticmethod
+    def _hedged_llm(primary, policy, llm_key):
+        from llm import HedgedLLMClient, LLMClient
+
+        fallback = None
+        fallback_cfg = policy.get("fallback") or {}
+        if fallback_cfg.get("model") or fallback_cfg.get("base_url"):
+            api_key_env = fallback_cfg.get("api_key_env")
+            fallback = LLMClient(
+                base_url=fallback_cfg.get("base_url") or llm_key[0],
+                model=fallback_cfg.get("model") or llm_key[1],
+                temperature=llm_key[2],
+                api_key=os.getenv(api_key_env) if api_key_env else None,
+                timeout=llm_key[3],
+                max_retries=llm_key[4],
+                max_connections=llm_key[5],
+                response_format=decision_response_format(llm_key[7]),
+            )
+        return HedgedLLMClient(
+            primary,
+            fallback=fallback,
+            deadline_seconds=policy.get("deadline_seconds", 60),
+            hedge=policy.get("hedge", True),
+            hedge_delay_seconds=policy.get("hedge_delay_seconds", 8),
+            hedge_percentile=policy.get("hedge_percentile", 95),
+            min_samples=policy.get("min_samples", 10),
+            validate=is_decision_json,
+        )
+
+    def search_client(self, config):
+        """Live search client (live_search.backend); raises LiveSearchUnavailable like fetch_live_context."""
+        live_search_cfg = config.get("live_search", {})
+        search_key = (
+            live_search_cfg.get("backend", "sdk"),
+            live_search_cfg.get("base_url") or config["llm"]["base_url"],
+            self._clients_config(config).get("search_timeout_seconds", 120),
+        )
+        if self._search_client is None or search_key != self._search_key:
+            self._search_client = create_live_search_client(
+                timeout=search_key[2], backend=search_key[0], base_url=search_key[1]
+            )
+            self._search_key = search_key
+        return self._search_client
+
+    def reset(self):
+        """Forces fresh connections on the next cycle (called after a failed cycle)."""
+        if self._broker is not None:
+            try:
+                self._broker.reconnect()
+            except Exception as exc:
+                print(f"⚠️ Broker reconnect failed: {exc}")
+                self._broker = None
+                self._broker_key = None
+        if self._llm is not None:
+            try:
+                self._llm.close()
+            except Exception:
+                pass
+        self._llm = None
+        self._llm_key = None
+        self._search_client = None
+        self._search_key = None
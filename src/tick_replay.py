@@ -0,0 +1,142 @@
+"""
+Local websocket server that replays recorded ticks with the Alpaca stream protocol.
+
+    python3 src/tick_replay.py data/ticks.jsonl --port 8766 --speed 10
+
+Tick files are JSONL lines {"S": "AAPL", "p": 190.1, "s": 100, "t": "<ISO time>"},
+the same format QuoteStream writes with `record_path`. Gaps between ticks are
+replayed divided by `--speed` (0 = as fast as possible). Each replayed trade
+carries "rt", the server send time, so clients can measure tick-to-trigger latency.
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+def load_ticks(path):
+    ticks = []
+    for line in Path(path).read_text().splitlines():
+        try:
+            tick = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if tick.get("S") and tick.get("p") is not None:
+            ticks.append(tick)
+    return ticks
+
+
+def _tick_seconds(tick):
+    value = tick.get("t")
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class TickReplayServer:
+    def __init__(self, ticks, speed=1.0, loop_forever=False):
+        self.ticks = ticks
+        self.speed = float(speed)
+        self.loop_forever = loop_forever
+        self.sent = 0
+
+    async def handler(self, ws, path=None):
+        await ws.send(json.dumps([{"T": "success", "msg": "connected"}]))
+        auth = json.loads(await ws.recv())
+        if auth.get("action") != "auth":
+            await ws.send(json.dumps([{"T": "error", "code": 401, "msg": "not authenticated"}]))
+            return
+        await ws.send(json.dumps([{"T": "success", "msg": "authenticated"}]))
+
+        symbols = set()
+        subscribed = asyncio.Event()
+
+        async def read_commands():
+            async for raw in ws:
+                command = json.loads(raw)
+                trades = set(command.get("trades") or [])
+                if command.get("action") == "subscribe":
+                    symbols.update(trades)
+                elif command.get("action") == "unsubscribe":
+                    symbols.difference_update(trades)
+                await ws.send(json.dumps([{"T": "subscription", "trades": sorted(symbols)}]))
+                subscribed.set()
+
+        reader = asyncio.ensure_future(read_commands())
+        try:
+            await subscribed.wait()
+            while True:
+                await self._replay(ws, symbols)
+                if not self.loop_forever:
+                    break
+        finally:
+            reader.cancel()
+
+    async def _replay(self, ws, symbols):
+        previous = None
+        for tick in self.ticks:
+            current = _tick_seconds(tick)
+            if self.speed > 0 and previous is not None and current is not None:
+                gap = (current - previous) / self.speed
+                if gap > 0:
+                    await asyncio.sleep(gap)
+            if current is not None:
+                previous = current
+            if "*" not in symbols and tick["S"] not in symbols:
+                continue
+            message = {"T": "t", "S": tick["S"], "p": tick["p"], "s": tick.get("s"), "t": tick.get("t"), "rt": time.time()}
+            await ws.send(json.dumps([message]))
+            self.sent += 1
+
+
+def start_replay_server(ticks, host="127.0.0.1", port=0, speed=1.0, loop_forever=False):
+    """Runs the replay server on a daemon thread. Returns (replay, url)."""
+    import websockets
+
+    replay = TickReplayServer(ticks, speed=speed, loop_forever=loop_forever)
+    ready = threading.Event()
+    holder = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        async def serve():
+            server = await websockets.serve(replay.handler, host, port)
+            holder["port"] = server.sockets[0].getsockname()[1]
+            ready.set()
+            await asyncio.Future()
+
+        loop.run_until_complete(serve())
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait(10)
+    return replay, f"ws://{host}:{holder['port']}"
+
+
+if __name__ == "__main__":
+    import websockets
+
+    parser = argparse.ArgumentParser(description="Replay recorded ticks over a local websocket")
+    parser.add_argument("ticks", help="JSONL tick file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed factor (0 = no delay)")
+    parser.add_argument("--loop", action="store_true", help="Restart from the first tick when done")
+    args = parser.parse_args()
+
+    server = TickReplayServer(load_ticks(args.ticks), speed=args.speed, loop_forever=args.loop)
+
+    async def main():
+        async with websockets.serve(server.handler, args.host, args.port):
+            print(f"📼 Replaying {len(server.ticks)} ticks on ws://{args.host}:{args.port} (x{args.speed})")
+            await asyncio.Future()
+
+    asyncio.run(main())
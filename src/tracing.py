@@ -0,0 +1,172 @@
+import functools
+import math
+import threading
+import time
+from collections import deque
+
+# Lightweight span timing. When disabled, span() hands back a shared no-op object
+# and traced() calls straight through, so instrumented code pays one branch.
+_enabled = False
+_window = 500
+_lock = threading.Lock()
+_samples = {}
+_local = threading.local()
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class SpanCollector:
+    """Per-cycle span totals (count, total, max) for the `cycle_timing` event."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = {}
+
+    def add(self, name, seconds):
+        with self._lock:
+            entry = self._spans.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def summary(self):
+        with self._lock:
+            return {
+                name: {"count": count, "total_ms": round(total * 1000, 1), "max_ms": round(peak * 1000, 1)}
+                for name, (count, total, peak) in sorted(self._spans.items())
+            }
+
+
+def configure(config):
+    """Reads the `tracing` config section ({"enabled": bool, "window": samples per span})."""
+    global _enabled, _window
+    tracing_cfg = config.get("tracing", {})
+    _enabled = bool(tracing_cfg.get("enabled", False))
+    window = int(tracing_cfg.get("window", 500))
+    if window != _window:
+        with _lock:
+            _window = window
+            for name, samples in list(_samples.items()):
+                _samples[name] = deque(samples, maxlen=window)
+
+
+def is_enabled():
+    return _enabled
+
+
+def span(name):
+    return _Span(name) if _enabled else _NOOP
+
+
+def traced(name):
+    """Decorator version of span()."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record(name, seconds, collector=None):
+    """Adds a sample to the rolling histogram and to `collector` (default: this thread's)."""
+    if not _enabled:
+        return
+    with _lock:
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = deque(maxlen=_window)
+        samples.append(seconds)
+    if collector is None:
+        collector = getattr(_local, "collector", None)
+    if collector is not None:
+        collector.add(name, seconds)
+
+
+def start_collecting():
+    """Collects this thread's spans (and those of bound callables) until stop_collecting()."""
+    collector = SpanCollector()
+    _local.collector = collector
+    return collector
+
+
+def current_collector():
+    return getattr(_local, "collector", None)
+
+
+def stop_collecting():
+    _local.collector = None
+
+
+def bind(fn):
+    """Wraps `fn` so spans it records on a worker thread land in the caller's collector."""
+    collector = getattr(_local, "collector", None)
+    if not _enabled or collector is None:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        previous = getattr(_local, "collector", None)
+        _local.collector = collector
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.collector = previous
+
+    return wrapper
+
+
+def _percentile(ordered, pct):
+    # Nearest-rank percentile
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def percentiles():
+    """Rolling p50/p95/p99 (ms) over the last `window` samples of every span."""
+    with _lock:
+        snapshot = {name: list(samples) for name, samples in _samples.items()}
+    result = {}
+    for name, samples in sorted(snapshot.items()):
+        if not samples:
+            continue
+        ordered = sorted(samples)
+        result[name] = {
+            "count": len(ordered),
+            "p50_ms": round(_percentile(ordered, 50) * 1000, 1),
+            "p95_ms": round(_percentile(ordered, 95) * 1000, 1),
+            "p99_ms": round(_percentile(ordered, 99) * 1000, 1),
+        }
+    return result
@@ -120,6 +120,38 @@ function updateTrade(trade) {
   container.appendChild(row);
 }
 
+function updateLatency(latency) {
+  const container = $("latency");
+  container.innerHTML = "";
+
+  const header = document.createElement("div");
+  header.className = "table-row header";
+  header.innerHTML = "<div>Span</div><div>Count</div><div>p50 (ms)</div><div>p95 (ms)</div><div>p99 (ms)</div>";
+  container.appendChild(header);
+
+  const entries = Object.entries(latency || {});
+  if (!entries.length) {
+    const row = document.createElement("div");
+    row.className = "table-row";
+    row.innerHTML = "<div>Tracing disabled</div><div>-</div><div>-</div><div>-</div><div>-</div>";
+    container.appendChild(row);
+    return;
+  }
+
+  entries.forEach(([name, stats]) => {
+    const row = document.createElement("div");
+    row.className = "table-row";
+    row.innerHTML = `
+      <div>${escapeHtml(name)}</div>
+      <div>${escapeHtml(stats.count)}</div>
+      <div>${Number(stats.p50_ms).toFixed(1)}</div>
+      <div>${Number(stats.p95_ms).toFixed(1)}</div>
+      <div>${Number(stats.p99_ms).toFixed(1)}</div>
+    `;
+    container.appendChild(row);
+  });
+}
+
 function updateHistory(history) {
   const container = $("history");
   if ((!history || !history.length) && state.lastHistory && state.lastHistory.length) {
@@ -316,6 +348,7 @@ function updateUI(data) {
 
   updatePositions(data.positions || {});
   updateTrade(data.trade || null);
+  updateLatency(data.latency || null);
   updateHistory(data.decision_history || []);
   // Chart removed for fluidity
 